@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Categorías que cuenta resumir_target_v3 cuando el día no tuvo lluvia
+OPCIONES_NUBES = ["Partially cloudy", "Overcast", "Clear"]
+
+
+# ---------------------------
+# Primitivas sobre códigos
+# ---------------------------
+def codificar(valores, sort=True):
+    """Códigos enteros (-1 para nulos) y valores únicos; las operaciones de texto se hacen sobre los únicos"""
+    codigos, unicos = pd.factorize(valores, sort=sort)
+    return codigos, unicos
+
+
+def hay_por_grupo(grupos, n_grupos, mascara):
+    """True para cada grupo que tiene al menos una fila con mascara=True"""
+    validas = grupos >= 0
+    return np.bincount(grupos[validas], weights=mascara[validas], minlength=n_grupos) > 0
+
+
+def mas_frecuente_por_grupo(grupos, n_grupos, codigos, n_categorias, desempate="menor"):
+    """Código más frecuente por grupo (-1 si el grupo no tiene valores válidos).
+
+    desempate='menor' elige el código más chico entre los empatados (como Series.mode()[0]
+    sobre categorías ordenadas); desempate='primera' elige el que aparece primero en el grupo
+    (como Counter.most_common).
+    """
+    validas = (grupos >= 0) & (codigos >= 0)
+    g, c = grupos[validas], codigos[validas]
+    conteos = np.bincount(g * n_categorias + c, minlength=n_grupos * n_categorias)
+    conteos = conteos.reshape(n_grupos, n_categorias).astype(float)
+
+    if desempate == "primera":
+        posiciones = np.flatnonzero(validas)
+        primera = np.full(n_grupos * n_categorias, np.inf)
+        np.minimum.at(primera, g * n_categorias + c, posiciones)
+        primera = primera.reshape(n_grupos, n_categorias)
+        # Más apariciones gana; a igualdad, la de menor posición
+        puntaje = np.where(conteos > 0, conteos * (len(grupos) + 1) - primera, -np.inf)
+    else:
+        puntaje = np.where(conteos > 0, conteos, -np.inf)
+
+    mejor = np.argmax(puntaje, axis=1)
+    mejor[conteos.sum(axis=1) == 0] = -1
+    return mejor
+
+
+# ---------------------------
+# Reducciones diarias usadas por la app y el entrenamiento
+# ---------------------------
+def resumir_condiciones_diarias(dias, condiciones):
+    """Versión vectorizada de modelo.resumir_target_v3 aplicada a la lista horaria de cada día.
+
+    'Rain' si alguna hora menciona lluvia; si no, la categoría de nubes más frecuente
+    (empate: la que aparece primero); 'Clear' si no hay ninguna.
+    """
+    grupos, unicos_dia = codificar(np.asarray(dias))
+    n = len(unicos_dia)
+
+    # strip sobre los valores únicos y no sobre cada hora
+    codigos_crudos, unicos_crudos = codificar(np.asarray(condiciones, dtype=object), sort=False)
+    remapeo, unicos = codificar(np.array([str(u).strip() for u in unicos_crudos], dtype=object), sort=False)
+    codigos = np.append(remapeo, -1)[codigos_crudos]
+    unicos = pd.Index(unicos, dtype=object)
+    lluvia = np.append(unicos.str.contains("Rain", regex=False), False)[codigos]
+
+    mapa_nubes = np.append(pd.Categorical(unicos, categories=OPCIONES_NUBES).codes, -1)
+    nubes = mapa_nubes[codigos]
+
+    mejor = mas_frecuente_por_grupo(grupos, n, nubes, len(OPCIONES_NUBES), desempate="primera")
+    resultado = np.where(mejor >= 0, np.array(OPCIONES_NUBES, dtype=object)[mejor], "Clear").astype(object)
+    resultado[hay_por_grupo(grupos, n, lluvia)] = "Rain"
+    return pd.Series(resultado, index=pd.Index(unicos_dia, name="dia"))
+
+
+def moda_diaria(dias, valores):
+    """Moda de cada día con el mismo criterio que Series.mode()[0] (a igualdad, el menor valor)"""
+    grupos, unicos_dia = codificar(np.asarray(dias))
+    codigos, unicos = codificar(np.asarray(valores, dtype=object))
+    mejor = mas_frecuente_por_grupo(grupos, len(unicos_dia), codigos, len(unicos), desempate="menor")
+    resultado = pd.Series(np.asarray(unicos, dtype=object), dtype=object).reindex(mejor).to_numpy()
+    return pd.Series(resultado, index=pd.Index(unicos_dia, name="dia"))
+
+
+def lluvia_diaria(dias, mascara_lluvia):
+    """True para los días con al menos una hora lluviosa"""
+    grupos, unicos_dia = codificar(np.asarray(dias))
+    return pd.Series(hay_por_grupo(grupos, len(unicos_dia), np.asarray(mascara_lluvia, dtype=bool)),
+                     index=pd.Index(unicos_dia, name="dia"))
+
+
+def suma_compensada_por_grupo(grupos, n_grupos, valores):
+    """Suma y cantidad de valores no nulos por grupo para cada columna de 'valores' (filas x columnas).
+
+    Suma en el orden de las filas con compensación de Kahan, como groupby.sum/mean de pandas,
+    así el resultado coincide hasta el último bit. Se avanza una posición dentro del grupo por
+    paso, para todos los grupos y columnas a la vez.
+    """
+    g, v = grupos, np.asarray(valores, dtype=np.float64)
+    validas = g >= 0
+    if not validas.all():
+        g, v = g[validas], v[validas]
+    # Los datos horarios suelen venir ordenados por día: solo se reordena si hace falta
+    if (np.diff(g) < 0).any():
+        orden = np.argsort(g, kind="stable")
+        g, v = g[orden], v[orden]
+    filas_por_grupo = np.bincount(g, minlength=n_grupos)
+    posicion = np.arange(len(g)) - (np.cumsum(filas_por_grupo) - filas_por_grupo)[g]
+
+    # Posición dentro del grupo como primer eje: cada paso lee un bloque contiguo
+    matriz = np.full((filas_por_grupo.max() if len(g) else 0, n_grupos, valores.shape[1]), np.nan)
+    matriz[posicion, g] = v
+    con_infinitos = np.isinf(v).any()
+    suma = np.zeros((n_grupos, valores.shape[1]))
+    compensacion = np.zeros_like(suma)
+    with np.errstate(invalid="ignore"):
+        for valor in matriz:
+            presente = ~np.isnan(valor)
+            y = valor - compensacion
+            t = suma + y
+            nueva = (t - suma) - y
+            if con_infinitos:
+                # pandas reinicia la compensación si se volvió NaN (sumas con infinitos)
+                nueva[np.isnan(nueva)] = 0.0
+            np.copyto(compensacion, nueva, where=presente)
+            np.copyto(suma, t, where=presente)
+    return suma, (~np.isnan(matriz)).sum(axis=0)
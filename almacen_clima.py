@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import pandas as pd
+from contextlib import contextmanager
+
+RUTA = "clima.sqlite"
+# CSV horario del sitio por defecto: lo escribe ingesta.anexar_filas (ingesta y backfill) y lo leen
+# modelo.py, la app y los lotes. Se define solo acá, el módulo más bajo de los que lo usan
+RUTA_DATASET = "joined_weather_data.csv"
+LOCATION = "Mendoza,Argentina"
+FILAS_POR_LOTE = 50_000
+
+
+# ---------------------------
+# Conexión y esquema
+# ---------------------------
+@contextmanager
+def conectar(ruta=RUTA):
+    """Conexión en una transacción (commit al salir sin errores) que siempre se cierra"""
+    conexion = sqlite3.connect(ruta, timeout=30)
+    try:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def _lista(cols):
+    return ", ".join(f'"{c}"' for c in cols)
+
+
+def _tipo_sql(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _crear_tabla(conexion, muestra):
+    """Crea la tabla 'horas' con las columnas del CSV (más 'location') y sus índices"""
+    columnas = [c for c in muestra.columns if c != "location"]
+    definiciones = ", ".join(f'"{c}" {_tipo_sql(muestra[c].dtype)}' for c in columnas)
+    conexion.executescript(f"""
+        CREATE TABLE IF NOT EXISTS horas (
+            location TEXT NOT NULL,
+            {definiciones},
+            PRIMARY KEY (location, datetimeEpoch)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS horas_dia ON horas (location, dia);
+        CREATE TABLE IF NOT EXISTS metadatos (clave TEXT PRIMARY KEY, valor TEXT);
+    """)
+    conexion.execute("INSERT OR IGNORE INTO metadatos VALUES ('columnas', ?)", (json.dumps(columnas),))
+
+
+def columnas(conexion):
+    try:
+        fila = conexion.execute("SELECT valor FROM metadatos WHERE clave = 'columnas'").fetchone()
+    except sqlite3.OperationalError:
+        fila = None
+    if fila is None:
+        raise ValueError("El almacén está vacío; cargarlo con 'python almacen_clima.py cargar'")
+    return json.loads(fila[0])
+
+
+# ---------------------------
+# Escritura
+# ---------------------------
+def insertar(df, location=LOCATION, ruta=RUTA):
+    """Inserta las filas horarias (mismo esquema que el CSV); las horas repetidas se ignoran.
+
+    Devuelve la cantidad de filas nuevas.
+    """
+    if len(df) == 0:
+        return 0
+    with conectar(ruta) as conexion:
+        _crear_tabla(conexion, df)
+        cols = columnas(conexion)
+        faltantes = [c for c in cols if c not in df.columns]
+        if faltantes:
+            raise ValueError(f"Faltan las columnas {faltantes} en las filas a insertar")
+        valores = df[cols].astype(object).where(df[cols].notna(), None)
+        antes = conexion.total_changes
+        conexion.executemany(
+            f"INSERT OR IGNORE INTO horas (location, {_lista(cols)}) "
+            f"VALUES (?, {', '.join('?' * len(cols))})",
+            ((location, *fila) for fila in valores.itertuples(index=False, name=None)),
+        )
+        nuevas = conexion.total_changes - antes
+    # Deja todo en el archivo principal, así su hash (modelo.py) refleja el contenido
+    with conectar(ruta) as conexion:
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return nuevas
+
+
+def cargar_csv(ruta_csv=RUTA_DATASET, ruta=RUTA, location=LOCATION, filas_por_lote=FILAS_POR_LOTE):
+    """Carga (o completa) el almacén a partir del CSV, por lotes para no tenerlo entero en memoria"""
+    nuevas = 0
+    for lote in pd.read_csv(ruta_csv, chunksize=filas_por_lote):
+        nuevas += insertar(lote, location, ruta)
+    return nuevas
+
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def _seleccion(conexion, columnas_pedidas):
+    disponibles = columnas(conexion)
+    if columnas_pedidas is None:
+        return disponibles
+    desconocidas = [c for c in columnas_pedidas if c not in disponibles]
+    if desconocidas:
+        raise KeyError(f"Columnas desconocidas en el almacén: {desconocidas}")
+    return list(columnas_pedidas)
+
+
+def consultar(desde=None, hasta=None, columnas_pedidas=None, location=LOCATION, ruta=RUTA):
+    """Filas horarias con 'dia' en [desde, hasta] (fechas o 'YYYY-MM-DD'; None = sin límite).
+
+    Usa el índice (location, dia): el costo depende del tamaño del resultado, no del archivo.
+    """
+    with conectar(ruta) as conexion:
+        cols = _seleccion(conexion, columnas_pedidas)
+        condiciones, parametros = ["location = ?"], [location]
+        if desde is not None:
+            condiciones.append("dia >= ?")
+            parametros.append(f"{pd.Timestamp(desde):%Y-%m-%d}")
+        if hasta is not None:
+            condiciones.append("dia <= ?")
+            parametros.append(f"{pd.Timestamp(hasta):%Y-%m-%d}")
+        sql = (f"SELECT {_lista(cols)} FROM horas "
+               f"WHERE {' AND '.join(condiciones)} ORDER BY dia, datetimeEpoch")
+        return pd.read_sql_query(sql, conexion, params=parametros)
+
+
+def consultar_epochs(desde_epoch, hasta_epoch, columnas_pedidas=None, location=LOCATION, ruta=RUTA):
+    """Filas con datetimeEpoch en [desde_epoch, hasta_epoch] (usa la clave primaria)"""
+    with conectar(ruta) as conexion:
+        cols = _seleccion(conexion, columnas_pedidas)
+        sql = (f"SELECT {_lista(cols)} FROM horas "
+               f"WHERE location = ? AND datetimeEpoch BETWEEN ? AND ? ORDER BY datetimeEpoch")
+        return pd.read_sql_query(sql, conexion, params=[location, int(desde_epoch), int(hasta_epoch)])
+
+
+def rango(location=LOCATION, ruta=RUTA):
+    """(primer día, último día, cantidad de horas) guardados para la ubicación"""
+    with conectar(ruta) as conexion:
+        return conexion.execute(
+            "SELECT MIN(dia), MAX(dia), COUNT(*) FROM horas WHERE location = ?", (location,)
+        ).fetchone()
+
+
+def disponible(ruta=RUTA):
+    return os.path.exists(ruta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén SQLite indexado de datos horarios")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_cargar = sub.add_parser("cargar", help="Carga o completa el almacén desde el CSV")
+    p_cargar.add_argument("--csv", default=RUTA_DATASET)
+    p_cargar.add_argument("--location", default=LOCATION)
+
+    p_consultar = sub.add_parser("consultar", help="Rango de días (y columnas) como CSV por stdout")
+    p_consultar.add_argument("desde")
+    p_consultar.add_argument("hasta")
+    p_consultar.add_argument("--columnas", help="Lista separada por comas; por defecto todas")
+    p_consultar.add_argument("--location", default=LOCATION)
+
+    for p in (p_cargar, p_consultar):
+        p.add_argument("--ruta", default=RUTA)
+    args = parser.parse_args()
+
+    if args.comando == "cargar":
+        inicio = time.perf_counter()
+        nuevas = cargar_csv(args.csv, args.ruta, args.location)
+        primero, ultimo, total = rango(args.location, args.ruta)
+        print(f"✅ {nuevas} horas nuevas en {time.perf_counter() - inicio:.1f}s; "
+              f"{total} horas de {primero} a {ultimo} en {args.ruta}")
+    else:
+        columnas_pedidas = args.columnas.split(",") if args.columnas else None
+        df = consultar(args.desde, args.hasta, columnas_pedidas, args.location, args.ruta)
+        print(df.to_csv(index=False), end="")
@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from prediccion import FEATURES
+
+DIRECTORIO = os.path.join("model_output", "features")
+MANIFIESTO = "manifiesto.json"
+# float64, igual que al entrenar: en float32 las features que caen cerca de un umbral de los
+# árboles (presión, humedad, radiación) cambian de rama y las probabilidades se movían hasta
+# 0.06. El costo es el doble de espacio: 8 bytes x 21 features, ~120 KB para dos años
+DTYPE = "float64"
+
+
+# ---------------------------
+# Escritura (la hace el entrenamiento)
+# ---------------------------
+def escribir(X, location, directorio=DIRECTORIO, origen=None):
+    """Guarda la matriz de features diaria (DTYPE) contigua más un manifiesto JSON.
+
+    X es la salida de prediccion.construir_features_lote indexada por fecha objetivo. Se
+    rellena a un rango diario continuo (los días sin datos quedan en NaN) para que la fila
+    de una fecha sea simplemente (fecha - inicio) días. 'origen' identifica los datos de
+    entrada (la clave de la etapa que armó X) para no reescribir si no cambiaron.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    fechas = pd.DatetimeIndex(X.index).normalize()
+    completo = pd.date_range(fechas.min(), fechas.max(), freq="D")
+    matriz = np.ascontiguousarray(
+        X[FEATURES].set_axis(fechas).reindex(completo).to_numpy(dtype=DTYPE)
+    )
+
+    contenido = hashlib.sha1(matriz.tobytes()).hexdigest()[:12]
+    nombre = f"matriz-{contenido}.npy"
+    ruta = os.path.join(directorio, nombre)
+    if not os.path.exists(ruta):
+        temporal = f"{ruta}.tmp-{os.getpid()}"
+        with open(temporal, "wb") as f:
+            np.save(f, matriz)
+        os.replace(temporal, ruta)
+
+    manifiesto = {
+        "archivo": nombre,
+        "location": location,
+        "origen": origen,
+        "columnas": FEATURES,
+        "dtype": DTYPE,
+        "inicio": f"{completo[0]:%Y-%m-%d}",
+        "fin": f"{completo[-1]:%Y-%m-%d}",
+        "filas": int(matriz.shape[0]),
+        "filas_completas": int((~np.isnan(matriz).any(axis=1)).sum()),
+    }
+    ruta_manifiesto = os.path.join(directorio, MANIFIESTO)
+    with open(f"{ruta_manifiesto}.tmp-{os.getpid()}", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    os.replace(f"{ruta_manifiesto}.tmp-{os.getpid()}", ruta_manifiesto)
+
+    # Las matrices viejas se pueden borrar aunque otro proceso las tenga mapeadas:
+    # el sistema las libera cuando se cierra el último mapeo
+    for archivo in os.listdir(directorio):
+        if archivo.startswith("matriz-") and archivo.endswith(".npy") and archivo != nombre:
+            os.remove(os.path.join(directorio, archivo))
+    return manifiesto
+
+
+# ---------------------------
+# Lectura (app, servicio y lotes)
+# ---------------------------
+class AlmacenFeatures:
+    """Matriz de features abierta con memory mapping en modo solo lectura.
+
+    Todos los procesos que abren el mismo archivo comparten las páginas físicas; las
+    filas y los rangos que devuelve son vistas sobre el mapeo, sin copias.
+    """
+
+    def __init__(self, directorio=DIRECTORIO):
+        with open(os.path.join(directorio, MANIFIESTO), encoding="utf-8") as f:
+            self.manifiesto = json.load(f)
+        if self.manifiesto["columnas"] != FEATURES:
+            raise ValueError("El almacén de features tiene otras columnas; volver a correr modelo.py")
+        self.location = self.manifiesto["location"]
+        self.columnas = self.manifiesto["columnas"]
+        self.inicio = np.datetime64(self.manifiesto["inicio"], "D")
+        self.matriz = np.load(os.path.join(directorio, self.manifiesto["archivo"]), mmap_mode="r")
+
+    def __len__(self):
+        return self.matriz.shape[0]
+
+    def _posicion(self, fecha):
+        return int((np.datetime64(pd.Timestamp(fecha).date(), "D") - self.inicio).astype(int))
+
+    def fechas(self, desde=0, hasta=None):
+        hasta = len(self) if hasta is None else hasta
+        return pd.DatetimeIndex(self.inicio + np.arange(desde, hasta), name="fecha")
+
+    def fila(self, fecha):
+        """Vector de features de una fecha objetivo, o None si no está o le faltan datos"""
+        i = self._posicion(fecha)
+        if i < 0 or i >= len(self):
+            return None
+        fila = self.matriz[i]
+        if np.isnan(fila).any():
+            return None
+        return fila
+
+    def features(self, fecha):
+        """Igual que fila() pero como dict, con el formato de prediccion.construir_features"""
+        fila = self.fila(fecha)
+        if fila is None:
+            return None
+        features = dict(zip(self.columnas, fila.tolist()))
+        features["rain_yesterday"] = int(features["rain_yesterday"])
+        return features
+
+    def rango(self, desde, hasta):
+        """(fechas, vista) para [desde, hasta] recortado a lo que cubre el almacén"""
+        i = max(self._posicion(desde), 0)
+        j = min(self._posicion(hasta) + 1, len(self))
+        if j <= i:
+            return self.fechas(0, 0), self.matriz[0:0]
+        return self.fechas(i, j), self.matriz[i:j]
+
+    def cubre(self, desde, hasta):
+        return self._posicion(desde) >= 0 and self._posicion(hasta) < len(self)
+
+    def dataframe(self, desde, hasta):
+        """Matriz de features lista para predecir; solo las fechas con datos completos.
+
+        Si el rango no tiene huecos el DataFrame envuelve la vista sin copiarla.
+        """
+        fechas, vista = self.rango(desde, hasta)
+        completas = ~np.isnan(vista).any(axis=1)
+        if not completas.all():
+            fechas, vista = fechas[completas], vista[completas]
+        return pd.DataFrame(vista, index=fechas, columns=self.columnas, copy=False)
+
+
+_abiertos = {}
+
+
+def abrir(directorio=DIRECTORIO):
+    """Almacén compartido dentro del proceso; se vuelve a abrir solo si cambió el manifiesto.
+
+    Devuelve None si todavía no se generó (correr modelo.py).
+    """
+    ruta = os.path.join(directorio, MANIFIESTO)
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    clave = os.path.abspath(directorio)
+    firma = (estado.st_mtime_ns, estado.st_size)
+    if clave not in _abiertos or _abiertos[clave][0] != firma:
+        _abiertos[clave] = (firma, AlmacenFeatures(directorio))
+    return _abiertos[clave][1]
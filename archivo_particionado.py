@@ -0,0 +1,220 @@
+import os
+import json
+import hashlib
+import argparse
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+import almacen_clima
+from almacen_clima import RUTA_DATASET
+from registro_modelos import slug
+
+# Archivo horario particionado por (estación, año): archivo_horario/<estación>/<año>.parquet.
+# Cada día cae entero en una partición, así la agregación diaria de cada una es independiente.
+DIRECTORIO = "archivo_horario"
+MANIFIESTO = "manifiesto.json"
+LOCATION = "Mendoza,Argentina"
+
+# Columnas que lee la pestaña de exploración
+COLUMNAS_EXPLORACION = ['dia', 'datetime_completo', 'temp', 'feelslike', 'humidity', 'conditions']
+
+
+def carpeta(location=LOCATION, directorio=DIRECTORIO):
+    return os.path.join(directorio, slug(location))
+
+
+def ruta_manifiesto(location=LOCATION, directorio=DIRECTORIO):
+    return os.path.join(carpeta(location, directorio), MANIFIESTO)
+
+
+def disponible(location=LOCATION, directorio=DIRECTORIO):
+    return os.path.exists(ruta_manifiesto(location, directorio))
+
+
+def leer_manifiesto(location=LOCATION, directorio=DIRECTORIO):
+    """{location, columnas, particiones: {año: {archivo, filas, desde, hasta, hash}}}"""
+    ruta = ruta_manifiesto(location, directorio)
+    if not os.path.exists(ruta):
+        return {"location": location, "columnas": None, "particiones": {}}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------------------------
+# Escritura
+# ---------------------------
+def _escribir_particion(df, ruta):
+    """Escritura atómica; devuelve el hash del contenido (cambia solo si cambian las filas)"""
+    temporal = f"{ruta}.tmp-{os.getpid()}"
+    df.to_parquet(temporal, index=False)
+    contenido = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:16]
+    os.replace(temporal, ruta)
+    return contenido
+
+
+def escribir(df, location=LOCATION, directorio=DIRECTORIO, anexar=False):
+    """Guarda las filas horarias (esquema del CSV) en las particiones de sus años.
+
+    Con anexar=True se suman a lo que ya tenía cada partición (sin repetir datetimeEpoch);
+    si no, reemplazan las particiones de esos años. Devuelve los años reescritos.
+    """
+    destino = carpeta(location, directorio)
+    os.makedirs(destino, exist_ok=True)
+    manifiesto = leer_manifiesto(location, directorio)
+    manifiesto["columnas"] = manifiesto["columnas"] or [c for c in df.columns if c != "location"]
+    columnas = manifiesto["columnas"]
+
+    df = df[columnas]
+    años = df['dia'].astype(str).str[:4]
+    reescritos = []
+    for año, filas in df.groupby(años, sort=True):
+        archivo = f"{año}.parquet"
+        ruta = os.path.join(destino, archivo)
+        if anexar and os.path.exists(ruta):
+            filas = pd.concat([pd.read_parquet(ruta), filas], ignore_index=True)
+        filas = (filas.drop_duplicates(subset='datetimeEpoch', keep='first')
+                 .sort_values('datetimeEpoch', kind='stable').reset_index(drop=True))
+        manifiesto["particiones"][año] = {
+            "archivo": archivo,
+            "filas": len(filas),
+            "desde": str(filas['dia'].min()),
+            "hasta": str(filas['dia'].max()),
+            "hash": _escribir_particion(filas, ruta),
+        }
+        reescritos.append(año)
+
+    # El manifiesto (con el hash de cada partición) es la clave de contenido para cache_etapas
+    manifiesto["particiones"] = dict(sorted(manifiesto["particiones"].items()))
+    ruta = ruta_manifiesto(location, directorio)
+    with open(f"{ruta}.tmp-{os.getpid()}", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    os.replace(f"{ruta}.tmp-{os.getpid()}", ruta)
+    return reescritos
+
+
+def construir(ruta_datos=RUTA_DATASET, location=LOCATION, directorio=DIRECTORIO):
+    """Arma (o rehace) el archivo a partir del CSV o del almacén SQLite"""
+    if ruta_datos.endswith(".sqlite"):
+        df = almacen_clima.consultar(location=location, ruta=ruta_datos)
+    else:
+        df = pd.read_csv(ruta_datos)
+    return escribir(df, location, directorio)
+
+
+# ---------------------------
+# Procesamiento en paralelo por partición
+# ---------------------------
+def _agregar_modelo(df, motor=None):
+    import modelo
+    return modelo.agregar_diario(modelo.preparar_horario(df), motor=motor)
+
+
+def _diario_api(df):
+    import prediccion
+    return prediccion.diario_desde_horario(df)
+
+
+def _exploracion(df, motor=None):
+    import motor_datos
+    return motor_datos.preparar_exploracion(df, motor)[:2]
+
+
+ETAPAS = {"modelo": _agregar_modelo, "diario_api": _diario_api, "exploracion": _exploracion}
+
+
+def _contexto():
+    """Procesos hijos sin fork directo: un fork después de usar polars (o desde los hilos de Streamlit)
+    puede quedar bloqueado para siempre en un lock tomado por un hilo que no existe en el hijo.
+
+    Con forkserver los módulos pesados se importan una vez en el servidor y cada hijo arranca
+    ya con ellos; donde no existe (Windows) se usa spawn.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    contexto = multiprocessing.get_context("forkserver")
+    contexto.set_forkserver_preload(["pandas", "modelo", "motor_datos", "prediccion"])
+    return contexto
+
+
+def _procesar_particion(ruta, etapa, columnas, desde, hasta, params):
+    df = pd.read_parquet(ruta, columns=columnas)
+    if desde is not None:
+        df = df[df['dia'] >= desde]
+    if hasta is not None:
+        df = df[df['dia'] <= hasta]
+    return ETAPAS[etapa](df.reset_index(drop=True), **params)
+
+
+def procesar(etapa, location=LOCATION, directorio=DIRECTORIO, procesos=None, columnas=None,
+             desde=None, hasta=None, **params):
+    """Corre una etapa de ETAPAS sobre cada partición (una por proceso) y devuelve los resultados en orden de año.
+
+    desde/hasta ('YYYY-MM-DD') descartan las particiones fuera del rango sin leerlas.
+    """
+    desde = None if desde is None else f"{pd.Timestamp(desde):%Y-%m-%d}"
+    hasta = None if hasta is None else f"{pd.Timestamp(hasta):%Y-%m-%d}"
+    manifiesto = leer_manifiesto(location, directorio)
+    if not manifiesto["particiones"]:
+        raise ValueError(f"No hay archivo particionado para {location}; crearlo con 'python archivo_particionado.py construir'")
+    tareas = [
+        (os.path.join(carpeta(location, directorio), p["archivo"]), etapa, columnas, desde, hasta, params)
+        for p in manifiesto["particiones"].values()
+        if (desde is None or p["hasta"] >= desde) and (hasta is None or p["desde"] <= hasta)
+    ]
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos <= 1:
+        return [_procesar_particion(*t) for t in tareas]
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=_contexto()) as pool:
+        return list(pool.map(_procesar_particion, *zip(*tareas)))
+
+
+def agregar_diario(_manifiesto=None, location=LOCATION, directorio=DIRECTORIO, procesos=None, motor=None,
+                   desde=None, hasta=None):
+    """Tabla diaria de modelo.agregar_diario armada partición por partición.
+
+    Los desfasajes entre días (rain_yesterday, el target de día+h) se calculan después, sobre
+    la tabla ya concatenada, así que los bordes entre años quedan bien sin tratarlos aparte.
+    El primer argumento es la ruta del manifiesto (la entrada de la etapa en cache_etapas).
+    """
+    partes = procesar("modelo", location, directorio, procesos, desde=desde, hasta=hasta, motor=motor)
+    return pd.concat(partes, ignore_index=True)
+
+
+def diario_api(_manifiesto=None, location=LOCATION, directorio=DIRECTORIO, procesos=None):
+    """Como prediccion.diario_desde_horario, con cada partición agregada en su proceso"""
+    return pd.concat(procesar("diario_api", location, directorio, procesos))
+
+
+def matriz_inferencia(_manifiesto=None, location=LOCATION, directorio=DIRECTORIO, procesos=None):
+    """Como modelo.matriz_inferencia: días agregados por partición y features (día-1/día-2) sobre el total"""
+    import prediccion
+    diario = diario_api(location=location, directorio=directorio, procesos=procesos)
+    fechas = pd.date_range(diario.index.min(), diario.index.max() + pd.Timedelta(days=1), freq="D")
+    return prediccion.construir_features_lote(diario, fechas)
+
+
+def preparar_exploracion(location=LOCATION, directorio=DIRECTORIO, procesos=None, motor=None):
+    """(df horario, tabla diaria, orden de estaciones) de la pestaña de exploración, por partición"""
+    import motor_datos
+    partes = procesar("exploracion", location, directorio, procesos, columnas=COLUMNAS_EXPLORACION, motor=motor)
+    df = pd.concat([p[0] for p in partes], ignore_index=True)
+    df_dias = pd.concat([p[1] for p in partes], ignore_index=True)
+    return df, df_dias, motor_datos.ORDEN_ESTACIONES
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivo horario particionado por (estación, año)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_construir = sub.add_parser("construir", help="Crear o rehacer las particiones desde el CSV o el almacén")
+    p_construir.add_argument("--datos", default=RUTA_DATASET, help="CSV horario o almacén .sqlite")
+    p_construir.add_argument("--location", default=LOCATION)
+    sub.add_parser("info", help="Particiones del archivo").add_argument("--location", default=LOCATION)
+    args = parser.parse_args()
+
+    if args.comando == "construir":
+        años = construir(args.datos, args.location)
+        print(f"✅ Particiones escritas: {', '.join(años)}")
+    manifiesto = leer_manifiesto(args.location)
+    for año, p in manifiesto["particiones"].items():
+        print(f"{año}: {p['filas']:>7} filas ({p['desde']} a {p['hasta']})")
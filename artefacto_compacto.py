@@ -0,0 +1,208 @@
+import os
+import json
+import struct
+import numpy as np
+
+# Formato: MAGIA | largo del encabezado (uint64) | encabezado JSON | arrays alineados a 64 bytes.
+# No hay pickle: cargar un artefacto solo lee JSON y mapea arrays de tipos fijos.
+MAGIA = b"GBARR001"
+EXTENSION = ".arr"
+ALINEACION = 64
+
+# Filas por bloque al recorrer los árboles (acota la memoria de los índices de nodo)
+FILAS_POR_BLOQUE = 512
+
+
+# ---------------------------
+# Exportar un pipeline entrenado (modelo.py)
+# ---------------------------
+def _umbral_float32(umbral):
+    """Umbral en float32 que separa igual que el original.
+
+    Los árboles de scikit-learn comparan X ya convertido a float32 contra umbrales float64;
+    redondeando hacia abajo, x <= u32 vale exactamente cuando x <= u64 para todo x float32.
+    """
+    u32 = umbral.astype(np.float32)
+    arriba = u32.astype(np.float64) > umbral
+    u32[arriba] = np.nextafter(u32[arriba], np.float32(-np.inf))
+    return u32
+
+
+def _partes_pipeline(pipeline):
+    """(imputer, scaler, onehot, numéricas, categóricas, clasificador) o ValueError si no es el pipeline de modelo.py"""
+    try:
+        preprocesador = pipeline.named_steps["preprocessor"]
+        clasificador = pipeline.named_steps["classifier"]
+        num = preprocesador.named_transformers_["num"]
+        cat = preprocesador.named_transformers_["cat"]
+        imputer, scaler = num.named_steps["imputer"], num.named_steps["scaler"]
+        onehot = cat.named_steps["onehot"]
+    except (AttributeError, KeyError) as e:
+        raise ValueError(f"Solo se exporta el pipeline de modelo.py (preprocessor + classifier): {e}")
+
+    columnas = {nombre: cols for nombre, _, cols in preprocesador.transformers_}
+    if type(clasificador).__name__ != "GradientBoostingClassifier":
+        raise ValueError(f"Clasificador no soportado: {type(clasificador).__name__}")
+    if preprocesador.remainder != "drop" or list(preprocesador.output_indices_) != ["num", "cat", "remainder"]:
+        raise ValueError("El ColumnTransformer tiene que ser 'num' + 'cat' sin columnas sobrantes")
+    if imputer.strategy != "mean" or np.isnan(imputer.statistics_).any():
+        raise ValueError("El imputer tiene que ser de medias y sin columnas vacías")
+    if onehot.drop is not None or onehot.handle_unknown != "ignore":
+        raise ValueError("El OneHotEncoder tiene que ser sin drop y con handle_unknown='ignore'")
+    return imputer, scaler, onehot, list(columnas["num"]), list(columnas["cat"]), clasificador
+
+
+def exportar(pipeline, ruta):
+    """Guarda el pipeline de modelo.py como paquete de arrays; devuelve el encabezado"""
+    imputer, scaler, onehot, numericas, categoricas, clf = _partes_pipeline(pipeline)
+    n_features = len(numericas) + sum(len(c) for c in onehot.categories_)
+    n_etapas, n_clases = clf.estimators_.shape
+
+    # Todos los árboles en arrays planos; los hijos apuntan a índices globales y cada hoja
+    # apunta a sí misma, así el recorrido avanza 'profundidad' niveles sin preguntar si llegó
+    hijos, feature, umbral, valor, raices = [], [], [], [], []
+    inicio = 0
+    profundidad = 0
+    for arbol in clf.estimators_.ravel():  # orden etapa, clase
+        t = arbol.tree_
+        propio = np.arange(t.node_count) + inicio
+        hoja = t.children_left < 0
+        raices.append(inicio)
+        hijos.append(np.column_stack([np.where(hoja, propio, t.children_left + inicio),
+                                      np.where(hoja, propio, t.children_right + inicio)]))
+        feature.append(np.where(hoja, 0, t.feature))
+        umbral.append(t.threshold)
+        # learning_rate ya aplicado: el crudo es inicial + suma de hojas
+        valor.append(clf.learning_rate * t.value[:, 0, 0])
+        inicio += t.node_count
+        profundidad = max(profundidad, t.max_depth)
+
+    arrays = {
+        "imputer": imputer.statistics_.astype(np.float64),
+        "media": (scaler.mean_ if scaler.with_mean else np.zeros(len(numericas))).astype(np.float64),
+        "escala": (scaler.scale_ if scaler.with_std else np.ones(len(numericas))).astype(np.float64),
+        "inicial": clf._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0].astype(np.float64),
+        "raices": np.array(raices, dtype=np.int32),
+        "hijos": np.concatenate(hijos).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int16),
+        "umbral": _umbral_float32(np.concatenate(umbral)),
+        "valor": np.concatenate(valor).astype(np.float32),
+    }
+
+    encabezado = {
+        "formato": 1,
+        "tipo": "gradient_boosting",
+        "features": [str(c) for c in getattr(pipeline, "feature_names_in_", numericas + categoricas)],
+        "numericas": numericas,
+        "categoricas": categoricas,
+        "categorias": [[c.item() if hasattr(c, "item") else c for c in cats] for cats in onehot.categories_],
+        "clases": [c.item() if hasattr(c, "item") else c for c in clf.classes_],
+        "etapas": int(n_etapas),
+        "clases_por_etapa": int(n_clases),
+        "profundidad": int(profundidad),
+        "arrays": {},
+    }
+    offset = 0
+    for nombre, array in arrays.items():
+        encabezado["arrays"][nombre] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALINEACION) * ALINEACION
+
+    datos_encabezado = json.dumps(encabezado, ensure_ascii=False).encode("utf-8")
+    base = -(-(len(MAGIA) + 8 + len(datos_encabezado)) // ALINEACION) * ALINEACION
+    temporal = f"{ruta}.tmp-{os.getpid()}"
+    with open(temporal, "wb") as f:
+        f.write(MAGIA + struct.pack("<Q", len(datos_encabezado)) + datos_encabezado)
+        for nombre, array in arrays.items():
+            f.seek(base + encabezado["arrays"][nombre]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(base + offset)
+    os.replace(temporal, ruta)
+    return encabezado
+
+
+# ---------------------------
+# Cargar y predecir (sin scikit-learn)
+# ---------------------------
+class ModeloCompacto:
+    """Mismo contrato que el pipeline para la app: predict_proba, predict, classes_, feature_names_in_.
+
+    Los arrays son vistas de un np.memmap de solo lectura: varios procesos que cargan el mismo
+    archivo comparten las páginas del sistema operativo en lugar de tener una copia cada uno.
+    """
+
+    def __init__(self, ruta):
+        with open(ruta, "rb") as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f"{ruta} no es un artefacto compacto")
+            largo, = struct.unpack("<Q", f.read(8))
+            self.encabezado = json.loads(f.read(largo).decode("utf-8"))
+        base = -(-(len(MAGIA) + 8 + largo) // ALINEACION) * ALINEACION
+        mapa = np.memmap(ruta, dtype=np.uint8, mode="r")
+        self.arrays = {}
+        for nombre, meta in self.encabezado["arrays"].items():
+            dtype = np.dtype(meta["dtype"])
+            n_bytes = int(np.prod(meta["shape"], dtype=np.int64)) * dtype.itemsize
+            inicio = base + meta["offset"]
+            self.arrays[nombre] = mapa[inicio:inicio + n_bytes].view(dtype).reshape(meta["shape"])
+
+        self.classes_ = np.array(self.encabezado["clases"], dtype=object)
+        self.feature_names_in_ = np.array(self.encabezado["features"], dtype=object)
+
+    def transformar(self, X):
+        """Imputer + scaler + one-hot como el ColumnTransformer, en float32 como lo ven los árboles"""
+        a = self.arrays
+        if hasattr(X, "loc"):
+            num = X[self.encabezado["numericas"]].to_numpy(dtype=np.float64)
+            cat = X[self.encabezado["categoricas"]].to_numpy()
+        else:
+            # Array con las columnas en el orden de feature_names_in_
+            X = np.asarray(X)
+            posicion = {c: i for i, c in enumerate(self.encabezado["features"])}
+            num = X[:, [posicion[c] for c in self.encabezado["numericas"]]].astype(np.float64)
+            cat = X[:, [posicion[c] for c in self.encabezado["categoricas"]]]
+        num = np.where(np.isnan(num), a["imputer"], num)
+        partes = [(num - a["media"]) / a["escala"]]
+        for j, categorias in enumerate(self.encabezado["categorias"]):
+            partes.append(cat[:, [j]] == np.array(categorias, dtype=cat.dtype)[None, :])
+        return np.hstack(partes).astype(np.float32)
+
+    def _crudo(self, Xt):
+        a = self.arrays
+        n, n_features = Xt.shape
+        plano = Xt.ravel()
+        base = (np.arange(n, dtype=np.int32) * n_features)[:, None]
+        hijos = a["hijos"].ravel()
+        nodo = np.repeat(a["raices"][None, :], n, axis=0)
+        for _ in range(self.encabezado["profundidad"]):
+            # hijo izquierdo (2*nodo) si x <= umbral, derecho (2*nodo + 1) si no
+            derecha = plano[base + a["feature"][nodo]] > a["umbral"][nodo]
+            nodo = hijos[2 * nodo + derecha]
+        hojas = a["valor"][nodo].astype(np.float64).reshape(n, self.encabezado["etapas"], -1)
+        return a["inicial"] + hojas.sum(axis=1)
+
+    def predict_proba(self, X):
+        Xt = self.transformar(X)
+        bloques = []
+        for inicio in range(0, len(Xt), FILAS_POR_BLOQUE):
+            crudo = self._crudo(Xt[inicio:inicio + FILAS_POR_BLOQUE])
+            if crudo.shape[1] == 1:
+                # Binario: una sola salida (log-odds de la clase positiva)
+                p = 1.0 / (1.0 + np.exp(-crudo[:, 0]))
+                bloques.append(np.column_stack([1.0 - p, p]))
+            else:
+                e = np.exp(crudo - crudo.max(axis=1, keepdims=True))
+                bloques.append(e / e.sum(axis=1, keepdims=True))
+        if not bloques:
+            return np.empty((0, len(self.classes_)))
+        return np.vstack(bloques)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def cargar(ruta):
+    return ModeloCompacto(ruta)
+
+
+def es_compacto(ruta):
+    return str(ruta).endswith(EXTENSION)
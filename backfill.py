@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import argparse
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import clima_api
+import ingesta
+from registro_modelos import slug
+
+DIRECTORIO_BACKFILL = "backfill_datos"
+DIAS_POR_TRAMO = 30
+MAX_WORKERS = 4
+
+
+# ---------------------------
+# Planificación de tramos
+# ---------------------------
+def dividir_rango(desde, hasta, dias_por_tramo=DIAS_POR_TRAMO):
+    """Divide [desde, hasta] en tramos consecutivos de a lo sumo dias_por_tramo días"""
+    tramos = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=dias_por_tramo - 1), hasta)
+        tramos.append((inicio, fin))
+        inicio = fin + timedelta(days=1)
+    return tramos
+
+
+def directorio_sitio(directorio, location):
+    """Tramos y checkpoint de cada sitio en su propio subdirectorio"""
+    return os.path.join(directorio, slug(location))
+
+
+def nombre_tramo(inicio, fin, location):
+    return f"{slug(location)}_{inicio:%Y-%m-%d}_{fin:%Y-%m-%d}.csv"
+
+
+# ---------------------------
+# Checkpoint
+# ---------------------------
+class Checkpoint:
+    """Registro en disco de los tramos terminados; se reescribe de forma atómica"""
+
+    def __init__(self, directorio):
+        self.ruta = os.path.join(directorio, "checkpoint.json")
+        self._lock = threading.Lock()
+        self.completados = {}
+        if os.path.exists(self.ruta):
+            with open(self.ruta, encoding="utf-8") as f:
+                self.completados = json.load(f)
+
+    def terminado(self, nombre, directorio):
+        # Un tramo cuenta como hecho solo si además su archivo existe
+        return nombre in self.completados and os.path.exists(os.path.join(directorio, nombre))
+
+    def marcar(self, nombre, info):
+        with self._lock:
+            self.completados[nombre] = info
+            escribir_atomico(self.ruta, json.dumps(self.completados, indent=2).encode("utf-8"))
+
+
+def escribir_atomico(ruta, contenido):
+    """Escribe a un temporal en el mismo directorio y lo renombra sobre el destino"""
+    temporal = f"{ruta}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+# ---------------------------
+# Descarga de un tramo
+# ---------------------------
+def descargar_tramo(location, inicio, fin, directorio, columnas):
+    """Pide un tramo con include=hours, lo valida y lo guarda en su propio CSV"""
+    respuesta, _, numero_key = clima_api.consultar_timeline(
+        location, inicio.strftime("%Y-%m-%d"), fin.strftime("%Y-%m-%d"), include="hours", usar_cache=False
+    )
+    dias = respuesta["days"]
+    df = ingesta.validar_filas(ingesta.filas_desde_api(dias), columnas)
+    escribir_atomico(os.path.join(directorio, nombre_tramo(inicio, fin, location)), df.to_csv(index=False).encode("utf-8"))
+    return {
+        "dias": len(dias),
+        "filas": len(df),
+        "creditos": respuesta.get("queryCost", len(dias)),
+        "api_key": numero_key,
+    }
+
+
+def backfill(desde, hasta, location=ingesta.LOCATION, directorio=DIRECTORIO_BACKFILL,
+             dias_por_tramo=DIAS_POR_TRAMO, max_workers=MAX_WORKERS, columnas=None):
+    """Descarga [desde, hasta] en tramos concurrentes, saltando los ya terminados"""
+    directorio = directorio_sitio(directorio, location)
+    os.makedirs(directorio, exist_ok=True)
+    columnas = columnas or ingesta.leer_columnas(ingesta.RUTA_DATASET)
+    checkpoint = Checkpoint(directorio)
+
+    pendientes = [
+        (inicio, fin) for inicio, fin in dividir_rango(desde, hasta, dias_por_tramo)
+        if not checkpoint.terminado(nombre_tramo(inicio, fin, location), directorio)
+    ]
+
+    resumen = {"tramos": len(pendientes), "dias": 0, "filas": 0, "creditos": 0, "errores": []}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {
+            pool.submit(descargar_tramo, location, inicio, fin, directorio, columnas): (inicio, fin)
+            for inicio, fin in pendientes
+        }
+        for futuro in as_completed(futuros):
+            inicio, fin = futuros[futuro]
+            try:
+                info = futuro.result()
+            except Exception as e:
+                # El tramo queda sin marcar y se reintenta en la próxima corrida
+                resumen["errores"].append(f"{nombre_tramo(inicio, fin, location)}: {e}")
+                continue
+            checkpoint.marcar(nombre_tramo(inicio, fin, location), info)
+            resumen["dias"] += info["dias"]
+            resumen["filas"] += info["filas"]
+            resumen["creditos"] += info["creditos"]
+
+    resumen["segundos"] = time.perf_counter() - t0
+    resumen["dias_por_segundo"] = resumen["dias"] / resumen["segundos"] if resumen["segundos"] > 0 else 0.0
+    return resumen
+
+
+def unir_tramos(directorio=DIRECTORIO_BACKFILL, ruta=ingesta.RUTA_DATASET, location=ingesta.LOCATION):
+    """Agrega al dataset local (y al almacén SQLite y al archivo particionado, si existen) las filas
+    de los tramos descargados del sitio (dedupe por datetimeEpoch)"""
+    directorio = directorio_sitio(directorio, location)
+    if not os.path.isdir(directorio):
+        return 0
+    prefijo = f"{slug(location)}_"
+    archivos = sorted(f for f in os.listdir(directorio) if f.startswith(prefijo) and f.endswith(".csv"))
+    if not archivos:
+        return 0
+    df = pd.concat([pd.read_csv(os.path.join(directorio, f)) for f in archivos], ignore_index=True)
+    # Igual que en ingesta.ingestar: las horas futuras de hoy son pronóstico y, como el dedupe es
+    # por datetimeEpoch, nunca se reemplazarían por las observadas
+    df = df[df['datetimeEpoch'] <= int(time.time())]
+    escritas = ingesta.anexar_filas(df, ruta, location=location)
+    ingesta.invalidar_dias(escritas['dia'].unique().tolist(), location=location)
+    return len(escritas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill histórico en paralelo con checkpoints")
+    parser.add_argument("desde", help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("hasta", help="Fecha final (YYYY-MM-DD)")
+    parser.add_argument("--location", default=ingesta.LOCATION)
+    parser.add_argument("--directorio", default=DIRECTORIO_BACKFILL)
+    parser.add_argument("--dias-por-tramo", type=int, default=DIAS_POR_TRAMO)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--unir", action="store_true", help="Agregar los tramos al dataset local al terminar")
+    parser.add_argument("--base-url", help="URL base alternativa (por ejemplo el stub local)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        clima_api.BASE_URL = args.base_url
+
+    resumen = backfill(
+        datetime.strptime(args.desde, "%Y-%m-%d").date(),
+        datetime.strptime(args.hasta, "%Y-%m-%d").date(),
+        args.location, args.directorio, args.dias_por_tramo, args.workers,
+    )
+    print(f"Tramos descargados: {resumen['tramos'] - len(resumen['errores'])}/{resumen['tramos']}")
+    print(f"Días: {resumen['dias']} | Filas: {resumen['filas']} | Créditos usados: {resumen['creditos']}")
+    print(f"Throughput: {resumen['dias_por_segundo']:.1f} días/s en {resumen['segundos']:.1f} s")
+    for error in resumen["errores"]:
+        print(f"⚠️ {error}")
+
+    if args.unir:
+        print(f"✅ Filas agregadas al dataset: {unir_tramos(args.directorio, location=args.location)}")
@@ -0,0 +1,51 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from agregacion import resumir_condiciones_diarias, moda_diaria
+from modelo import resumir_target_v3, RUTA_DATASET
+
+
+def escalar(df, factor):
+    """Repite el dataset 'factor' veces corriendo las fechas para simular un histórico más largo"""
+    partes = []
+    dias = pd.to_datetime(df['dia'])
+    span = (dias.max() - dias.min()).days + 1
+    for i in range(factor):
+        parte = df[['dia', 'conditions']].copy()
+        parte['dia'] = dias + pd.Timedelta(days=i * span)
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+
+def cronometrar(funcion, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara las agregaciones con lambdas contra el kernel vectorizado")
+    parser.add_argument("--factores", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    base = pd.read_csv(RUTA_DATASET, usecols=['dia', 'conditions'])
+    print(f"{'filas':>10} {'reducción':<12} {'lambda (s)':>11} {'kernel (s)':>11} {'speedup':>8}  iguales")
+    for factor in args.factores:
+        df = escalar(base, factor)
+
+        t_viejo, viejo = cronometrar(
+            lambda: df.groupby('dia')['conditions'].agg(lambda x: list(x)).apply(resumir_target_v3))
+        t_nuevo, nuevo = cronometrar(lambda: resumir_condiciones_diarias(df['dia'], df['conditions']))
+        iguales = np.array_equal(viejo.to_numpy(), nuevo.to_numpy())
+        print(f"{len(df):>10} {'condiciones':<12} {t_viejo:11.3f} {t_nuevo:11.3f} {t_viejo / t_nuevo:7.1f}x  {iguales}")
+
+        t_viejo, viejo = cronometrar(
+            lambda: df.groupby('dia')['conditions'].agg(lambda x: x.mode()[0] if len(x.mode()) > 0 else x.iloc[0]))
+        t_nuevo, nuevo = cronometrar(lambda: moda_diaria(df['dia'], df['conditions']))
+        iguales = np.array_equal(viejo.to_numpy(), nuevo.to_numpy())
+        print(f"{len(df):>10} {'moda':<12} {t_viejo:11.3f} {t_nuevo:11.3f} {t_viejo / t_nuevo:7.1f}x  {iguales}")
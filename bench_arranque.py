@@ -0,0 +1,82 @@
+import os
+import re
+import ast
+import sys
+import argparse
+import subprocess
+
+# Módulos cuyo costo de importación interesa medir por separado
+MODULOS = [
+    "streamlit", "pandas", "numpy", "altair", "requests", "joblib",
+    "sklearn.ensemble", "clima_api", "prediccion", "prefetch",
+]
+
+RUTA_APP = "main.py"
+
+
+def medir_importacion(sentencia):
+    """Ejecuta la sentencia en un proceso nuevo con -X importtime.
+
+    Devuelve (total_us, {modulo: acumulado_us}) donde total_us es el costo de los
+    módulos que no estaban ya cargados por el intérprete.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", sentencia],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+
+    acumulados = {}
+    total = 0
+    for linea in proceso.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", linea)
+        if not m:
+            continue
+        propio, acumulado, sangria, modulo = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+        acumulados[modulo] = acumulado
+        # Solo las entradas de nivel superior suman al total (las demás ya están dentro)
+        if sangria == 1:
+            total += acumulado
+    return total, acumulados
+
+
+def imports_antes_de_inicio(ruta=RUTA_APP):
+    """Sentencias import que main.py ejecuta antes de empezar a pintar la pestaña Inicio"""
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    sentencias = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.With):
+            break
+        if isinstance(nodo, (ast.Import, ast.ImportFrom)):
+            sentencias.append(ast.unparse(nodo))
+    return "; ".join(sentencias) or "pass"
+
+
+def reporte(modulos=MODULOS, top=8):
+    print("=== Costo de importación por módulo (proceso nuevo, ms) ===")
+    for modulo in modulos:
+        try:
+            total, detalle = medir_importacion(f"import {modulo}")
+        except RuntimeError as e:
+            print(f"{modulo:<20} no disponible ({e})")
+            continue
+        print(f"{modulo:<20} {total / 1000:8.1f}")
+
+    sentencia = imports_antes_de_inicio()
+    total, detalle = medir_importacion(sentencia)
+    print("\n=== Imports previos a la pestaña Inicio ===")
+    print(sentencia)
+    print(f"Total: {total / 1000:.1f} ms")
+    print(f"\nMódulos más costosos (acumulado, ms):")
+    for modulo, us in sorted(detalle.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {modulo:<40} {us / 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reporte de tiempos de importación del arranque de la app")
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("modulos", nargs="*", default=MODULOS)
+    args = parser.parse_args()
+    reporte(args.modulos, args.top)
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+import prediccion
+import artefacto_compacto
+from registro_modelos import obtener_registro
+
+# Se corre en un proceso nuevo: mide el arranque en frío de un worker (imports + carga + 1 predicción)
+_FRIO = r"""
+import time
+inicio = time.perf_counter()
+import json, sys
+import numpy as np
+import pandas as pd
+import prediccion
+modelo = prediccion.cargar_modelo(sys.argv[1])
+cargado = time.perf_counter()
+X = pd.DataFrame([dict(zip(prediccion.FEATURES, np.zeros(len(prediccion.FEATURES))))])
+modelo.predict_proba(X)
+listo = time.perf_counter()
+
+privada = rss = 0
+with open("/proc/self/smaps_rollup") as f:
+    for linea in f:
+        campo, valor = linea.split(":", 1)
+        if campo in ("Private_Clean", "Private_Dirty"):
+            privada += int(valor.split()[0]) / 1024
+        elif campo == "Rss":
+            rss = int(valor.split()[0]) / 1024
+print(json.dumps({"carga_s": cargado - inicio, "primera_s": listo - inicio, "rss_mb": rss, "privada_mb": privada}))
+"""
+
+
+def frio(ruta, repeticiones=3):
+    """Mejor de 'repeticiones' arranques en procesos nuevos"""
+    mejores = None
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", _FRIO, ruta], capture_output=True, text=True, check=True,
+                                cwd=os.getcwd(), env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))})
+        medida = json.loads(salida.stdout.strip().splitlines()[-1])
+        if mejores is None or medida["primera_s"] < mejores["primera_s"]:
+            mejores = medida
+    return mejores
+
+
+def cronometrar(funcion, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def matriz_prueba(filas):
+    """Filas al azar con el rango típico de cada feature (alcanza para comparar probabilidades)"""
+    import pandas as pd
+    rnd = np.random.default_rng(0)
+    X = pd.DataFrame(rnd.normal(size=(filas, len(prediccion.FEATURES))) * 10 + 15, columns=prediccion.FEATURES)
+    X["rain_yesterday"] = rnd.integers(0, 2, filas)
+    return X
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el pickle del modelo contra el paquete de arrays (.arr)")
+    parser.add_argument("--modelo", help="Pipeline .pkl (por defecto, el de mañana del registro)")
+    parser.add_argument("--filas", type=int, default=10_000, help="Filas para medir la predicción por lotes")
+    args = parser.parse_args()
+
+    ruta_pkl = args.modelo or obtener_registro().ruta("Mendoza,Argentina", 1)
+    if artefacto_compacto.es_compacto(ruta_pkl):
+        ruta_pkl = os.path.splitext(ruta_pkl)[0] + ".pkl"
+
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta_arr = os.path.join(temporal, "modelo" + artefacto_compacto.EXTENSION)
+        artefacto_compacto.exportar(prediccion.cargar_modelo(ruta_pkl), ruta_arr)
+
+        X = matriz_prueba(args.filas)
+        medidas = {}
+        for nombre, ruta in (("pickle", ruta_pkl), ("compacto", ruta_arr)):
+            t_carga, modelo = cronometrar(lambda: prediccion.cargar_modelo(ruta))
+            t_fila, _ = cronometrar(lambda: modelo.predict_proba(X.iloc[:1]), 20)
+            t_lote, probs = cronometrar(lambda: modelo.predict_proba(X))
+            medidas[nombre] = {"mb": os.path.getsize(ruta) / 1e6, "carga_s": t_carga, "fila_s": t_fila,
+                               "lote_s": t_lote, "probs": probs, "frio": frio(ruta)}
+
+    print(f"{'formato':<10} {'MB':>6} {'carga ms':>9} {'frío ms':>8} {'RSS MB':>7} {'privada MB':>10} "
+          f"{'1 fila ms':>9} {f'{args.filas} filas ms':>15}")
+    for nombre, m in medidas.items():
+        print(f"{nombre:<10} {m['mb']:6.2f} {m['carga_s'] * 1000:9.1f} {m['frio']['primera_s'] * 1000:8.0f} "
+              f"{m['frio']['rss_mb']:7.1f} {m['frio']['privada_mb']:10.1f} {m['fila_s'] * 1000:9.2f} "
+              f"{m['lote_s'] * 1000:15.1f}")
+    diferencia = np.abs(medidas["pickle"]["probs"] - medidas["compacto"]["probs"]).max()
+    iguales = (medidas["pickle"]["probs"].argmax(axis=1) == medidas["compacto"]["probs"].argmax(axis=1)).mean()
+    print(f"Máxima diferencia de probabilidad: {diferencia:.2e} | misma clase en {iguales:.2%} de las filas")
@@ -0,0 +1,34 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import modelo_horario
+from bench_motor import cronometrar
+from bench_particiones import escalar
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempos del modelo horario con series de 10^4 a 10^6 horas")
+    parser.add_argument("--datos", default=modelo_horario.RUTA_DATASET, help="CSV horario")
+    parser.add_argument("--factores", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--max-iter", type=int, default=50, help="Iteraciones del boosting (el tiempo escala lineal)")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.datos)
+    print(f"{'filas':>10} {'matriz (MB)':>12} {'features (s)':>13} {'entrenar (s)':>13} "
+          f"{'24 h (ms)':>10} {'lote 10^5 (s)':>14}")
+    for factor in args.factores:
+        crudo = escalar(base, factor)
+        t_features, (serie, (X, y, t, h)) = cronometrar(
+            lambda: (s := modelo_horario.serie_horaria(crudo), modelo_horario.matriz_entrenamiento(s)),
+            args.repeticiones)
+        t_entrenar, clasificador = cronometrar(
+            lambda: modelo_horario.entrenar(X, y, max_iter=args.max_iter), args.repeticiones)
+        modelo_h = modelo_horario.ModeloHorario(clasificador, modelo_horario.HORAS)
+        # Las próximas 24 horas en una llamada, y un lote grande para ver el costo por fila
+        t_24, _ = cronometrar(lambda: modelo_h.proximas(crudo.tail(modelo_horario.HISTORIA + 1)), 5)
+        lote = X[np.random.default_rng(0).integers(0, len(X), 100_000)]
+        t_lote, _ = cronometrar(lambda: modelo_h.predict_proba(lote), args.repeticiones)
+        print(f"{len(crudo):>10} {X.nbytes / 1e6:>12.0f} {t_features:>13.2f} {t_entrenar:>13.2f} "
+              f"{t_24 * 1000:>10.1f} {t_lote:>14.2f}")
@@ -0,0 +1,63 @@
+import time
+import argparse
+import pandas as pd
+
+import modelo
+import motor_datos
+
+COLUMNAS_EXPLORACION = ['dia', 'datetime_completo', 'temp', 'feelslike', 'humidity', 'conditions']
+
+
+def escalar(df, factor):
+    """Repite el dataset horario 'factor' veces corriendo las fechas para simular un histórico más largo"""
+    partes = []
+    span = (df['datetime_completo'].max().normalize() - df['datetime_completo'].min().normalize()).days + 1
+    for i in range(factor):
+        parte = df.copy()
+        desplazamiento = pd.Timedelta(days=i * span)
+        parte['datetime_completo'] = df['datetime_completo'] + desplazamiento
+        parte['dia'] = df['dia'] + desplazamiento
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+
+def cronometrar(funcion, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def iguales(a, b):
+    try:
+        pd.testing.assert_frame_equal(a, b, check_exact=True)
+        return True
+    except AssertionError:
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara los motores pandas y polars en las agregaciones horario → diario")
+    parser.add_argument("--datos", default=modelo.RUTA_DATASET, help="CSV horario o almacén .sqlite")
+    parser.add_argument("--factores", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    motor_datos.motor_activo("polars")
+    base = modelo.cargar_datos(args.datos)
+    print(f"{'filas':>10} {'etapa':<14} {'pandas (s)':>11} {'polars (s)':>11} {'speedup':>8}  iguales")
+    for factor in args.factores:
+        df = escalar(base, factor)
+
+        t_pd, r_pd = cronometrar(lambda: modelo.agregar_diario(df, motor="pandas"), args.repeticiones)
+        t_pl, r_pl = cronometrar(lambda: modelo.agregar_diario(df, motor="polars"), args.repeticiones)
+        print(f"{len(df):>10} {'modelo.py':<14} {t_pd:11.3f} {t_pl:11.3f} {t_pd / t_pl:7.1f}x  {iguales(r_pd, r_pl)}")
+
+        # preparar_exploracion agrega columnas al DataFrame que recibe: cada corrida con su copia
+        horario = df[COLUMNAS_EXPLORACION]
+        t_pd, r_pd = cronometrar(lambda: motor_datos.preparar_exploracion(horario.copy(), "pandas"), args.repeticiones)
+        t_pl, r_pl = cronometrar(lambda: motor_datos.preparar_exploracion(horario.copy(), "polars"), args.repeticiones)
+        mismos = iguales(r_pd[0], r_pl[0]) and iguales(r_pd[1], r_pl[1])
+        print(f"{len(df):>10} {'exploración':<14} {t_pd:11.3f} {t_pl:11.3f} {t_pd / t_pl:7.1f}x  {mismos}")
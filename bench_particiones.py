@@ -0,0 +1,57 @@
+import os
+import argparse
+import tempfile
+import pandas as pd
+
+import modelo
+import motor_datos
+import archivo_particionado
+from bench_motor import cronometrar, iguales
+
+
+def escalar(df, factor):
+    """Repite el CSV horario 'factor' veces corriendo fechas y epochs (así cada copia cae en otros años)"""
+    partes = []
+    dias = pd.to_datetime(df['dia'])
+    span = (dias.max() - dias.min()).days + 1
+    for i in range(factor):
+        parte = df.copy()
+        desplazamiento = pd.Timedelta(days=i * span)
+        parte['dia'] = (dias + desplazamiento).dt.strftime('%Y-%m-%d')
+        parte['datetime_completo'] = (pd.to_datetime(df['datetime_completo']) + desplazamiento).dt.strftime('%Y-%m-%d %H:%M:%S')
+        parte['datetimeEpoch'] = df['datetimeEpoch'] + int(desplazamiento.total_seconds())
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregación horario → diario de una pasada contra el archivo particionado por año")
+    parser.add_argument("--datos", default=modelo.RUTA_DATASET, help="CSV horario")
+    parser.add_argument("--factores", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeticiones", type=int, default=1)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.datos)
+    print(f"Núcleos: {os.cpu_count()}")
+    print(f"{'filas':>10} {'años':>5} {'etapa':<14} {'procesos':>9} {'tiempo (s)':>11} {'speedup':>8}  iguales")
+    for factor in args.factores:
+        crudo = escalar(base, factor)
+        with tempfile.TemporaryDirectory() as directorio:
+            años = archivo_particionado.escribir(crudo, directorio=directorio)
+            etapas = {
+                "modelo.py": (
+                    lambda: modelo.agregar_diario(modelo.preparar_horario(crudo.copy())),
+                    lambda p: archivo_particionado.agregar_diario(directorio=directorio, procesos=p),
+                ),
+                "exploración": (
+                    lambda: motor_datos.preparar_exploracion(crudo[archivo_particionado.COLUMNAS_EXPLORACION].copy())[1],
+                    lambda p: archivo_particionado.preparar_exploracion(directorio=directorio, procesos=p)[1],
+                ),
+            }
+            for etapa, (una_pasada, particionado) in etapas.items():
+                t_base, r_base = cronometrar(una_pasada, args.repeticiones)
+                print(f"{len(crudo):>10} {len(años):>5} {etapa:<14} {'una pasada':>9} {t_base:11.3f}")
+                for procesos in args.procesos:
+                    t, r = cronometrar(lambda: particionado(procesos), args.repeticiones)
+                    print(f"{len(crudo):>10} {len(años):>5} {etapa:<14} {procesos:>9} {t:11.3f} {t_base / t:7.1f}x  {iguales(r_base, r)}")
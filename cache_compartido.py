@@ -0,0 +1,303 @@
+import os
+import time
+import atexit
+import pickle
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+
+# Se puede apuntar a otro archivo (por ejemplo una caché vacía para pruebas de carga)
+RUTA = os.environ.get("CACHE_COMPARTIDO_RUTA", os.path.join("cache", "compartido.sqlite"))
+
+# Tamaño máximo total de los valores guardados; al pasarlo se desalojan los menos usados
+MAX_BYTES = int(os.environ.get("CACHE_COMPARTIDO_MB", "256")) * 1024 * 1024
+
+# Las lecturas no escriben: hits/misses y la última lectura de cada entrada (para el LRU) se
+# juntan en memoria y se vuelcan cada INTERVALO_VOLCADO segundos, en la próxima escritura o al
+# pedir las estadísticas. El volcado de una lectura no espera el lock: si hay un escritor se
+# deja para la vez siguiente, y lo que no se volcó al cerrar el proceso se pierde
+INTERVALO_VOLCADO = 5.0
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    espacio  TEXT NOT NULL,
+    clave    TEXT NOT NULL,
+    valor    BLOB NOT NULL,
+    bytes    INTEGER NOT NULL,
+    creado   REAL NOT NULL,
+    expira   REAL,
+    accedido REAL NOT NULL,
+    desde    TEXT,
+    hasta    TEXT,
+    PRIMARY KEY (espacio, clave)
+);
+CREATE INDEX IF NOT EXISTS entradas_accedido ON entradas (accedido);
+CREATE INDEX IF NOT EXISTS entradas_dias ON entradas (desde, hasta);
+CREATE TABLE IF NOT EXISTS estadisticas (
+    espacio    TEXT PRIMARY KEY,
+    hits       INTEGER NOT NULL DEFAULT 0,
+    misses     INTEGER NOT NULL DEFAULT 0,
+    escrituras INTEGER NOT NULL DEFAULT 0,
+    desalojos  INTEGER NOT NULL DEFAULT 0,
+    expiradas  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CacheCompartido:
+    """Caché clave/valor en un archivo SQLite compartido por todos los procesos del host.
+
+    SQLite se encarga del bloqueo entre procesos (modo WAL: los lectores no esperan a los
+    escritores) y cada escritura es una transacción, así que nunca se lee un valor a medias.
+    Las lecturas no toman el lock de escritura (ver INTERVALO_VOLCADO).
+    Los valores se guardan con pickle, agrupados por 'espacio' (api, predicciones, ...).
+    Cada entrada puede tener TTL y un rango de días [desde, hasta] para poder invalidarla
+    cuando ingesta.py actualiza esos días.
+    """
+
+    def __init__(self, ruta=RUTA, max_bytes=MAX_BYTES):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pendientes = Counter()
+        self._accesos = {}
+        self._ultimo_volcado = time.monotonic()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion().executescript(_ESQUEMA)
+        atexit.register(self._volcar, False)
+
+    def _conexion(self):
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def _contar(self, conexion, espacio, campo, n=1):
+        conexion.execute("INSERT OR IGNORE INTO estadisticas (espacio) VALUES (?)", (espacio,))
+        conexion.execute(f"UPDATE estadisticas SET {campo} = {campo} + ? WHERE espacio = ?", (n, espacio))
+
+    # ---------------------------
+    # Estadísticas de lectura en memoria
+    # ---------------------------
+    def _anotar(self, espacio, campo, clave=None, ahora=None):
+        with self._lock:
+            self._pendientes[(espacio, campo)] += 1
+            if clave is not None:
+                self._accesos[(espacio, clave)] = ahora
+            toca = time.monotonic() - self._ultimo_volcado >= INTERVALO_VOLCADO
+        if toca:
+            self._volcar(esperar=False)
+
+    def _tomar_pendientes(self):
+        with self._lock:
+            pendientes, accesos = self._pendientes, self._accesos
+            self._pendientes, self._accesos = Counter(), {}
+            self._ultimo_volcado = time.monotonic()
+        return pendientes, accesos
+
+    def _devolver(self, pendientes, accesos):
+        """Vuelve a dejar en memoria lo que no se pudo volcar"""
+        with self._lock:
+            self._pendientes.update(pendientes)
+            for llave, ahora in accesos.items():
+                self._accesos[llave] = max(ahora, self._accesos.get(llave, ahora))
+
+    def _escribir_pendientes(self, conexion, pendientes, accesos):
+        """Vuelca contadores y accesos (con la transacción de escritura ya tomada)"""
+        for (espacio, campo), n in pendientes.items():
+            self._contar(conexion, espacio, campo, n)
+        conexion.executemany(
+            "UPDATE entradas SET accedido = MAX(accedido, ?) WHERE espacio = ? AND clave = ?",
+            [(ahora, espacio, clave) for (espacio, clave), ahora in accesos.items()],
+        )
+
+    def _volcar(self, esperar=True):
+        """Pasa a la base los contadores de lectura; con esperar=False se rinde si está bloqueada"""
+        pendientes, accesos = self._tomar_pendientes()
+        if not pendientes and not accesos:
+            return
+        conexion = self._conexion()
+        if not esperar:
+            conexion.execute("PRAGMA busy_timeout = 0")
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self._devolver(pendientes, accesos)
+            if esperar:
+                raise
+            return
+        finally:
+            if not esperar:
+                conexion.execute("PRAGMA busy_timeout = 30000")
+        try:
+            self._escribir_pendientes(conexion, pendientes, accesos)
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            self._devolver(pendientes, accesos)
+            raise
+
+    # ---------------------------
+    # Lectura y escritura
+    # ---------------------------
+    def obtener(self, espacio, clave, defecto=None):
+        """Valor guardado o 'defecto' si no está o venció (las vencidas se borran al escribir)"""
+        ahora = time.time()
+        fila = self._conexion().execute(
+            "SELECT valor, expira FROM entradas WHERE espacio = ? AND clave = ?", (espacio, clave)
+        ).fetchone()
+        if fila is None or (fila[1] is not None and fila[1] <= ahora):
+            self._anotar(espacio, "misses")
+            return defecto
+        self._anotar(espacio, "hits", clave, ahora)
+        return pickle.loads(fila[0])
+
+    def obtener_rango(self, espacio, prefijo, desde, hasta, defecto=None, contar=True):
+        """(clave, valor) de la entrada vigente más corta cuya clave empieza con 'prefijo' y cuyo
+        rango de días cubre [desde, hasta]; 'defecto' si no hay ninguna.
+
+        Con contar=False solo consulta (no suma hits/misses ni cuenta como uso para el LRU).
+        """
+        ahora = time.time()
+        fila = self._conexion().execute(
+            "SELECT clave, valor FROM entradas WHERE espacio = ? AND substr(clave, 1, ?) = ? "
+            "AND desde <= ? AND hasta >= ? AND (expira IS NULL OR expira > ?) "
+            "ORDER BY julianday(hasta) - julianday(desde) LIMIT 1",
+            (espacio, len(prefijo), prefijo, desde, hasta, ahora),
+        ).fetchone()
+        if contar:
+            if fila is None:
+                self._anotar(espacio, "misses")
+            else:
+                self._anotar(espacio, "hits", fila[0], ahora)
+        return defecto if fila is None else (fila[0], pickle.loads(fila[1]))
+
+    def guardar(self, espacio, clave, valor, ttl=None, desde=None, hasta=None):
+        """Guarda (o reemplaza) la entrada; desde/hasta son días 'YYYY-MM-DD' de los que depende"""
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        ahora = time.time()
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        # La escritura ya tiene el lock: se aprovecha para volcar las lecturas antes de desalojar
+        pendientes, accesos = self._tomar_pendientes()
+        try:
+            self._escribir_pendientes(conexion, pendientes, accesos)
+            conexion.execute(
+                "INSERT OR REPLACE INTO entradas (espacio, clave, valor, bytes, creado, expira, accedido, desde, hasta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (espacio, clave, datos, len(datos), ahora, None if ttl is None else ahora + ttl, ahora,
+                 desde, hasta or desde),
+            )
+            self._contar(conexion, espacio, "escrituras")
+            self._desalojar(conexion, ahora)
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            self._devolver(pendientes, accesos)
+            raise
+        return valor
+
+    def obtener_o_calcular(self, espacio, clave, calcular, ttl=None, desde=None, hasta=None):
+        _falta = object()
+        valor = self.obtener(espacio, clave, _falta)
+        if valor is _falta:
+            valor = self.guardar(espacio, clave, calcular(), ttl, desde, hasta)
+        return valor
+
+    # ---------------------------
+    # Desalojo e invalidación
+    # ---------------------------
+    def _desalojar(self, conexion, ahora):
+        """Borra las entradas vencidas y, si todavía se pasa de max_bytes, las menos usadas"""
+        for espacio, n in conexion.execute(
+            "SELECT espacio, COUNT(*) FROM entradas WHERE expira IS NOT NULL AND expira <= ? GROUP BY espacio", (ahora,)
+        ).fetchall():
+            self._contar(conexion, espacio, "expiradas", n)
+        conexion.execute("DELETE FROM entradas WHERE expira IS NOT NULL AND expira <= ?", (ahora,))
+
+        total = conexion.execute("SELECT COALESCE(SUM(bytes), 0) FROM entradas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        sobrante = total - self.max_bytes
+        for espacio, clave, n_bytes in conexion.execute(
+            "SELECT espacio, clave, bytes FROM entradas ORDER BY accedido"
+        ).fetchall():
+            if sobrante <= 0:
+                break
+            conexion.execute("DELETE FROM entradas WHERE espacio = ? AND clave = ?", (espacio, clave))
+            self._contar(conexion, espacio, "desalojos")
+            sobrante -= n_bytes
+
+    def invalidar_dias(self, dias):
+        """Borra las entradas cuyo rango de días incluye alguno de los indicados"""
+        conexion = self._conexion()
+        borradas = 0
+        for dia in dias:
+            borradas += conexion.execute(
+                "DELETE FROM entradas WHERE desde IS NOT NULL AND desde <= ? AND hasta >= ?", (dia, dia)
+            ).rowcount
+        return borradas
+
+    def vaciar(self, espacio=None):
+        conexion = self._conexion()
+        if espacio is None:
+            return conexion.execute("DELETE FROM entradas").rowcount
+        return conexion.execute("DELETE FROM entradas WHERE espacio = ?", (espacio,)).rowcount
+
+    def estadisticas(self):
+        """{espacio: {entradas, bytes, hits, misses, escrituras, desalojos, expiradas, tasa_hits}}"""
+        self._volcar()
+        conexion = self._conexion()
+        resultado = {}
+        for espacio, hits, misses, escrituras, desalojos, expiradas in conexion.execute(
+            "SELECT espacio, hits, misses, escrituras, desalojos, expiradas FROM estadisticas ORDER BY espacio"
+        ):
+            resultado[espacio] = {
+                "entradas": 0, "bytes": 0, "hits": hits, "misses": misses, "escrituras": escrituras,
+                "desalojos": desalojos, "expiradas": expiradas,
+                "tasa_hits": round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+        for espacio, entradas, n_bytes in conexion.execute(
+            "SELECT espacio, COUNT(*), SUM(bytes) FROM entradas GROUP BY espacio"
+        ):
+            resultado.setdefault(espacio, {})
+            resultado[espacio].update({"entradas": entradas, "bytes": n_bytes})
+        return resultado
+
+
+_compartidos = {}
+_lock_compartidos = threading.Lock()
+
+
+def obtener_cache(ruta=None):
+    """Instancia única por proceso para cada archivo (las conexiones son por hilo)"""
+    ruta = ruta or RUTA
+    with _lock_compartidos:
+        if ruta not in _compartidos:
+            _compartidos[ruta] = CacheCompartido(ruta)
+        return _compartidos[ruta]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estadísticas y mantenimiento de la caché compartida")
+    parser.add_argument("--ruta", default=RUTA)
+    parser.add_argument("--vaciar", nargs="?", const="", metavar="ESPACIO",
+                        help="Borra todas las entradas (o solo las de ESPACIO)")
+    args = parser.parse_args()
+
+    cache = CacheCompartido(args.ruta)
+    if args.vaciar is not None:
+        print(f"{cache.vaciar(args.vaciar or None)} entradas borradas")
+    print(f"{'espacio':<14} {'entradas':>8} {'MB':>8} {'hits':>8} {'misses':>8} {'tasa':>6} {'desalojos':>9} {'expiradas':>9}")
+    for espacio, e in cache.estadisticas().items():
+        tasa = "-" if e.get("tasa_hits") is None else f"{e['tasa_hits']:.0%}"
+        print(f"{espacio:<14} {e.get('entradas', 0):>8} {e.get('bytes', 0) / 1e6:8.2f} {e.get('hits', 0):>8} "
+              f"{e.get('misses', 0):>8} {tasa:>6} {e.get('desalojos', 0):>9} {e.get('expiradas', 0):>9}")
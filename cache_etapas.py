@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import inspect
+import hashlib
+import builtins
+import importlib.util
+import joblib
+from concurrent.futures import ProcessPoolExecutor
+
+DIRECTORIO = os.path.join("cache", "etapas")
+
+# Tamaño máximo del directorio; podar() borra primero los resultados usados hace más tiempo
+# (cada edición de una etapa deja un archivo nuevo y el de la clave vieja ya no se lee)
+MAX_BYTES = int(os.environ.get("CACHE_ETAPAS_MB", "512")) * 1024 * 1024
+
+
+class Artefacto:
+    """Resultado de una etapa (o archivo de entrada) junto con la clave que lo identifica.
+
+    Si viene de caché, el valor se lee del disco recién cuando alguien lo usa, así una
+    etapa que no hace falta recalcular tampoco obliga a cargar sus entradas.
+    """
+
+    _SIN_CARGAR = object()
+
+    def __init__(self, valor, clave, etapa, ruta=None):
+        self._valor = valor
+        self.clave = clave
+        self.etapa = etapa
+        self.ruta = ruta
+
+    @property
+    def valor(self):
+        if self._valor is Artefacto._SIN_CARGAR:
+            self._valor = joblib.load(self.ruta)
+        return self._valor
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    h = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for parte in iter(lambda: f.read(bloque), b""):
+            h.update(parte)
+    return h.hexdigest()[:16]
+
+
+def hash_texto(*partes):
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------
+# Código de una etapa
+# ---------------------------
+REPO = os.path.dirname(os.path.abspath(__file__))
+_codigos = {}
+
+
+def _del_repo(objeto):
+    archivo = getattr(inspect.getmodule(objeto), "__file__", None)
+    return archivo is not None and os.path.dirname(os.path.abspath(archivo)) == REPO
+
+
+def _nombres(codigo):
+    """Nombres globales y atributos que usa un code object (incluidas funciones internas y lambdas)"""
+    nombres = set(codigo.co_names)
+    for constante in codigo.co_consts:
+        if inspect.iscode(constante):
+            nombres |= _nombres(constante)
+    return nombres
+
+
+def _archivo_de_modulo(nombre):
+    """Archivo del repo de un módulo importado dentro de la función (None si no es del repo)"""
+    try:
+        spec = importlib.util.find_spec(nombre)
+    except (ImportError, ValueError):
+        return None
+    origen = getattr(spec, "origin", None) if spec else None
+    if origen and origen.endswith(".py") and os.path.dirname(os.path.abspath(origen)) == REPO:
+        return origen
+    return None
+
+
+def _valor(nombre, valor, partes, vistos):
+    """Agrega a 'partes' lo que identifica a un valor global: el código si es una función o clase
+    del repo, su repr si es una constante (nombre en mayúsculas, como en todo el repo)"""
+    if inspect.isfunction(valor) or inspect.isclass(valor):
+        if _del_repo(valor):
+            _recorrer(valor, partes, vistos)
+    elif inspect.ismodule(valor):
+        return
+    elif nombre.isupper():
+        if isinstance(valor, (list, tuple, set, frozenset, dict)):
+            elementos = valor.values() if isinstance(valor, dict) else valor
+            for elemento in elementos:
+                if inspect.isfunction(elemento) or inspect.isclass(elemento):
+                    _valor(nombre, elemento, partes, vistos)
+        # Los sets se ordenan: su orden cambia entre procesos (hash aleatorio de los strings)
+        texto = repr(sorted(valor, key=repr) if isinstance(valor, (set, frozenset)) else valor)
+        partes.append(f"{nombre}={texto if ' at 0x' not in texto else type(valor).__name__}")
+
+
+def _recorrer(objeto, partes, vistos):
+    if id(objeto) in vistos:
+        return
+    vistos.add(id(objeto))
+    try:
+        partes.append(inspect.getsource(objeto))
+    except (OSError, TypeError):
+        return
+    funciones = [m for m in vars(objeto).values() if inspect.isfunction(m)] if inspect.isclass(objeto) else [objeto]
+    for funcion in funciones:
+        nombres = sorted(_nombres(funcion.__code__))
+        for nombre in nombres:
+            if nombre in funcion.__globals__:
+                valor = funcion.__globals__[nombre]
+                if inspect.ismodule(valor) and _del_repo(valor):
+                    # modulo.algo: solo lo que la función usa del módulo
+                    for atributo in nombres:
+                        if atributo in vars(valor):
+                            _valor(atributo, vars(valor)[atributo], partes, vistos)
+                else:
+                    _valor(nombre, valor, partes, vistos)
+            elif not hasattr(builtins, nombre):
+                # Módulo importado dentro de la función: cuenta el archivo entero
+                archivo = _archivo_de_modulo(nombre)
+                if archivo and archivo not in vistos:
+                    vistos.add(archivo)
+                    partes.append(hash_archivo(archivo))
+
+
+def codigo_etapa(funcion):
+    """Hash del código de la etapa y de todo lo del repo que usa (funciones, clases y constantes,
+    recorridas hacia abajo): editar una función auxiliar también invalida la etapa"""
+    if funcion not in _codigos:
+        partes = []
+        _recorrer(funcion, partes, set())
+        _codigos[funcion] = hash_texto(*partes)
+    return _codigos[funcion]
+
+
+def _tocar(ruta):
+    """Marca el resultado como usado (mtime) para el orden de podar()"""
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+
+class Ejecutor:
+    """Corre etapas memoizadas en disco.
+
+    La clave de cada etapa combina su nombre, el hash de su código fuente (y el de lo que
+    llama dentro del repo, ver codigo_etapa), las claves de sus entradas y sus parámetros;
+    si nada de eso cambió, se lee el resultado guardado.
+    """
+
+    def __init__(self, directorio=DIRECTORIO, usar_cache=True):
+        self.directorio = directorio
+        self.usar_cache = usar_cache
+        self.registro = []
+        os.makedirs(directorio, exist_ok=True)
+
+    def archivo(self, ruta):
+        """Entrada externa: la clave es el hash del contenido, no la ruta ni el mtime"""
+        clave = hash_archivo(ruta)
+        self.registro.append({"etapa": os.path.basename(ruta), "clave": clave, "estado": "entrada",
+                              "segundos": 0.0, "depende": []})
+        return Artefacto(ruta, clave, os.path.basename(ruta))
+
+    def _ubicar(self, funcion, entradas, params):
+        nombre = funcion.__name__
+        clave = hash_texto(
+            nombre,
+            codigo_etapa(funcion),
+            *[e.clave for e in entradas],
+            json.dumps(params, sort_keys=True, default=str),
+        )
+        return nombre, clave, os.path.join(self.directorio, f"{nombre}-{clave}.joblib")
+
+    def _guardar(self, valor, ruta):
+        temporal = f"{ruta}.tmp-{os.getpid()}"
+        joblib.dump(valor, temporal)
+        os.replace(temporal, ruta)
+
+    def _registrar(self, nombre, clave, estado, segundos, entradas):
+        self.registro.append({"etapa": nombre, "clave": clave, "estado": estado, "segundos": segundos,
+                              "depende": [e.etapa for e in entradas]})
+
+    def correr(self, funcion, *entradas, **params):
+        nombre, clave, ruta = self._ubicar(funcion, entradas, params)
+
+        inicio = time.perf_counter()
+        if self.usar_cache and os.path.exists(ruta):
+            valor = Artefacto._SIN_CARGAR
+            estado = "hit"
+            _tocar(ruta)
+        else:
+            valor = funcion(*[e.valor for e in entradas], **params)
+            self._guardar(valor, ruta)
+            estado = "miss"
+
+        self._registrar(nombre, clave, estado, time.perf_counter() - inicio, entradas)
+        return Artefacto(valor, clave, nombre, ruta)
+
+    def correr_en_paralelo(self, funcion, llamadas, procesos=None):
+        """Como correr() para varias llamadas [(entradas, params), ...] a la misma función.
+
+        Las que no están en caché se calculan en procesos aparte (la función tiene que
+        estar definida a nivel de módulo); con un solo proceso se calculan acá mismo.
+        """
+        artefactos = [None] * len(llamadas)
+        pendientes = []
+        for i, (entradas, params) in enumerate(llamadas):
+            nombre, clave, ruta = self._ubicar(funcion, entradas, params)
+            if self.usar_cache and os.path.exists(ruta):
+                _tocar(ruta)
+                self._registrar(nombre, clave, "hit", 0.0, entradas)
+                artefactos[i] = Artefacto(Artefacto._SIN_CARGAR, clave, nombre, ruta)
+            else:
+                pendientes.append((i, nombre, clave, ruta))
+
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        inicio = time.perf_counter()
+        if procesos <= 1:
+            valores = (funcion(*[e.valor for e in llamadas[i][0]], **llamadas[i][1]) for i, *_ in pendientes)
+            for (i, nombre, clave, ruta), valor in zip(pendientes, valores):
+                self._guardar(valor, ruta)
+                self._registrar(nombre, clave, "miss", time.perf_counter() - inicio, llamadas[i][0])
+                artefactos[i] = Artefacto(valor, clave, nombre, ruta)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = [pool.submit(funcion, *[e.valor for e in llamadas[i][0]], **llamadas[i][1])
+                           for i, *_ in pendientes]
+                for (i, nombre, clave, ruta), futuro in zip(pendientes, futuros):
+                    valor = futuro.result()
+                    self._guardar(valor, ruta)
+                    # Tiempo hasta que terminó esta llamada, contado desde que arrancó el lote
+                    self._registrar(nombre, clave, "miss", time.perf_counter() - inicio, llamadas[i][0])
+                    artefactos[i] = Artefacto(valor, clave, nombre, ruta)
+        return artefactos
+
+    def podar(self, max_bytes=MAX_BYTES):
+        """Borra los resultados menos usados hasta que el directorio entre en max_bytes; nunca los
+        de esta corrida. Devuelve (archivos borrados, bytes liberados)."""
+        en_uso = {f"{r['etapa']}-{r['clave']}.joblib" for r in self.registro}
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".joblib"):
+                continue
+            try:
+                estado = os.stat(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, nombre))
+        total = sum(n_bytes for _, n_bytes, _ in archivos)
+        borrados = liberados = 0
+        for _, n_bytes, nombre in sorted(archivos):
+            if total <= max_bytes:
+                break
+            if nombre in en_uso:
+                continue
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                continue
+            total -= n_bytes
+            borrados += 1
+            liberados += n_bytes
+        return borrados, liberados
+
+    def calculada(self, artefacto):
+        """True si la etapa que produjo el artefacto se recalculó en esta corrida"""
+        return any(r["clave"] == artefacto.clave and r["estado"] == "miss" for r in self.registro)
+
+    def reporte(self):
+        """Grafo de dependencias con el estado de cada etapa (entrada / hit / miss)"""
+        lineas = ["Etapa                     Estado   Tiempo    Clave             Depende de"]
+        for r in self.registro:
+            lineas.append(
+                f"{r['etapa']:<25} {r['estado']:<8} {r['segundos']:7.2f}s  {r['clave']:<16}  "
+                f"{', '.join(r['depende']) or '-'}"
+            )
+        hits = sum(r["estado"] == "hit" for r in self.registro)
+        misses = sum(r["estado"] == "miss" for r in self.registro)
+        lineas.append(f"{hits} etapas leídas de caché, {misses} recalculadas")
+        return "\n".join(lineas)
@@ -0,0 +1,51 @@
+import time
+from datetime import date, timedelta
+
+from cache_compartido import obtener_cache
+
+ESPACIO = "predicciones"
+
+# Las predicciones del día actual caducan (la API sigue actualizando el día); las pasadas no
+TTL_HOY = 60 * 60
+
+
+def _clave(version, location, fecha):
+    return f"{version}|{location}|{fecha:%Y-%m-%d}"
+
+
+def buscar(version, location, fecha, features_hash=None, hoy=None, cache=None):
+    """Devuelve la entrada guardada para (versión, ubicación, fecha[, hash]) o None"""
+    cache = cache or obtener_cache()
+    entrada = cache.obtener(ESPACIO, _clave(version, location, fecha))
+    if entrada is None:
+        return None
+    if features_hash and entrada["features_hash"] != features_hash:
+        return None
+    # Una entrada guardada antes de que la fecha pasara a ser "hoy" también caduca
+    hoy = hoy or date.today()
+    if fecha >= hoy and time.time() - entrada["creado"] > TTL_HOY:
+        return None
+    return entrada
+
+
+def guardar(version, location, fecha, features_hash, clase, probabilidades, clases, real=None,
+            features=None, hoy=None, cache=None):
+    """Guarda la predicción en la caché compartida entre procesos y devuelve la entrada"""
+    cache = cache or obtener_cache()
+    entrada = {
+        "version": version,
+        "location": location,
+        "fecha": f"{fecha:%Y-%m-%d}",
+        "features_hash": features_hash,
+        "clase": str(clase),
+        "probabilidades": [float(p) for p in probabilidades],
+        "clases": [str(c) for c in clases],
+        "real": real,
+        "features": features,
+        "creado": time.time(),
+    }
+    hoy = hoy or date.today()
+    # Depende de día-2..fecha: ingesta.invalidar_dias la borra si cambia cualquiera de esos días
+    return cache.guardar(ESPACIO, _clave(version, location, fecha), entrada,
+                         ttl=TTL_HOY if fecha >= hoy else None,
+                         desde=f"{fecha - timedelta(days=2):%Y-%m-%d}", hasta=entrada["fecha"])
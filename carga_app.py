@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from stub_api import StubVisualCrossing
+from servicio_prediccion import percentil
+
+RUTA_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+PAGINAS = ["inicio", "historico", "exploracion"]
+
+
+# ---------------------------
+# Una sesión simulada (corre en un proceso aparte)
+# ---------------------------
+def _rss_mb():
+    """Memoria residente actual del proceso (Linux); si no hay /proc, el pico"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _tamano_mb(valor):
+    if hasattr(valor, "memory_usage"):
+        return float(valor.memory_usage(index=True, deep=True).sum()) / 1e6
+    return sys.getsizeof(valor) / 1e6
+
+
+def _iniciar_proceso(base_url, ruta_cache):
+    # clima_api ya está importado (lo trae servicio_prediccion): se apunta a mano al stub
+    import clima_api
+    import cache_compartido
+    clima_api.BASE_URL = base_url
+    if ruta_cache:
+        cache_compartido.RUTA = ruta_cache
+
+
+def simular_sesion(indice, fecha, opcion, ruta_app=RUTA_APP, timeout=120):
+    """Abre la app, consulta una fecha histórica (tab2) y elige una visualización (tab3).
+
+    AppTest ejecuta el script completo en cada interacción, igual que un rerun real, así que
+    cada "página" es el tiempo de una corrida del script.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rss_inicial = _rss_mb()
+    at = AppTest.from_file(ruta_app, default_timeout=timeout)
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    at.run()
+    tiempos["inicio"] = time.perf_counter() - inicio
+
+    at.date_input[0].set_value(fecha)
+    inicio = time.perf_counter()
+    at.run()
+    tiempos["historico"] = time.perf_counter() - inicio
+
+    selector = next(s for s in at.selectbox if s.label.startswith("Elige una visualización"))
+    selector.set_value(selector.options[opcion % len(selector.options)])
+    inicio = time.perf_counter()
+    at.run()
+    tiempos["exploracion"] = time.perf_counter() - inicio
+
+    estado = at.session_state.filtered_state
+    return {
+        "sesion": indice,
+        "pid": os.getpid(),
+        "tiempos": tiempos,
+        "errores": [str(e.value) for e in at.error] + [str(e.value) for e in at.exception],
+        "session_state_mb": sum(_tamano_mb(v) for v in estado.values()),
+        "rss_delta_mb": _rss_mb() - rss_inicial,
+    }
+
+
+# ---------------------------
+# Orquestación
+# ---------------------------
+def correr(sesiones=20, concurrencia=4, fechas_distintas=10, latencia_ms=150, jitter_ms=50, tasa_429=0.0,
+           relleno_kb=0, ruta_cache=None, semilla=0, ruta_app=RUTA_APP):
+    """Levanta el stub y corre 'sesiones' sesiones con 'concurrencia' procesos en paralelo.
+
+    Cada proceso hace de worker de Streamlit: las sesiones que le tocan comparten sus
+    st.cache_resource y todos comparten la caché en disco (ruta_cache).
+    """
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    fechas = [hoy - timedelta(days=rnd.randint(3, 700)) for _ in range(fechas_distintas)]
+    trabajos = [(i, rnd.choice(fechas), rnd.randrange(7)) for i in range(sesiones)]
+
+    with StubVisualCrossing(latencia_ms=latencia_ms, jitter_ms=jitter_ms, tasa_429=tasa_429,
+                            relleno_kb=relleno_kb, semilla=semilla) as stub:
+        contexto = multiprocessing.get_context("spawn")
+        t0 = time.perf_counter()
+        resultados = []
+        with ProcessPoolExecutor(max_workers=concurrencia, mp_context=contexto, initializer=_iniciar_proceso,
+                                 initargs=(stub.base_url, ruta_cache)) as pool:
+            futuros = [pool.submit(simular_sesion, i, fecha, opcion, ruta_app) for i, fecha, opcion in trabajos]
+            for futuro in as_completed(futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    resultados.append({"sesion": None, "tiempos": {}, "errores": [f"sesión caída: {e}"],
+                                       "session_state_mb": 0.0, "rss_delta_mb": 0.0, "pid": None})
+        total = time.perf_counter() - t0
+        upstream = stub.estadisticas()
+
+    return resumir(resultados, total, upstream, ruta_cache)
+
+
+def resumir(resultados, total, upstream, ruta_cache=None):
+    paginas = {}
+    for pagina in PAGINAS:
+        ms = [r["tiempos"][pagina] * 1000 for r in resultados if pagina in r["tiempos"]]
+        paginas[pagina] = {"n": len(ms), "p50_ms": percentil(ms, 50), "p95_ms": percentil(ms, 95),
+                           "p99_ms": percentil(ms, 99)}
+    todas = [t * 1000 for r in resultados for t in r["tiempos"].values()]
+    n_paginas = len(todas)
+    con_error = [r for r in resultados if r["errores"]]
+
+    reporte = {
+        "sesiones": len(resultados),
+        "sesiones_con_error": len(con_error),
+        "errores": sorted({e[:160] for r in con_error for e in r["errores"]})[:10],
+        "procesos": len({r["pid"] for r in resultados if r["pid"]}),
+        "segundos": total,
+        "paginas_por_segundo": n_paginas / total if total else None,
+        "pagina_p50_ms": percentil(todas, 50),
+        "pagina_p95_ms": percentil(todas, 95),
+        "pagina_p99_ms": percentil(todas, 99),
+        "por_pagina": paginas,
+        "session_state_mb_por_sesion": percentil([r["session_state_mb"] for r in resultados], 50),
+        "rss_delta_mb_por_sesion": percentil([r["rss_delta_mb"] for r in resultados], 50),
+        "upstream": upstream,
+    }
+    if ruta_cache and os.path.exists(ruta_cache):
+        from cache_compartido import CacheCompartido
+        reporte["cache_compartida"] = CacheCompartido(ruta_cache).estadisticas()
+    return reporte
+
+
+def imprimir(reporte):
+    print(f"Sesiones: {reporte['sesiones']} ({reporte['sesiones_con_error']} con error) "
+          f"en {reporte['procesos']} procesos, {reporte['segundos']:.1f}s")
+    print(f"Throughput: {reporte['paginas_por_segundo']:.2f} páginas/s")
+    print(f"Latencia de página: p50 {reporte['pagina_p50_ms']:.0f} ms | p95 {reporte['pagina_p95_ms']:.0f} ms "
+          f"| p99 {reporte['pagina_p99_ms']:.0f} ms")
+    for pagina, p in reporte["por_pagina"].items():
+        if p["n"]:
+            print(f"  {pagina:<12} n={p['n']:<4} p50 {p['p50_ms']:7.0f}  p95 {p['p95_ms']:7.0f}  p99 {p['p99_ms']:7.0f} ms")
+    print(f"Memoria por sesión (mediana): session_state {reporte['session_state_mb_por_sesion']:.1f} MB, "
+          f"RSS del proceso +{reporte['rss_delta_mb_por_sesion']:.1f} MB")
+    u = reporte["upstream"]
+    print(f"Upstream: {u['llamadas']} llamadas, {u['rechazadas_429']} con 429, {u['costo_dias']} días de costo")
+    for espacio, e in reporte.get("cache_compartida", {}).items():
+        print(f"  caché {espacio:<13} hits {e.get('hits', 0):<5} misses {e.get('misses', 0):<5}")
+    for error in reporte["errores"]:
+        print(f"  ⚠️ {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de la app con sesiones simuladas y el stub de la API")
+    parser.add_argument("--sesiones", type=int, default=20)
+    parser.add_argument("--concurrencia", type=int, default=4, help="Procesos en paralelo (workers)")
+    parser.add_argument("--fechas-distintas", type=int, default=10,
+                        help="Fechas históricas entre las que eligen las sesiones")
+    parser.add_argument("--latencia-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--relleno-kb", type=int, default=0)
+    parser.add_argument("--usar-cache-existente", action="store_true",
+                        help="Usar cache/compartido.sqlite en lugar de una caché vacía")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Guardar el reporte completo en este archivo")
+    args = parser.parse_args()
+
+    # AppTest reemplaza __main__ en los workers por main.py: las funciones que se mandan a los
+    # procesos tienen que venir del módulo importable, no de este __main__
+    import carga_app
+
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta_cache = None if args.usar_cache_existente else os.path.join(temporal, "compartido.sqlite")
+        reporte = carga_app.correr(args.sesiones, args.concurrencia, args.fechas_distintas, args.latencia_ms,
+                         args.jitter_ms, args.tasa_429, args.relleno_kb, ruta_cache, args.semilla)
+    carga_app.imprimir(reporte)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, default=str)
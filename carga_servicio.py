@@ -0,0 +1,106 @@
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import servicio_prediccion
+from servicio_prediccion import percentil
+
+
+def fila_aleatoria(rnd):
+    """Vector de features plausible para Mendoza (no hace falta la API)"""
+    mes = rnd.randint(1, 12)
+    dia_anio = rnd.randint(1, 365)
+    temp = rnd.uniform(0, 30)
+    dew = temp - rnd.uniform(2, 20)
+    return {
+        "temp_mean": temp, "feelslike_mean": temp, "humidity_mean": rnd.uniform(20, 95),
+        "dew_mean": dew, "pressure_mean": rnd.uniform(1005, 1030), "windspeed_mean": rnd.uniform(0, 25),
+        "windgust_mean": rnd.uniform(5, 40), "winddir_mean": rnd.uniform(0, 360),
+        "visibility_mean": rnd.uniform(5, 20), "solarradiation_mean": rnd.uniform(0, 400),
+        "uvindex_mean": rnd.uniform(0, 6), "cloudcover_mean": rnd.uniform(0, 100),
+        "precip_sum": rnd.choice([0, 0, 0, rnd.uniform(0, 10)]), "snow_sum": 0.0,
+        "temp_range": rnd.uniform(5, 20), "dew_point_diff": temp - dew,
+        "month_sin": math.sin(2 * math.pi * mes / 12),
+        "month_cos": math.cos(2 * math.pi * mes / 12),
+        "dayofyear_sin": math.sin(2 * math.pi * dia_anio / 365),
+        "dayofyear_cos": math.cos(2 * math.pi * dia_anio / 365),
+        "rain_yesterday": rnd.randint(0, 1),
+    }
+
+
+def post(url, cuerpo):
+    datos = json.dumps(cuerpo).encode("utf-8")
+    pedido = urllib.request.Request(url, data=datos, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(pedido, timeout=30) as r:
+        return json.loads(r.read())
+
+
+def correr_carga(base_url, pedidos=2000, concurrencia=32, filas_por_pedido=1, semilla=0):
+    """Dispara 'pedidos' POST /predecir con 'concurrencia' clientes y mide latencia y throughput"""
+    rnd = random.Random(semilla)
+    cuerpos = [{"filas": [fila_aleatoria(rnd) for _ in range(filas_por_pedido)]} for _ in range(pedidos)]
+    latencias = []
+    errores = []
+    lock = threading.Lock()
+
+    def uno(cuerpo):
+        t = time.perf_counter()
+        try:
+            post(f"{base_url}/predecir", cuerpo)
+        except Exception as e:
+            with lock:
+                errores.append(str(e))
+            return
+        with lock:
+            latencias.append((time.perf_counter() - t) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(uno, cuerpos))
+    total = time.perf_counter() - t0
+
+    with urllib.request.urlopen(f"{base_url}/metricas", timeout=10) as r:
+        servidor = json.loads(r.read())
+    return {
+        "pedidos": pedidos,
+        "errores": len(errores),
+        "segundos": total,
+        "pedidos_por_segundo": pedidos / total,
+        "cliente_p50_ms": percentil(latencias, 50),
+        "cliente_p99_ms": percentil(latencias, 99),
+        "servidor": servidor,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de predicción en localhost")
+    parser.add_argument("--url", help="Servicio ya levantado; si se omite se levanta uno en un puerto libre")
+    parser.add_argument("--pedidos", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--filas", type=int, default=1, help="Filas por pedido")
+    parser.add_argument("--ventana-ms", type=float, default=servicio_prediccion.VENTANA_MS)
+    args = parser.parse_args()
+
+    servidor = None
+    url = args.url
+    if url is None:
+        servidor = servicio_prediccion.crear_servidor(puerto=0, ventana_ms=args.ventana_ms)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    r = correr_carga(url, args.pedidos, args.concurrencia, args.filas)
+    print(f"Pedidos: {r['pedidos']} | errores: {r['errores']} | {r['pedidos_por_segundo']:.0f} pedidos/s")
+    print(f"Cliente  p50: {r['cliente_p50_ms']:.1f} ms | p99: {r['cliente_p99_ms']:.1f} ms")
+    s = r["servidor"]
+    print(f"Servidor p50: {s['latencia_p50_ms']:.1f} ms | p99: {s['latencia_p99_ms']:.1f} ms | lotes: {s['lotes']}")
+    print("Histograma de tamaño de lote (filas: lotes):")
+    for tamano, cantidad in s["histograma_tamano_lote"].items():
+        print(f"  {tamano:>5}: {cantidad}")
+
+    if servidor is not None:
+        servidor.shutdown()
@@ -0,0 +1,313 @@
+import os
+import time
+import threading
+import requests
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from cache_compartido import obtener_cache
+from telemetria_api import telemetria
+
+API_KEYS = [
+    "N9FENAZ4MC65WBZ6J6AWGULZ3",
+    "54G4EHM72LT7762EHUQMKERYE",
+    "5YXQ8PZG4HJQTG4WLQ4CYZBLJ",
+    "LZCNRDCYVBUKWK79K3ZD3YVN9",
+    "C97H3YUSQBF833J35FNMWHTLZ"
+]
+
+# URL base del endpoint timeline (se puede apuntar a un stub local con VISUAL_CROSSING_URL)
+BASE_URL = os.environ.get(
+    "VISUAL_CROSSING_URL",
+    "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
+)
+
+# Respuestas que incluyen días recientes (la API todavía los actualiza) vencen a la hora;
+# los rangos cerrados quedan en la caché compartida hasta que se desalojan o se invalidan
+TTL_RECIENTE = 60 * 60
+
+# Un 429 suelto es límite de ritmo: se espera y se reintenta con la misma key. La key se da por
+# agotada hasta el fin del día (UTC) solo si el cuerpo dice que se acabó la cuota diaria; tras
+# MAX_429_SEGUIDOS respuestas 429 seguidas en la misma consulta se pasa a la key siguiente
+MAX_429_SEGUIDOS = 3
+ESPERA_429 = 0.5
+MAX_ESPERA_429 = 30
+MENSAJES_CUOTA = ("daily", "maximum cost", "credits")
+
+# Keys agotadas, con el día (UTC) en que se agotaron; compartido entre hilos
+_keys_agotadas = {}
+_lock_keys = threading.Lock()
+
+
+def _key_disponible(idx):
+    with _lock_keys:
+        return _keys_agotadas.get(idx) != datetime.now(timezone.utc).date()
+
+
+def _marcar_agotada(idx):
+    with _lock_keys:
+        _keys_agotadas[idx] = datetime.now(timezone.utc).date()
+
+
+def _cuota_agotada(response):
+    """True si el 429 dice que se acabó la cuota diaria (y no es solo límite de ritmo)"""
+    return any(m in response.text.lower() for m in MENSAJES_CUOTA)
+
+
+def _espera_429(response, intento):
+    """Segundos a esperar antes de reintentar: Retry-After (segundos o fecha HTTP) acotado a
+    MAX_ESPERA_429, o backoff exponencial si no viene o no se entiende"""
+    valor = response.headers.get("Retry-After")
+    try:
+        espera = float(valor)
+    except (TypeError, ValueError):
+        try:
+            espera = (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            espera = None
+    if espera is None or espera != espera:
+        espera = ESPERA_429 * 2 ** intento
+    return min(max(espera, 0), MAX_ESPERA_429)
+
+
+# Consultas en curso por (BASE_URL, location, include, usar_cache, desde, hasta): una llamada
+# cuyo rango está dentro de otro en curso espera esa respuesta y se queda con sus días
+_en_vuelo = {}
+_lock_vuelos = threading.Lock()
+_deduplicadas = 0
+
+
+def estadisticas_coalescencia():
+    """Cantidad de llamadas que se resolvieron esperando una consulta idéntica ya en curso"""
+    with _lock_vuelos:
+        return {"deduplicadas": _deduplicadas, "en_vuelo": len(_en_vuelo)}
+
+
+def estado_keys():
+    """{número de key: True si se agotó hoy (UTC)}"""
+    return {idx + 1: not _key_disponible(idx) for idx in range(len(API_KEYS))}
+
+
+telemetria.agregar_medidor("clima_api_key_agotada", "1 si la key agotó su cuota hoy (UTC)",
+                           lambda: [({"key": k}, int(v)) for k, v in estado_keys().items()])
+telemetria.agregar_medidor("clima_api_deduplicadas", "Llamadas resueltas esperando una consulta idéntica en curso",
+                           lambda: [(None, estadisticas_coalescencia()["deduplicadas"])])
+
+
+def recortar(resultado, desde, hasta):
+    """(respuesta, api_key, número) con solo los días [desde, hasta] de una respuesta más amplia"""
+    respuesta, api_key, numero_key = resultado
+    dias = [d for d in respuesta.get("days", []) if desde <= d["datetime"] <= hasta]
+    return {**respuesta, "days": dias}, api_key, numero_key
+
+
+def _vuelo_que_cubre(base, desde, hasta):
+    """(desde, hasta, Future) de una consulta en curso que cubre el rango, o None (con _lock_vuelos tomado)"""
+    for clave, vuelo in _en_vuelo.items():
+        if clave[:4] == base and clave[4] <= desde and clave[5] >= hasta:
+            return clave[4], clave[5], vuelo
+    return None
+
+
+def _resolver(vuelo, base, desde, hasta):
+    _, location, include, usar_cache = base
+    try:
+        if usar_cache:
+            vuelo.set_result(_consultar_cacheado(location, desde, hasta, include))
+        else:
+            vuelo.set_result(_consultar_con_rotacion(location, desde, hasta, include))
+    except Exception as e:
+        vuelo.set_exception(e)
+    finally:
+        with _lock_vuelos:
+            del _en_vuelo[base + (desde, hasta)]
+
+
+# Función para consultar el endpoint timeline probando API keys
+def consultar_timeline(location, fecha_desde, fecha_hasta, include="days", usar_cache=True):
+    """Devuelve la respuesta JSON completa, la API key usada y su número.
+
+    Si ya hay una consulta en curso para el mismo location/include cuyo rango incluye al
+    pedido, espera su resultado y recorta los días en lugar de repetirla; los errores llegan
+    a todos los que esperan. Con usar_cache, antes de ir a la API se busca en la caché
+    compartida entre procesos una entrada que cubra el rango.
+    El resultado se comparte, así que no debe modificarse.
+    """
+    global _deduplicadas
+    desde, hasta = str(fecha_desde), str(fecha_hasta)
+    base = (BASE_URL, location, include, usar_cache)
+    with _lock_vuelos:
+        encontrado = _vuelo_que_cubre(base, desde, hasta)
+        if encontrado is None:
+            vuelo_desde, vuelo_hasta, vuelo = desde, hasta, Future()
+            _en_vuelo[base + (desde, hasta)] = vuelo
+        else:
+            vuelo_desde, vuelo_hasta, vuelo = encontrado
+            _deduplicadas += 1
+
+    if encontrado is None:
+        _resolver(vuelo, base, desde, hasta)
+    resultado = vuelo.result()
+    if (vuelo_desde, vuelo_hasta) != (desde, hasta):
+        resultado = recortar(resultado, desde, hasta)
+    return resultado
+
+
+def _prefijo_cache(location, include):
+    return f"{BASE_URL}|{location}|{include}|"
+
+
+def _consultar_cacheado(location, fecha_desde, fecha_hasta, include):
+    cache = obtener_cache()
+    prefijo = _prefijo_cache(location, include)
+    encontrado = cache.obtener_rango("api", prefijo, fecha_desde, fecha_hasta)
+    telemetria.registrar_cache(encontrado is not None)
+    if encontrado is not None:
+        clave, resultado = encontrado
+        if clave != f"{prefijo}{fecha_desde}|{fecha_hasta}":
+            resultado = recortar(resultado, fecha_desde, fecha_hasta)
+        return resultado
+
+    resultado = _consultar_con_rotacion(location, fecha_desde, fecha_hasta, include)
+    # Margen de un día: "hoy" en la ubicación consultada puede ser otro que el local
+    cerrado = date.fromisoformat(fecha_hasta) < date.today() - timedelta(days=1)
+    cache.guardar("api", f"{prefijo}{fecha_desde}|{fecha_hasta}", resultado, ttl=None if cerrado else TTL_RECIENTE,
+                  desde=fecha_desde, hasta=fecha_hasta)
+    return resultado
+
+
+# ---------------------------
+# Planificación de las consultas de una página
+# ---------------------------
+def fusionar_ventanas(ventanas):
+    """Une rangos de fechas [(desde, hasta)] que se solapan o son contiguos; devuelve la lista ordenada"""
+    fusionadas = []
+    for desde, hasta in sorted((date.fromisoformat(str(d)), date.fromisoformat(str(h))) for d, h in ventanas):
+        if fusionadas and desde <= fusionadas[-1][1] + timedelta(days=1):
+            fusionadas[-1][1] = max(fusionadas[-1][1], hasta)
+        else:
+            fusionadas.append([desde, hasta])
+    return [(desde, hasta) for desde, hasta in fusionadas]
+
+
+def planificar_consultas(location, ventanas, include="days", usar_cache=True):
+    """Lanza de una vez las consultas que va a necesitar una página.
+
+    Descarta las ventanas que ya cubre la caché o una consulta en curso, une las que se
+    solapan o son contiguas y pide cada rango resultante en un hilo aparte (en paralelo).
+    Después, cada sección llama a consultar_timeline con su propio rango y recorta sus
+    días de estas respuestas. Devuelve los rangos que se pidieron a la API.
+    """
+    base = (BASE_URL, location, include, usar_cache)
+    pendientes = []
+    for desde, hasta in ventanas:
+        desde, hasta = str(desde), str(hasta)
+        with _lock_vuelos:
+            cubierta = _vuelo_que_cubre(base, desde, hasta) is not None
+        if cubierta or (usar_cache and obtener_cache().obtener_rango(
+                "api", _prefijo_cache(location, include), desde, hasta, contar=False) is not None):
+            continue
+        pendientes.append((desde, hasta))
+
+    lanzadas = []
+    for desde, hasta in fusionar_ventanas(pendientes):
+        desde, hasta = str(desde), str(hasta)
+        with _lock_vuelos:
+            # Se registra antes de arrancar el hilo: una sección que pida su rango enseguida ya la encuentra
+            if _vuelo_que_cubre(base, desde, hasta) is not None:
+                continue
+            vuelo = _en_vuelo[base + (desde, hasta)] = Future()
+        threading.Thread(target=_resolver, args=(vuelo, base, desde, hasta), name="consulta-planificada",
+                         daemon=True).start()
+        lanzadas.append((desde, hasta))
+    return lanzadas
+
+
+def _consultar_con_rotacion(location, fecha_desde, fecha_hasta, include):
+    intentos = [idx for idx in range(len(API_KEYS)) if _key_disponible(idx)]
+    motivo = None
+    limitadas = 0
+    for n, idx in enumerate(intentos):
+        api_key = API_KEYS[idx]
+        url = f"{BASE_URL}/{location}/{fecha_desde}/{fecha_hasta}"
+        params = {
+            "unitGroup": "metric",
+            "include": include,
+            "contentType": "json",
+            "key": api_key,
+        }
+        intento = 0
+        while True:
+            if motivo:
+                telemetria.registrar_reintento(motivo)
+            try:
+                inicio = time.perf_counter()
+                try:
+                    response = requests.get(url, params=params, timeout=10)
+                except requests.exceptions.RequestException:
+                    telemetria.registrar_llamada(idx + 1, "error", time.perf_counter() - inicio)
+                    raise
+                telemetria.registrar_llamada(idx + 1, response.status_code, time.perf_counter() - inicio,
+                                             len(response.content))
+                response.raise_for_status()
+
+                # Si llegamos aquí, la API key funcionó
+                datos = response.json()
+                telemetria.registrar_creditos(idx + 1, datos.get("queryCost"))
+                return datos, api_key, idx + 1
+
+            except requests.exceptions.HTTPError as e:
+                if response.status_code != 429:  # Too many requests
+                    raise e
+                motivo = "429"
+                if _cuota_agotada(response):
+                    _marcar_agotada(idx)
+                    break
+                if intento + 1 >= MAX_429_SEGUIDOS:
+                    # Límite de ritmo que no cede: se prueba con otra key, sin darla por agotada
+                    limitadas += 1
+                    break
+                # Límite de ritmo: se espera y se reintenta con la misma key
+                time.sleep(_espera_429(response, intento))
+                intento += 1
+            except Exception as e:
+                if n == len(intentos) - 1:  # Última key
+                    raise e
+                motivo = "error"
+                break
+
+    if limitadas:
+        raise Exception(f"La API sigue respondiendo 429 por límite de ritmo ({limitadas} keys); reintentar más tarde")
+    raise Exception("Todas las API keys agotaron sus créditos")
+
+
+# Función para probar API keys
+def obtener_datos_clima(location, fecha_ayer, fecha_actual, include="days", usar_cache=True):
+    """Intenta obtener datos usando las API keys disponibles"""
+    respuesta, api_key, numero_key = consultar_timeline(location, fecha_ayer, fecha_actual, include, usar_cache)
+    return respuesta["days"], api_key, numero_key
+
+
+# Función para normalizar condiciones de la API a las clases del modelo
+def normalizar_condicion_api(condicion_api):
+    """Normaliza las condiciones de la API a las clases del modelo (Clear, Cloudy, Rain)"""
+    if not condicion_api:
+        return "Unknown"
+
+    condicion_lower = condicion_api.lower()
+
+    # Condiciones de lluvia
+    if any(keyword in condicion_lower for keyword in ['rain', 'drizzle', 'showers', 'thunderstorm', 'precipitation']):
+        return "Rain"
+
+    # Condiciones despejadas
+    if 'clear' in condicion_lower:
+        return "Clear"
+
+    # Condiciones nubladas (incluye partially cloudy, overcast, etc.)
+    if any(keyword in condicion_lower for keyword in ['cloudy', 'overcast', 'partially', 'fog', 'mist']):
+        return "Cloudy"
+
+    # Por defecto, si no coincide con nada, retornar la condición original
+    return condicion_api
@@ -0,0 +1,210 @@
+import os
+import time
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+import clima_api
+import cache_compartido
+import almacen_clima
+import archivo_particionado
+import tabla_predicciones
+from almacen_clima import RUTA_DATASET
+
+DIRECTORIO_CACHE = "cache"
+LOCATION = "Mendoza,Argentina"
+
+# Mendoza no tiene horario de verano: UTC-3 todo el año
+ZONA_MENDOZA = timezone(timedelta(hours=-3))
+
+COLUMNAS_NUMERICAS = [
+    'datetimeEpoch', 'temp', 'feelslike', 'humidity', 'dew', 'precip', 'precipprob',
+    'snow', 'snowdepth', 'windgust', 'windspeed', 'winddir', 'pressure', 'visibility',
+    'cloudcover', 'solarradiation', 'solarenergy', 'uvindex'
+]
+
+# Funciones extra a llamar con los días modificados (cachés que no viven en archivos)
+INVALIDADORES = []
+
+
+def registrar_invalidador(funcion):
+    """Registra una función que recibe la lista de días ('YYYY-MM-DD') a invalidar y el sitio"""
+    INVALIDADORES.append(funcion)
+    return funcion
+
+
+@registrar_invalidador
+def _invalidar_cache_compartida(dias, location):
+    # Las entradas guardan solo el rango de días: se invalidan las de todos los sitios
+    cache_compartido.obtener_cache().invalidar_dias(dias)
+
+
+@registrar_invalidador
+def _invalidar_tabla_predicciones(dias, location):
+    tabla_predicciones.descartar(dias, location)
+
+
+# ---------------------------
+# Lectura del estado local
+# ---------------------------
+def leer_epochs(ruta=RUTA_DATASET):
+    """Devuelve la serie de datetimeEpoch ya guardados (lee solo esa columna)"""
+    if not os.path.exists(ruta):
+        return pd.Series([], dtype='int64')
+    return pd.read_csv(ruta, usecols=['datetimeEpoch'])['datetimeEpoch']
+
+
+def leer_columnas(ruta=RUTA_DATASET):
+    """Devuelve el esquema (orden de columnas) del dataset local"""
+    return list(pd.read_csv(ruta, nrows=0).columns)
+
+
+# ---------------------------
+# Conversión de la respuesta de la API al esquema del CSV
+# ---------------------------
+def filas_desde_api(dias):
+    """Aplana la respuesta include=hours (days[].hours[]) al formato de joined_weather_data.csv"""
+    filas = []
+    for dia in dias:
+        for hora in dia.get("hours", []):
+            fila = dict(hora)
+            fila['dia'] = dia['datetime']
+            fila['hora'] = hora['datetime']
+            fila['datetime_completo'] = f"{dia['datetime']} {hora['datetime']}"
+            tipo = hora.get('preciptype')
+            fila['preciptype'] = str(tipo) if tipo else None
+            filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def validar_filas(df_nuevo, columnas):
+    """Valida y ordena las filas nuevas según el esquema existente; lanza ValueError si no encajan"""
+    faltantes = [c for c in columnas if c not in df_nuevo.columns]
+    if faltantes:
+        raise ValueError(f"La respuesta de la API no tiene las columnas: {faltantes}")
+    df_nuevo = df_nuevo[columnas].copy()
+
+    for col in COLUMNAS_NUMERICAS:
+        if col not in df_nuevo.columns:
+            continue
+        convertida = pd.to_numeric(df_nuevo[col], errors='coerce')
+        invalidas = convertida.isna() & df_nuevo[col].notna()
+        if invalidas.any():
+            raise ValueError(f"Valores no numéricos en '{col}': {df_nuevo.loc[invalidas, col].head(3).tolist()}")
+        df_nuevo[col] = convertida
+
+    if df_nuevo['datetimeEpoch'].isna().any():
+        raise ValueError("Hay filas sin 'datetimeEpoch'")
+    df_nuevo['datetimeEpoch'] = df_nuevo['datetimeEpoch'].astype('int64')
+
+    fechas = pd.to_datetime(df_nuevo['datetime_completo'], errors='coerce')
+    if fechas.isna().any():
+        raise ValueError("Hay filas con 'datetime_completo' inválido")
+    return df_nuevo
+
+
+# ---------------------------
+# Escritura e invalidación
+# ---------------------------
+def anexar_filas(df_nuevo, ruta=RUTA_DATASET, epochs_existentes=None, location=LOCATION):
+    """Agrega al CSV solo las filas con datetimeEpoch nuevo; devuelve las filas escritas.
+
+    Es el único camino de escritura (ingesta diaria y backfill): el almacén SQLite y el archivo
+    particionado por año, si existen, reciben las mismas filas para no quedar atrás del CSV.
+    """
+    if epochs_existentes is None:
+        epochs_existentes = leer_epochs(ruta)
+    df_nuevo = df_nuevo[~df_nuevo['datetimeEpoch'].isin(set(epochs_existentes))]
+    df_nuevo = df_nuevo.drop_duplicates(subset='datetimeEpoch').sort_values('datetimeEpoch')
+    if len(df_nuevo) > 0:
+        df_nuevo.to_csv(ruta, mode='a', header=not os.path.exists(ruta), index=False)
+        if almacen_clima.disponible():
+            almacen_clima.insertar(df_nuevo, location)
+        # Se reescriben solo los años de las filas nuevas
+        if archivo_particionado.disponible(location):
+            archivo_particionado.escribir(df_nuevo, location, anexar=True)
+    return df_nuevo
+
+
+def invalidar_dias(dias, directorio=DIRECTORIO_CACHE, location=LOCATION):
+    """Borra las entradas de caché derivadas de los días indicados.
+
+    Las cachés en disco guardan un archivo por día cuyo nombre empieza con la fecha
+    ('YYYY-MM-DD...'), así que solo se tocan los días afectados.
+    """
+    dias = sorted(set(dias))
+    borrados = 0
+    if dias and os.path.isdir(directorio):
+        for raiz, _, archivos in os.walk(directorio):
+            for nombre in archivos:
+                if nombre[:10] in dias:
+                    os.remove(os.path.join(raiz, nombre))
+                    borrados += 1
+    for funcion in INVALIDADORES:
+        funcion(dias, location)
+    return borrados
+
+
+# ---------------------------
+# Ingesta incremental
+# ---------------------------
+def ingestar(location=LOCATION, ruta=RUTA_DATASET, hasta=None, directorio_cache=DIRECTORIO_CACHE):
+    """Descarga las horas posteriores al último datetimeEpoch guardado y las agrega al dataset"""
+    epochs = leer_epochs(ruta)
+    if len(epochs) == 0:
+        raise ValueError(f"El dataset {ruta} está vacío; usar el backfill para la carga inicial")
+    ultimo = int(epochs.max())
+    ahora = int(time.time())
+
+    # Se vuelve a pedir el día del último registro porque puede haber quedado incompleto
+    desde = datetime.fromtimestamp(ultimo, ZONA_MENDOZA).date()
+    hasta = hasta or datetime.now(ZONA_MENDOZA).date()
+    if desde > hasta:
+        return {'filas_nuevas': 0, 'dias_afectados': [], 'cache_invalidada': 0}
+
+    dias_api, _, numero_key = clima_api.obtener_datos_clima(
+        location, desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), include="hours", usar_cache=False
+    )
+    df_nuevo = filas_desde_api(dias_api)
+    if len(df_nuevo) == 0:
+        return {'filas_nuevas': 0, 'dias_afectados': [], 'cache_invalidada': 0, 'api_key': numero_key}
+    df_nuevo = validar_filas(df_nuevo, leer_columnas(ruta))
+
+    # Las horas futuras del día actual son pronóstico: se ingieren en una corrida posterior
+    df_nuevo = df_nuevo[(df_nuevo['datetimeEpoch'] > ultimo) & (df_nuevo['datetimeEpoch'] <= ahora)]
+
+    escritas = anexar_filas(df_nuevo, ruta, epochs_existentes=epochs, location=location)
+    dias_afectados = sorted(escritas['dia'].unique().tolist())
+    borrados = invalidar_dias(dias_afectados, directorio_cache, location)
+    return {
+        'filas_nuevas': len(escritas),
+        'dias_afectados': dias_afectados,
+        'cache_invalidada': borrados,
+        'api_key': numero_key,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta incremental horaria desde Visual Crossing")
+    parser.add_argument("--location", default=LOCATION)
+    parser.add_argument("--dataset", default=RUTA_DATASET)
+    parser.add_argument("--hasta", help="Última fecha a pedir (YYYY-MM-DD); por defecto hoy en Mendoza")
+    parser.add_argument("--base-url", help="URL base alternativa (por ejemplo el stub local)")
+    parser.add_argument("--online", action="store_true",
+                        help="Después de ingerir, actualizar el modelo online (modelo_online.py) con los días nuevos")
+    args = parser.parse_args()
+
+    if args.base_url:
+        clima_api.BASE_URL = args.base_url
+    hasta = datetime.strptime(args.hasta, "%Y-%m-%d").date() if args.hasta else None
+
+    resultado = ingestar(args.location, args.dataset, hasta)
+    print(f"✅ Filas nuevas: {resultado['filas_nuevas']}")
+    print(f"Días afectados: {', '.join(resultado['dias_afectados']) or '-'}")
+    print(f"Entradas de caché invalidadas: {resultado['cache_invalidada']}")
+
+    if args.online:
+        import modelo_online
+        datos = almacen_clima.RUTA if almacen_clima.disponible() else args.dataset
+        online = modelo_online.actualizar_diario(datos, location=args.location)
+        print(f"✅ Modelo online: {online['dias_nuevos']} días nuevos (último: {online['ultimo_dia']})")
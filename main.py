@@ -1,81 +1,49 @@
 import streamlit as st
-import requests
-import pandas as pd
-import numpy as np
-import joblib
-import altair as alt
 from datetime import datetime, timedelta
 
-API_KEYS = [
-    "N9FENAZ4MC65WBZ6J6AWGULZ3",
-    "54G4EHM72LT7762EHUQMKERYE",
-    "5YXQ8PZG4HJQTG4WLQ4CYZBLJ",
-    "LZCNRDCYVBUKWK79K3ZD3YVN9",
-    "C97H3YUSQBF833J35FNMWHTLZ"
-]
+# Las dependencias pesadas (pandas, numpy, altair, requests, joblib/scikit-learn) se importan
+# dentro de las pestañas que las usan, para que Inicio y Modelo se pinten sin esperarlas.
 
-# Función para probar API keys
-def obtener_datos_clima(location, fecha_ayer, fecha_actual):
-    """Intenta obtener datos usando las API keys disponibles"""
-    for idx, api_key in enumerate(API_KEYS):
-        try:
-            url = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{location}/{fecha_ayer}/{fecha_actual}"
-            params = {
-                "unitGroup": "metric",
-                "include": "days",
-                "contentType": "json",
-                "key": api_key,
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()["days"]
-            
-            # Si llegamos aquí, la API key funcionó
-            return data, api_key, idx + 1
-            
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:  # Too many requests
-                #st.warning(f"API Key {idx + 1} sin créditos. Probando siguiente...")
-                continue
-            else:
-                raise e
-        except Exception as e:
-            if idx == len(API_KEYS) - 1:  # Última key
-                raise e
-            continue
-    
-    raise Exception("Todas las API keys agotaron sus créditos")
+# Un único registro de modelos por proceso; al crearlo precarga los sitios más consultados
+@st.cache_resource
+def obtener_registro_app():
+    from registro_modelos import obtener_registro
+    registro = obtener_registro()
+    registro.precargar()
+    return registro
 
-# Función para normalizar condiciones de la API a las clases del modelo
-def normalizar_condicion_api(condicion_api):
-    """Normaliza las condiciones de la API a las clases del modelo (Clear, Cloudy, Rain)"""
-    if not condicion_api:
-        return "Unknown"
-    
-    condicion_lower = condicion_api.lower()
-    
-    # Condiciones de lluvia
-    if any(keyword in condicion_lower for keyword in ['rain', 'drizzle', 'showers', 'thunderstorm', 'precipitation']):
-        return "Rain"
-    
-    # Condiciones despejadas
-    if 'clear' in condicion_lower:
-        return "Clear"
-    
-    # Condiciones nubladas (incluye partially cloudy, overcast, etc.)
-    if any(keyword in condicion_lower for keyword in ['cloudy', 'overcast', 'partially', 'fog', 'mist']):
-        return "Cloudy"
-    
-    # Por defecto, si no coincide con nada, retornar la condición original
-    return condicion_api
+# Telemetría de la API: endpoint /metrics y/o archivo si TELEMETRIA_PUERTO / TELEMETRIA_ARCHIVO están definidos
+@st.cache_resource
+def iniciar_telemetria():
+    from telemetria_api import iniciar_exportacion
+    return iniciar_exportacion()
+
+# Un único hilo de prefetch por proceso y ubicación, compartido por todas las sesiones
+# (se arranca en la pestaña de predicción, después de planificar las consultas de la página)
+@st.cache_resource
+def obtener_prefetch(location="Mendoza,Argentina"):
+    from prefetch import PrefetchDiario
+    return PrefetchDiario(location)
+
+# Modelo horario (modelo_horario.py); se recarga si el archivo cambia
+@st.cache_resource
+def obtener_modelo_horario(modificado):
+    import modelo_horario
+    return modelo_horario.cargar()
 
 # Configuración de la página
 st.set_page_config(page_title="Predicción del clima", page_icon="🌦️", layout="wide")
 st.title("🌤️ Predicción del clima con modelo de Machine Learning")
 
-# Crear tabs (agregando tab de inicio)
-tab0, tab1, tab2, tab3 = st.tabs(["🏠 Inicio", "🤖 Modelo", "🔮 Predicción del clima", "📊 Exploración de datos"])
+iniciar_telemetria()
+
+# Crear tabs (agregando tab de inicio); el panel de administración solo con ?admin=1 en la URL
+nombres_tabs = ["🏠 Inicio", "🤖 Modelo", "🔮 Predicción del clima", "📊 Exploración de datos"]
+mostrar_admin = st.query_params.get("admin") == "1"
+if mostrar_admin:
+    nombres_tabs.append("🛠️ Administración")
+tabs = st.tabs(nombres_tabs)
+tab0, tab1, tab2, tab3 = tabs[:4]
 # ==================== TAB 0: INICIO ====================
 with tab0:
     st.header("¡Bienvenido a la aplicación de predicción del clima! 👋")
@@ -465,6 +433,17 @@ with tab1:
     
 # ==================== TAB 2: PREDICCIÓN ====================
 with tab2:
+    import numpy as np
+    import pandas as pd
+    import altair as alt
+    from clima_api import obtener_datos_clima, normalizar_condicion_api, planificar_consultas
+    from prediccion import construir_features, features_a_dataframe, predecir, hash_features
+    import cache_predicciones
+    import tabla_predicciones
+    import ventana_features
+    
+    registro = obtener_registro_app()
+    
     st.header("🔮 Predicción del clima")
     
     st.markdown("""
@@ -472,6 +451,28 @@ with tab2:
     Puedes predecir el clima de **mañana** o comparar predicciones con **datos históricos** para ver el funcionamiento del modelo.
     """)
     
+    # Un modelo por sitio (registro_modelos.py); el selector aparece si hay más de uno publicado
+    sitios = [s["location"] for s in registro.sitios()] or ["Mendoza,Argentina"]
+    location = st.selectbox("📍 Ubicación", sitios) if len(sitios) > 1 else sitios[0]
+    
+    # Las dos secciones piden rangos que suelen solaparse (3 días, o los de la ventana para la fecha
+    # histórica; con la fecha de hoy se superponen): se lanzan juntos y unidos antes de pintar nada,
+    # y cada sección recorta sus días
+    from prefetch import ZONA_MENDOZA
+    prefetch = obtener_prefetch(location)
+    ventanas = []
+    if prefetch.estado()[0] is None:
+        hoy_mendoza = datetime.now(ZONA_MENDOZA).date()
+        ventanas.append((hoy_mendoza - timedelta(days=2), hoy_mendoza))
+    fecha_plan = st.session_state.get("fecha_historica", datetime.today().date())
+    # Día-1 y día-2, o los 8 días anteriores si el modelo usa features de ventana
+    dias_contexto = ventana_features.dias_contexto(registro.obtener(location))
+    if (tabla_predicciones.buscar(registro.version(location), location, fecha_plan) is None
+            and cache_predicciones.buscar(registro.version(location), location, fecha_plan) is None):
+        ventanas.append((fecha_plan - timedelta(days=dias_contexto), fecha_plan))
+    planificar_consultas(location, ventanas)
+    prefetch.iniciar()
+    
     st.markdown("---")
     
     # ========== SECCIÓN 1: PREDICCIÓN PARA MAÑANA ==========
@@ -481,74 +482,23 @@ with tab2:
     """)
     
     try:
-        # Calcular fechas para predicción de mañana
-        # Necesitamos: ayer (día-1), hoy (día actual), mañana (día+1 a predecir)
-        fecha_hoy = datetime.today().date()
-        fecha_ayer = fecha_hoy - timedelta(days=1)
-        fecha_anteayer = fecha_hoy - timedelta(days=2)
-        fecha_manana = fecha_hoy + timedelta(days=1)
-        
-        # Convertir a strings
-        fecha_hoy_str = fecha_hoy.strftime("%Y-%m-%d")
-        fecha_ayer_str = fecha_ayer.strftime("%Y-%m-%d")
-        fecha_anteayer_str = fecha_anteayer.strftime("%Y-%m-%d")
-        fecha_manana_str = fecha_manana.strftime("%Y-%m-%d")
-        
-        location = "Mendoza,Argentina"
-        
-        # Obtener datos usando las API keys (con rotación automática)
+        # La predicción la calcula un hilo de fondo (al iniciar y en cada medianoche de Mendoza);
+        # acá solo se lee el valor ya listo
         with st.spinner("Obteniendo datos del clima para predicción de mañana..."):
-            data_manana, api_key_usada, numero_key = obtener_datos_clima(
-                location, 
-                fecha_anteayer_str,  # día-2
-                fecha_hoy_str        # día actual
-            )
+            resultado_manana, actualizado_manana, error_manana = prefetch.estado(esperar=30)
         
-        if len(data_manana) < 2:
-            st.error("No se obtuvieron datos suficientes para predecir mañana.")
+        if resultado_manana is None:
+            st.error(f"No se pudo obtener la predicción de mañana: {error_manana or 'actualización en curso, reintentá en unos segundos'}")
         else:
-            # Extraer datos necesarios
-            # data_manana[0] = anteayer (para rain_yesterday)
-            # data_manana[1] = ayer (para features del modelo)
-            anteayer_manana = data_manana[0]
-            ayer_manana = data_manana[1]
-            
-            # Construir features para predicción de mañana
-            features_manana = {
-                "temp_mean": ayer_manana["temp"],
-                "feelslike_mean": ayer_manana["feelslike"],
-                "humidity_mean": ayer_manana["humidity"],
-                "dew_mean": ayer_manana["dew"],
-                "pressure_mean": ayer_manana["pressure"],
-                "windspeed_mean": ayer_manana["windspeed"],
-                "windgust_mean": ayer_manana["windgust"],
-                "winddir_mean": ayer_manana["winddir"],
-                "visibility_mean": ayer_manana["visibility"],
-                "solarradiation_mean": ayer_manana["solarradiation"],
-                "uvindex_mean": ayer_manana["uvindex"],
-                "cloudcover_mean": ayer_manana["cloudcover"],
-                "precip_sum": ayer_manana["precip"],
-                "snow_sum": ayer_manana["snow"],
-                "temp_range": ayer_manana["tempmax"] - ayer_manana["tempmin"],
-                "dew_point_diff": ayer_manana["temp"] - ayer_manana["dew"],
-                
-                # Features cíclicas (usando la fecha de mañana)
-                "month_sin": np.sin(2 * np.pi * fecha_manana.month / 12),
-                "month_cos": np.cos(2 * np.pi * fecha_manana.month / 12),
-                "dayofyear_sin": np.sin(2 * np.pi * fecha_manana.timetuple().tm_yday / 365),
-                "dayofyear_cos": np.cos(2 * np.pi * fecha_manana.timetuple().tm_yday / 365),
-                
-                # Lluvia ayer (usando anteayer)
-                "rain_yesterday": 1 if anteayer_manana["precip"] > 0 else 0,
-            }
-            
-            X_manana = pd.DataFrame([features_manana])
+            fecha_manana_str = resultado_manana["fecha_manana"].strftime("%Y-%m-%d")
+            pred_manana = resultado_manana["clase"]
+            probs_manana = resultado_manana["probabilidades"]
+            clases_manana = resultado_manana["clases"]
+            X_manana = resultado_manana["X"]
             
-            # Cargar modelo y predecir
-            model = joblib.load("model_output/gradient_boosting_weather_model.pkl")
-            pred_manana = model.predict(X_manana)[0]
-            probs_manana = model.predict_proba(X_manana)[0]
-            clases_manana = model.classes_
+            if error_manana:
+                st.warning(f"⚠️ Falló la última actualización ({error_manana}). Se muestra el último valor disponible.")
+            st.caption(f"🕒 Actualizado: {actualizado_manana:%Y-%m-%d %H:%M} (hora de Mendoza)")
             
             # Mostrar predicción
             st.info(f"📅 **Predicción para**: {fecha_manana_str}")
@@ -618,10 +568,64 @@ with tab2:
             # Mostrar datos usados (opcional)
             with st.expander("📊 Ver datos usados para la predicción de mañana"):
                 st.write(X_manana)
+            
+            # Próximos días: un modelo por horizonte, mismos datos de entrada (ver modelo.py --horizontes)
+            semana = resultado_manana.get("semana")
+            if semana:
+                st.markdown("#### 📆 Próximos días")
+                iconos = {"rain": "🌧️", "cloudy": "☁️", "clear": "☀️"}
+                for columna, dia in zip(st.columns(len(semana)), semana):
+                    with columna:
+                        st.markdown(f"**{dia['fecha']:%a %d/%m}**")
+                        st.markdown(f"{iconos.get(str(dia['clase']).lower(), '🌡️')} {dia['clase']}")
+                        st.caption(f"{max(dia['probabilidades']) * 100:.0f}% · +{dia['horizonte']}d")
     
     except Exception as e:
         st.error(f"Error al obtener datos o predecir para mañana: {e}")
     
+    # ========== PRÓXIMAS HORAS (si hay modelo horario entrenado) ==========
+    import os
+    import modelo_horario
+    if location == modelo_horario.LOCATION and os.path.exists(modelo_horario.RUTA_MODELO):
+        st.markdown("---")
+        st.subheader(f"⏱️ Próximas {modelo_horario.HORAS} horas")
+        st.markdown("Condición hora por hora a partir de la última hora observada (`python modelo.py --modo horario`).")
+        try:
+            with st.spinner("Obteniendo las últimas horas observadas..."):
+                modelo_h = obtener_modelo_horario(os.path.getmtime(modelo_horario.RUTA_MODELO))
+                proximas = modelo_horario.proximas_api(modelo_h, location)
+            iconos = {"rain": "🌧️", "cloudy": "☁️", "clear": "☀️"}
+            seis = proximas.head(6)
+            for columna, (_, fila) in zip(st.columns(len(seis)), seis.iterrows()):
+                with columna:
+                    st.markdown(f"**{fila['hora']:%H:%M}**")
+                    st.markdown(f"{iconos.get(str(fila['clase']).lower(), '🌡️')} {fila['clase']}")
+                    prob = fila["prob_" + str(fila["clase"])]
+                    origen = " · persistencia" if fila.get("origen") == "persistencia" else ""
+                    st.caption(f"{prob * 100:.0f}% · +{fila['horizonte']}h{origen}")
+            if (proximas.get("origen") == "persistencia").any():
+                st.info("En los horizontes marcados como persistencia el modelo no le ganó a repetir la "
+                        "condición de la última hora observada en el test, así que se muestra esa condición.")
+            
+            df_horas = proximas.melt(id_vars=["hora"], value_vars=[f"prob_{c}" for c in modelo_h.classes_],
+                                     var_name="Condición", value_name="Probabilidad")
+            df_horas["Condición"] = df_horas["Condición"].str.removeprefix("prob_")
+            df_horas["Probabilidad"] = np.round(df_horas["Probabilidad"] * 100, 2)
+            chart_horas = (
+                alt.Chart(df_horas)
+                .mark_area()
+                .encode(
+                    x=alt.X("hora:T", title="Hora (Mendoza)"),
+                    y=alt.Y("Probabilidad:Q", title="Probabilidad (%)", stack=True, scale=alt.Scale(domain=[0, 100])),
+                    color=alt.Color("Condición:N", legend=alt.Legend(title="Condición climática")),
+                    tooltip=["hora:T", "Condición:N", alt.Tooltip("Probabilidad:Q", format=".2f")],
+                )
+                .properties(height=300)
+            )
+            st.altair_chart(chart_horas, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error al predecir las próximas horas: {e}")
+    
     st.markdown("---")
     st.markdown("---")
     
@@ -635,7 +639,8 @@ with tab2:
     fecha_seleccionada = st.date_input(
         "📅 Seleccione una fecha histórica (YYYY-MM-DD):",
         max_value=datetime.today().date(),  # LÍMITE: No permite fechas futuras
-        value=datetime.today().date()
+        value=datetime.today().date(),
+        key="fecha_historica"
     )
     
     try:
@@ -644,64 +649,61 @@ with tab2:
         fecha_ayer_hist = (fecha_seleccionada - timedelta(days=1)).strftime("%Y-%m-%d")
         fecha_anteayer_hist = (fecha_seleccionada - timedelta(days=2)).strftime("%Y-%m-%d")
         
-        location = "Mendoza,Argentina"
+        version = registro.version(location)
         
-        # Obtener datos históricos
-        with st.spinner("Obteniendo datos históricos..."):
-            data_hist, api_key_usada_hist, numero_key_hist = obtener_datos_clima(
-                location,
-                fecha_anteayer_hist,
-                fecha_seleccionada_str
-            )
+        # Fechas del histórico local: tabla armada al entrenar (modelo.py), sin API ni modelo;
+        # si no, la caché de predicciones (compartida entre sesiones)
+        entrada_hist = tabla_predicciones.buscar(version, location, fecha_seleccionada)
+        if entrada_hist is None:
+            entrada_hist = cache_predicciones.buscar(version, location, fecha_seleccionada)
         
-        if len(data_hist) < 3:
-            st.error("No se obtuvieron datos suficientes (se necesitan 3 días: día-2, día-1, y día seleccionado).")
-        else:
-            # Extraer datos
-            anteayer_hist = data_hist[0]  # día-2 (para rain_yesterday)
-            ayer_hist = data_hist[1]       # día-1 (para features del modelo ML)
-            dia_seleccionado_hist = data_hist[2]  # día seleccionado (para comparar con API)
-            
-            # Construir features para predicción histórica
-            features_hist = {
-                "temp_mean": ayer_hist["temp"],
-                "feelslike_mean": ayer_hist["feelslike"],
-                "humidity_mean": ayer_hist["humidity"],
-                "dew_mean": ayer_hist["dew"],
-                "pressure_mean": ayer_hist["pressure"],
-                "windspeed_mean": ayer_hist["windspeed"],
-                "windgust_mean": ayer_hist["windgust"],
-                "winddir_mean": ayer_hist["winddir"],
-                "visibility_mean": ayer_hist["visibility"],
-                "solarradiation_mean": ayer_hist["solarradiation"],
-                "uvindex_mean": ayer_hist["uvindex"],
-                "cloudcover_mean": ayer_hist["cloudcover"],
-                "precip_sum": ayer_hist["precip"],
-                "snow_sum": ayer_hist["snow"],
-                "temp_range": ayer_hist["tempmax"] - ayer_hist["tempmin"],
-                "dew_point_diff": ayer_hist["temp"] - ayer_hist["dew"],
+        if entrada_hist is None:
+            # Obtener datos históricos
+            with st.spinner("Obteniendo datos históricos..."):
+                data_hist, api_key_usada_hist, numero_key_hist = obtener_datos_clima(
+                    location,
+                    (fecha_seleccionada - timedelta(days=dias_contexto)).strftime("%Y-%m-%d"),
+                    fecha_seleccionada_str
+                )
+            
+            if len(data_hist) >= dias_contexto + 1:
+                # Extraer datos
+                anteayer_hist = data_hist[-3]  # día-2 (para rain_yesterday)
+                ayer_hist = data_hist[-2]       # día-1 (para features del modelo ML)
+                dia_seleccionado_hist = data_hist[-1]  # día seleccionado (para comparar con API)
                 
-                # Features cíclicas (usando la fecha seleccionada)
-                "month_sin": np.sin(2 * np.pi * fecha_seleccionada.month / 12),
-                "month_cos": np.cos(2 * np.pi * fecha_seleccionada.month / 12),
-                "dayofyear_sin": np.sin(2 * np.pi * fecha_seleccionada.timetuple().tm_yday / 365),
-                "dayofyear_cos": np.cos(2 * np.pi * fecha_seleccionada.timetuple().tm_yday / 365),
+                # Construir features para predicción histórica
+                features_hist = construir_features(ayer_hist, anteayer_hist, fecha_seleccionada)
                 
-                # Lluvia ayer (usando día-2)
-                "rain_yesterday": 1 if anteayer_hist["precip"] > 0 else 0,
-            }
-            
-            X_hist = pd.DataFrame([features_hist])
-            
-            # Cargar modelo y predecir
-            model = joblib.load("model_output/gradient_boosting_weather_model.pkl")
-            pred_hist = model.predict(X_hist)[0]
-            probs_hist = model.predict_proba(X_hist)[0]
-            clases_hist = model.classes_
-            
-            # Obtener predicción real de la API
-            condicion_api_raw = dia_seleccionado_hist.get("conditions", "Unknown")
-            pred_api_hist = normalizar_condicion_api(condicion_api_raw)
+                # Cargar modelo y predecir
+                model = registro.obtener(location)
+                if ventana_features.requeridas(model):
+                    # Fecha pasada: la ventana sale de los días pedidos, no del estado del sitio
+                    ventana_hist = ventana_features.EstadoVentana(location).actualizar(data_hist[:-1])
+                    features_hist.update(ventana_hist.features(fecha_seleccionada - timedelta(days=1)))
+                pred_hist, probs_hist, clases_hist = predecir(model, features_a_dataframe(features_hist))
+                
+                # Obtener predicción real de la API
+                condicion_api_raw = dia_seleccionado_hist.get("conditions", "Unknown")
+                
+                entrada_hist = cache_predicciones.guardar(
+                    version, location, fecha_seleccionada, hash_features(features_hist),
+                    pred_hist, probs_hist, clases_hist,
+                    real=normalizar_condicion_api(condicion_api_raw),
+                    features=features_hist,
+                )
+        
+        if entrada_hist is None:
+            desde_hist = fecha_seleccionada - timedelta(days=dias_contexto)
+            st.error(f"No se obtuvieron datos suficientes: se pidieron {dias_contexto + 1} días en una sola consulta "
+                     f"({desde_hist:%Y-%m-%d} a {fecha_seleccionada_str}, unida con la de mañana si se solapan) "
+                     f"y llegaron {len(data_hist)}.")
+        else:
+            pred_hist = entrada_hist["clase"]
+            probs_hist = np.array(entrada_hist["probabilidades"])
+            clases_hist = entrada_hist["clases"]
+            pred_api_hist = entrada_hist["real"]
+            X_hist = features_a_dataframe(entrada_hist["features"])
             
             # Mostrar comparación
             st.subheader("🌦️ Comparación de Predicciones")
@@ -744,8 +746,12 @@ with tab2:
             
             # Predicción real de la API
             with col2:
-                st.markdown("### 🌐 Datos históricos de Visual Crossing API")
-                st.caption(f"Condición climática histórica real del {fecha_seleccionada_str}")
+                if entrada_hist.get("origen") == "local":
+                    st.markdown("### 📁 Datos históricos del dataset local")
+                    st.caption(f"Condición real del {fecha_seleccionada_str} (resumen de sus horas, como el target del modelo)")
+                else:
+                    st.markdown("### 🌐 Datos históricos de Visual Crossing API")
+                    st.caption(f"Condición climática histórica real del {fecha_seleccionada_str}")
                 if pred_api_hist.lower() == "rain":
                     st.markdown(
                         "<div style='background-color:#D0E8FF; padding:15px; border-radius:10px; text-align:center;'>"
@@ -830,7 +836,8 @@ with tab2:
             st.altair_chart(chart_hist, use_container_width=True)
             
             if pred_api_hist.lower() in [c.lower() for c in clases_hist]:
-                st.caption("🔴 Marca roja (diamante): Predicción de la API de Visual Crossing")
+                fuente_real = "dataset local" if entrada_hist.get("origen") == "local" else "API de Visual Crossing"
+                st.caption(f"🔴 Marca roja (diamante): Condición real según {fuente_real}")
             
             # Mostrar datos usados
             with st.expander("📊 Ver datos usados para la predicción histórica"):
@@ -841,6 +848,15 @@ with tab2:
 
 # ==================== TAB 2: VISUALIZACIONES ====================
 with tab3:    
+    import os
+    import hashlib
+    import pandas as pd
+    import altair as alt
+    import motor_datos
+    from cache_compartido import obtener_cache
+    import almacen_clima
+    import archivo_particionado
+    
     # Inicializar session_state si no existe
     if 'datos_procesados' not in st.session_state:
         st.session_state.datos_procesados = None
@@ -852,67 +868,41 @@ with tab3:
     if not st.session_state.datos_procesados or st.session_state.df_dias is None:
         try:
             with st.spinner("Cargando y procesando datos..."):
-                # Cargar datos desde el archivo local
-                df = pd.read_csv("joined_weather_data.csv")
-                
-                # Convertir datetime_completo a formato datetime
-                if 'datetime_completo' in df.columns:
-                    df['datetime_completo'] = pd.to_datetime(df['datetime_completo'])
-                
-                # ========== PREPROCESAMIENTO: ESTACIONES Y CONDICIONES ==========
-                
-                # Función para obtener estación
-                def obtener_estacion(fecha):
-                    mes = fecha.month
-                    if mes in [12, 1, 2]:
-                        return 'Verano'
-                    elif mes in [3, 4, 5]:
-                        return 'Otoño'
-                    elif mes in [6, 7, 8]:
-                        return 'Invierno'
+                # El resultado se comparte entre los procesos de la app mediante la caché en disco;
+                # la clave cambia si cambian los datos (ingesta), este script, motor_datos.py o archivo_particionado.py
+                cache = obtener_cache()
+                # Si existe el archivo particionado (archivo_particionado.py) cada año se procesa en
+                # su propio proceso; si no, del almacén SQLite se leen solo las columnas de esta pestaña
+                if archivo_particionado.disponible():
+                    ruta_datos = archivo_particionado.ruta_manifiesto()
+                elif almacen_clima.disponible():
+                    ruta_datos = almacen_clima.RUTA
+                else:
+                    ruta_datos = almacen_clima.RUTA_DATASET
+                estado_csv = os.stat(ruta_datos)
+                with open(__file__, "rb") as f, open(motor_datos.__file__, "rb") as g, \
+                        open(archivo_particionado.__file__, "rb") as h:
+                    version_script = hashlib.sha1(f.read() + g.read() + h.read()).hexdigest()[:12]
+                clave_datos = f"{ruta_datos}|{estado_csv.st_mtime_ns}|{estado_csv.st_size}|{version_script}"
+                procesado = cache.obtener("dataset", clave_datos)
+                if procesado is None:
+                    # Cargar datos desde el archivo local
+                    if ruta_datos == archivo_particionado.ruta_manifiesto():
+                        # Mismo resultado que preparar_exploracion sobre todo el CSV, un año por proceso
+                        df, df_dias, orden_estaciones = archivo_particionado.preparar_exploracion()
                     else:
-                        return 'Primavera'
-                
-                # Crear columna de día (sin hora)
-                df['dia'] = df['datetime_completo'].dt.date
-                df['dia'] = pd.to_datetime(df['dia'])
-                df['mes'] = df['dia'].dt.month
-                df['mes_nombre'] = df['dia'].dt.strftime('%B')
-                df['estacion'] = df['dia'].apply(obtener_estacion)
-                df['año'] = df['dia'].dt.year
-                
-                # Detectar lluvia por hora
-                lluvia_keywords = [
-                    'Rain', 'Drizzle', 'Showers', 'Thunderstorm',
-                    'Precipitation', 'Rain And Snow', 'Drizzle/Rain'
-                ]
-                df['lluvia_hora'] = df['conditions'].str.contains('|'.join(lluvia_keywords), case=False, na=False)
-                
-                # Agregación diaria para temperaturas
-                df_dias = (
-                    df.groupby(['dia', 'estacion', 'mes', 'mes_nombre'], as_index=False)
-                    .agg({
-                        'temp': ['max', 'min', 'mean'],
-                        'feelslike': 'mean',
-                        'humidity': 'mean',
-                        'lluvia_hora': 'any',
-                        'conditions': lambda x: x.mode()[0] if len(x.mode()) > 0 else x.iloc[0]
-                    })
-                )
-                
-                # Aplanar nombres de columnas
-                df_dias.columns = ['dia', 'estacion', 'mes', 'mes_nombre', 'temp_max_dia', 'temp_min_dia', 
-                                   'temp_avg_dia', 'feelslike_avg', 'humidity_avg', 'lluvia_dia', 'conditions']
-                
-                # Agregar columna de año DESPUÉS del aplanamiento
-                df_dias['año'] = df_dias['dia'].dt.year
-                
-                # Crear condición_dia categórica
-                df_dias['condicion_dia'] = df_dias['lluvia_dia'].map({False: 'Seco', True: 'Lluvioso'})
-                
-                # Orden de estaciones
-                orden_estaciones = ['Verano', 'Otoño', 'Invierno', 'Primavera']
-                df_dias['estacion'] = pd.Categorical(df_dias['estacion'], categories=orden_estaciones, ordered=True)
+                        if ruta_datos == almacen_clima.RUTA:
+                            df = almacen_clima.consultar(columnas_pedidas=[
+                                'dia', 'datetime_completo', 'temp', 'feelslike', 'humidity', 'conditions'
+                            ])
+                        else:
+                            df = pd.read_csv(almacen_clima.RUTA_DATASET)
+
+                        # Columnas por hora, tabla diaria y orden de estaciones (pandas, o polars con MOTOR_DATOS=polars)
+                        df, df_dias, orden_estaciones = motor_datos.preparar_exploracion(df)
+                    cache.guardar("dataset", clave_datos, (df, df_dias, orden_estaciones))
+                else:
+                    df, df_dias, orden_estaciones = procesado
                 
                 # Guardar en session_state
                 st.session_state.datos_procesados = True
@@ -1528,4 +1518,80 @@ with tab3:
                 data=csv,
                 file_name='datos_clima_mendoza.csv',
                 mime='text/csv',
-            )
\ No newline at end of file
+            )
+
+# ==================== TAB 4: ADMINISTRACIÓN (?admin=1) ====================
+if mostrar_admin:
+    with tabs[4]:
+        import pandas as pd
+        import altair as alt
+        from telemetria_api import telemetria, CREDITOS_POR_DIA
+        from clima_api import API_KEYS, estado_keys, estadisticas_coalescencia
+        from cache_compartido import obtener_cache
+        
+        st.header("🛠️ Administración")
+        st.caption(f"Contadores de este proceso desde {datetime.fromtimestamp(telemetria.inicio):%Y-%m-%d %H:%M}. "
+                   "Formato Prometheus en /metrics si se define TELEMETRIA_PUERTO.")
+        
+        # ========== API DE VISUAL CROSSING ==========
+        st.subheader("🌐 API de Visual Crossing")
+        resumen_keys = {fila["key"]: fila for fila in telemetria.resumen_keys()}
+        agotadas = estado_keys()
+        cache_api = telemetria.tasa_cache()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Llamadas a la API", sum(f["llamadas"] for f in resumen_keys.values()))
+        col2.metric("Hits de caché", "-" if cache_api["tasa_hits"] is None else f"{cache_api['tasa_hits']:.0%}",
+                    help=f"{cache_api['hits']} hits / {cache_api['misses']} misses")
+        col3.metric("Consultas deduplicadas", estadisticas_coalescencia()["deduplicadas"])
+        col4.metric("Keys agotadas hoy", f"{sum(agotadas.values())} de {len(API_KEYS)}")
+        
+        filas_keys = []
+        for numero in range(1, len(API_KEYS) + 1):
+            fila = resumen_keys.get(numero, {"llamadas": 0, "ok": 0, "rechazadas_429": 0, "errores": 0,
+                                             "p50_ms": None, "p95_ms": None, "mb": 0.0, "creditos_hoy": 0})
+            filas_keys.append({
+                "Key": f"#{numero}",
+                "Estado": "⛔ agotada" if agotadas[numero] else "✅ disponible",
+                "Llamadas": fila["llamadas"], "OK": fila["ok"], "429": fila["rechazadas_429"], "Errores": fila["errores"],
+                "p50 (ms)": fila["p50_ms"], "p95 (ms)": fila["p95_ms"], "MB recibidos": round(fila["mb"], 3),
+                "Créditos hoy": fila["creditos_hoy"],
+            })
+        st.dataframe(
+            pd.DataFrame(filas_keys), use_container_width=True, hide_index=True,
+            column_config={"Créditos hoy": st.column_config.ProgressColumn(
+                "Créditos hoy", min_value=0, max_value=CREDITOS_POR_DIA, format="%d")},
+        )
+        
+        histogramas = telemetria.histograma()
+        if histogramas:
+            df_latencia = pd.DataFrame([
+                {"Key": f"#{key}", "Hasta (s)": "+Inf" if limite == float("inf") else f"{limite:g}", "Llamadas": n}
+                for key, buckets in histogramas.items() for limite, n in buckets
+            ])
+            st.altair_chart(
+                alt.Chart(df_latencia).mark_bar().encode(
+                    x=alt.X("Hasta (s):N", sort=None, title="Latencia (bucket, segundos)"),
+                    y=alt.Y("Llamadas:Q"),
+                    color=alt.Color("Key:N"),
+                    tooltip=["Key", "Hasta (s)", "Llamadas"],
+                ).properties(height=250, title="Histograma de latencia por key"),
+                use_container_width=True,
+            )
+        
+        # ========== CACHÉ COMPARTIDA Y MODELOS ==========
+        st.subheader("🗄️ Caché compartida (todos los procesos)")
+        estadisticas_cache = obtener_cache().estadisticas()
+        if estadisticas_cache:
+            st.dataframe(pd.DataFrame.from_dict(estadisticas_cache, orient="index"), use_container_width=True)
+        
+        st.subheader("🧠 Modelos en memoria (este proceso)")
+        registro_admin = obtener_registro_app()
+        estadisticas_modelos = registro_admin.estadisticas()
+        if estadisticas_modelos:
+            st.dataframe(pd.DataFrame(estadisticas_modelos), use_container_width=True, hide_index=True)
+        st.caption(f"{registro_admin.bytes_cargados() / 1e6:.1f} MB cargados de "
+                   f"{registro_admin.presupuesto / 1024 / 1024:.0f} MB de presupuesto")
+        
+        with st.expander("📄 Exportación Prometheus"):
+            st.code(telemetria.texto_prometheus(), language="text")
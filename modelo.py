@@ -1,4 +1,6 @@
 import os
+import time
+import argparse
 import joblib
 import numpy as np
 import pandas as pd
@@ -11,6 +13,34 @@ from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.metrics import accuracy_score, f1_score, classification_report
 from sklearn.model_selection import train_test_split
 
+from cache_etapas import Ejecutor
+from agregacion import resumir_condiciones_diarias
+import prediccion
+import almacen_features
+import almacen_clima
+import archivo_particionado
+import registro_modelos
+import artefacto_compacto
+import modelo_online
+import motor_datos
+import ventana_features
+import tabla_predicciones
+from almacen_clima import RUTA_DATASET
+
+OUTPUT_DIR = "model_output"
+RUTA_MODELO = os.path.join(OUTPUT_DIR, "gradient_boosting_weather_model.pkl")
+# Días hacia adelante: 1 = mañana (el modelo de siempre) ... 7 = dentro de una semana
+HORIZONTES = list(range(1, 8))
+LOCATION = "Mendoza,Argentina"
+
+NUM_FEATS = [
+    'temp_mean','feelslike_mean','humidity_mean','dew_mean','pressure_mean',
+    'windspeed_mean','windgust_mean','winddir_mean','visibility_mean',
+    'solarradiation_mean','uvindex_mean','cloudcover_mean','precip_sum','snow_sum',
+    'temp_range','dew_point_diff','month_sin','month_cos','dayofyear_sin','dayofyear_cos'
+]
+CAT_FEATS = ['rain_yesterday']
+
 
 # ---------------------------
 # Función para reducir condiciones (a 4 clases base)
@@ -31,192 +61,413 @@ def resumir_target_v3(lista_conditions):
 
 # ---------------------------
 # 1) Cargar dataset original
+# 2) Feature auxiliar horaria
 # ---------------------------
-df = pd.read_csv("joined_weather_data.csv")
-print("Dataset original cargado:", df.shape)
+def cargar_datos(ruta, desde=None, hasta=None, location=LOCATION):
+    """Lee el CSV (un solo sitio) o, si la ruta es un almacén SQLite (almacen_clima.py), el rango pedido del sitio"""
+    if ruta.endswith(".sqlite"):
+        df = almacen_clima.consultar(desde, hasta, location=location, ruta=ruta)
+    else:
+        df = pd.read_csv(ruta)
+        if desde is not None:
+            df = df[df['dia'] >= f"{pd.Timestamp(desde):%Y-%m-%d}"]
+        if hasta is not None:
+            df = df[df['dia'] <= f"{pd.Timestamp(hasta):%Y-%m-%d}"]
+    return preparar_horario(df)
 
-if 'datetime_completo' not in df.columns:
-    raise KeyError("Falta la columna 'datetime_completo' en el CSV.")
-df['datetime_completo'] = pd.to_datetime(df['datetime_completo'], errors='coerce')
 
-if 'dia' in df.columns:
-    df['dia'] = pd.to_datetime(df['dia'], errors='coerce')
-else:
-    df['dia'] = df['datetime_completo'].dt.floor('d')
+def preparar_horario(df):
+    """Tipos de fecha y feature auxiliar horaria sobre las filas leídas (CSV, almacén o partición)"""
+    if 'datetime_completo' not in df.columns:
+        raise KeyError("Falta la columna 'datetime_completo' en el CSV.")
+    df['datetime_completo'] = pd.to_datetime(df['datetime_completo'], errors='coerce')
 
-# ---------------------------
-# 2) Feature auxiliar horaria
-# ---------------------------
-if 'temp' in df.columns and 'dew' in df.columns:
-    df['hourly_dew_diff'] = df['temp'] - df['dew']
-else:
-    df['hourly_dew_diff'] = np.nan
+    if 'dia' in df.columns:
+        df['dia'] = pd.to_datetime(df['dia'], errors='coerce')
+    else:
+        df['dia'] = df['datetime_completo'].dt.floor('d')
 
-# ---------------------------
-# 3) Agregación diaria
-# ---------------------------
-agg_dict = {
-    'temp': ['mean', 'max', 'min'],
-    'feelslike': 'mean',
-    'humidity': 'mean',
-    'dew': 'mean',
-    'hourly_dew_diff': 'mean',
-    'precip': 'sum',
-    'precipprob': 'mean',
-    'snow': 'sum',
-    'snowdepth': 'max',
-    'windgust': 'mean',
-    'windspeed': 'mean',
-    'winddir': 'mean',
-    'pressure': 'mean',
-    'visibility': 'mean',
-    'cloudcover': 'mean',
-    'solarradiation': 'mean',
-    'solarenergy': 'mean',
-    'uvindex': 'mean',
-    'conditions': lambda x: list(x)
-}
-agg_dict = {k:v for k,v in agg_dict.items() if k in df.columns}
-
-df_daily = df.groupby(df['dia']).agg(agg_dict)
-df_daily.columns = [
-    f"{col[0]}_{col[1]}" if isinstance(col, tuple) else str(col)
-    for col in df_daily.columns.to_flat_index()
-]
-df_daily = df_daily.reset_index().rename(columns={'dia':'date'})
+    if 'temp' in df.columns and 'dew' in df.columns:
+        df['hourly_dew_diff'] = df['temp'] - df['dew']
+    else:
+        df['hourly_dew_diff'] = np.nan
+    return df
 
 # ---------------------------
+# 3) Agregación diaria
 # 4) Resumir condiciones
 # ---------------------------
-cond_col = [c for c in df_daily.columns if c.startswith('conditions')][0]
-df_daily['conditions_reduced'] = df_daily[cond_col].apply(resumir_target_v3)
-df_daily = df_daily.drop(columns=[cond_col])
+def agregar_diario(df, motor=None):
+    """Una fila por día; motor 'pandas' (por defecto) o 'polars' (motor_datos.py), con el mismo resultado"""
+    agg_dict = {
+        'temp': ['mean', 'max', 'min'],
+        'feelslike': 'mean',
+        'humidity': 'mean',
+        'dew': 'mean',
+        'hourly_dew_diff': 'mean',
+        'precip': 'sum',
+        'precipprob': 'mean',
+        'snow': 'sum',
+        'snowdepth': 'max',
+        'windgust': 'mean',
+        'windspeed': 'mean',
+        'winddir': 'mean',
+        'pressure': 'mean',
+        'visibility': 'mean',
+        'cloudcover': 'mean',
+        'solarradiation': 'mean',
+        'solarenergy': 'mean',
+        'uvindex': 'mean',
+    }
+    agg_dict = {k:v for k,v in agg_dict.items() if k in df.columns}
+    if 'conditions' not in df.columns:
+        raise KeyError("Falta la columna 'conditions' en el CSV.")
+    if motor_datos.motor_activo(motor) == "polars":
+        return motor_datos.agregar_diario_polars(df, agg_dict)
+
+    df_daily = df.groupby(df['dia']).agg(agg_dict)
+    df_daily.columns = [
+        f"{col[0]}_{col[1]}" if isinstance(col, tuple) else str(col)
+        for col in df_daily.columns.to_flat_index()
+    ]
+
+    # Equivale a juntar las condiciones de cada día en una lista y aplicar resumir_target_v3,
+    # pero con conteos vectorizados sobre códigos categóricos
+    df_daily['conditions_reduced'] = resumir_condiciones_diarias(df['dia'], df['conditions'])
+    df_daily = df_daily.reset_index().rename(columns={'dia':'date'})
+    return df_daily
 
 # ---------------------------
 # 5) Crear target desplazado (día siguiente)
 # ---------------------------
-df_daily['target'] = df_daily['conditions_reduced'].shift(-1)
-df_daily = df_daily.iloc[:-1].copy()
+def construir_target(df_daily, horizonte=1):
+    df_daily = df_daily.copy()
+    df_daily['target'] = df_daily['conditions_reduced'].shift(-horizonte)
+    return df_daily.iloc[:-horizonte].copy()
 
 # ---------------------------
 # 6) Features derivadas
-# ---------------------------
-df_daily['temp_range'] = df_daily['temp_max'] - df_daily['temp_min']
-df_daily['dew_point_diff'] = df_daily['temp_mean'] - df_daily['dew_mean']
-
-# ---------------------------
 # 7) Estacionalidad y lluvia previa
-# ---------------------------
-df_daily['date'] = pd.to_datetime(df_daily['date'])
-df_daily['month'] = df_daily['date'].dt.month
-df_daily['dayofyear'] = df_daily['date'].dt.dayofyear
-df_daily['month_sin'] = np.sin(2 * np.pi * df_daily['month'] / 12)
-df_daily['month_cos'] = np.cos(2 * np.pi * df_daily['month'] / 12)
-df_daily['dayofyear_sin'] = np.sin(2 * np.pi * df_daily['dayofyear'] / 365)
-df_daily['dayofyear_cos'] = np.cos(2 * np.pi * df_daily['dayofyear'] / 365)
-df_daily['rained_today'] = (df_daily['conditions_reduced'] == 'Rain').astype(int)
-df_daily['rain_yesterday'] = df_daily['rained_today'].shift(1).fillna(0).astype(int)
-
-# ---------------------------
 # 8) Fusionar "Partially cloudy" + "Overcast" → "Cloudy"
-# ---------------------------
-df_daily['conditions_reduced'] = df_daily['conditions_reduced'].replace({
-    'Partially cloudy': 'Cloudy',
-    'Overcast': 'Cloudy'
-})
-df_daily['target'] = df_daily['target'].replace({
-    'Partially cloudy': 'Cloudy',
-    'Overcast': 'Cloudy'
-})
-
-# ---------------------------
 # 9) Features finales
 # ---------------------------
-NUM_FEATS = [
-    'temp_mean','feelslike_mean','humidity_mean','dew_mean','pressure_mean',
-    'windspeed_mean','windgust_mean','winddir_mean','visibility_mean',
-    'solarradiation_mean','uvindex_mean','cloudcover_mean','precip_sum','snow_sum',
-    'temp_range','dew_point_diff','month_sin','month_cos','dayofyear_sin','dayofyear_cos'
-]
-NUM_FEATS = [c for c in NUM_FEATS if c in df_daily.columns]
-CAT_FEATS = ['rain_yesterday']
+def construir_features(df_daily, ventanas=False):
+    df_daily = df_daily.copy()
+    df_daily['temp_range'] = df_daily['temp_max'] - df_daily['temp_min']
+    df_daily['dew_point_diff'] = df_daily['temp_mean'] - df_daily['dew_mean']
 
-df_daily = df_daily.dropna(subset=['target'])
-X = df_daily[NUM_FEATS + CAT_FEATS].copy()
-y = df_daily['target'].copy()
+    # Tendencia de presión y lluvia acumulada de los días anteriores (ventana_features.py)
+    if ventanas:
+        ventana = ventana_features.calcular(ventana_features.diario_modelo(df_daily))
+        df_daily[ventana_features.FEATURES_VENTANA] = ventana.to_numpy()
 
-print("\nDataset diario procesado (primeras filas):")
-print(df_daily.head()[NUM_FEATS + CAT_FEATS + ['target']])
+    df_daily['date'] = pd.to_datetime(df_daily['date'])
+    df_daily['month'] = df_daily['date'].dt.month
+    df_daily['dayofyear'] = df_daily['date'].dt.dayofyear
+    df_daily['month_sin'] = np.sin(2 * np.pi * df_daily['month'] / 12)
+    df_daily['month_cos'] = np.cos(2 * np.pi * df_daily['month'] / 12)
+    df_daily['dayofyear_sin'] = np.sin(2 * np.pi * df_daily['dayofyear'] / 365)
+    df_daily['dayofyear_cos'] = np.cos(2 * np.pi * df_daily['dayofyear'] / 365)
+    df_daily['rained_today'] = (df_daily['conditions_reduced'] == 'Rain').astype(int)
+    df_daily['rain_yesterday'] = df_daily['rained_today'].shift(1).fillna(0).astype(int)
+
+    df_daily['conditions_reduced'] = df_daily['conditions_reduced'].replace({
+        'Partially cloudy': 'Cloudy',
+        'Overcast': 'Cloudy'
+    })
+    df_daily['target'] = df_daily['target'].replace({
+        'Partially cloudy': 'Cloudy',
+        'Overcast': 'Cloudy'
+    })
+
+    return df_daily.dropna(subset=['target'])
 
-# ---------------------------
-# 10) Split aleatorio estratificado
-# ---------------------------
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
 
-print("\nDistribución de clases en Train:")
-print(y_train.value_counts(normalize=True).round(3))
-print("\nDistribución de clases en Test:")
-print(y_test.value_counts(normalize=True).round(3))
+def columnas_features(df_daily):
+    num_feats = [c for c in NUM_FEATS + ventana_features.FEATURES_VENTANA if c in df_daily.columns]
+    return num_feats, CAT_FEATS
 
 # ---------------------------
-# 11) Preprocesador
+# 10) Split aleatorio estratificado
 # ---------------------------
-num_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='mean')),
-    ('scaler', StandardScaler())
-])
-cat_transformer = Pipeline(steps=[
-    ('onehot', OneHotEncoder(handle_unknown='ignore'))
-])
-preprocessor = ColumnTransformer(transformers=[
-    ('num', num_transformer, NUM_FEATS),
-    ('cat', cat_transformer, CAT_FEATS)
-])
+def dividir(df_daily, test_size=0.2, random_state=42):
+    num_feats, cat_feats = columnas_features(df_daily)
+    X = df_daily[num_feats + cat_feats].copy()
+    y = df_daily['target'].copy()
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
 
 # ---------------------------
+# 11) Preprocesador
 # 12) Modelo único: Gradient Boosting
 # ---------------------------
-gb_model = GradientBoostingClassifier(
-    n_estimators=100,
-    max_depth=5,
-    random_state=42
-)
+def crear_pipeline(num_feats, cat_feats, n_estimators=100, max_depth=5, random_state=42):
+    num_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),
+        ('scaler', StandardScaler())
+    ])
+    cat_transformer = Pipeline(steps=[
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+    ])
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', num_transformer, num_feats),
+        ('cat', cat_transformer, cat_feats)
+    ])
 
-pipeline = Pipeline(steps=[('preprocessor', preprocessor),
+    gb_model = GradientBoostingClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        random_state=random_state
+    )
+
+    return Pipeline(steps=[('preprocessor', preprocessor),
                            ('classifier', gb_model)])
 
-pipeline.fit(X_train, y_train)
-y_pred = pipeline.predict(X_test)
 
-acc = accuracy_score(y_test, y_pred)
-f1w = f1_score(y_test, y_pred, average='weighted')
-f1m = f1_score(y_test, y_pred, average='macro')
+def entrenar(split, n_estimators=100, max_depth=5, random_state=42):
+    X_train, X_test, y_train, y_test = split
+    num_feats = [c for c in X_train.columns if c not in CAT_FEATS]
+    pipeline = crear_pipeline(num_feats, CAT_FEATS, n_estimators, max_depth, random_state)
+    pipeline.fit(X_train, y_train)
+    return pipeline
 
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, zero_division=0))
 
-print("\nResumen de métricas finales:")
-print(pd.DataFrame([{
-    'Modelo': 'Gradient Boosting',
-    'Accuracy': acc,
-    'F1 weighted': f1w,
-    'F1 macro': f1m
-}]))
+def evaluar(pipeline, split):
+    _, X_test, _, y_test = split
+    y_pred = pipeline.predict(X_test)
+    return {
+        'y_pred': y_pred,
+        'Accuracy': accuracy_score(y_test, y_pred),
+        'F1 weighted': f1_score(y_test, y_pred, average='weighted'),
+        'F1 macro': f1_score(y_test, y_pred, average='macro'),
+    }
 
 # ---------------------------
-# 13) Guardar modelo entrenado
+# 13) Matriz de features para inferencia (una fila por fecha a predecir)
 # ---------------------------
-output_dir = "model_output"
-os.makedirs(output_dir, exist_ok=True)
+def matriz_inferencia(df):
+    """Features con el mismo armado que usan la app y los lotes (día-1 / día-2 de cada fecha)"""
+    diario = prediccion.diario_desde_horario(df)
+    fechas = pd.date_range(diario.index.min(), diario.index.max() + pd.Timedelta(days=1), freq="D")
+    return prediccion.construir_features_lote(diario, fechas)
 
-model_path = os.path.join(output_dir, "gradient_boosting_weather_model.pkl")
-joblib.dump(pipeline, model_path)
+# ---------------------------
+# 14) Guardar modelo entrenado
+# ---------------------------
+def guardar_modelo(pipeline, model_path=RUTA_MODELO):
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    joblib.dump(pipeline, model_path)
+    return model_path
 
-print(f"\n✅ Modelo guardado correctamente en: {model_path}")
 
-import joblib
+def leer_diario(ej, ruta_datos=RUTA_DATASET, desde=None, hasta=None, location=LOCATION, motor=None,
+                particionado=False):
+    """(datos, tabla diaria) como artefactos; con particionado=True salen del archivo por (estación, año)"""
+    if particionado:
+        datos = ej.archivo(archivo_particionado.ruta_manifiesto(location))
+        diario = ej.correr(archivo_particionado.agregar_diario, datos, location=location, desde=desde,
+                           hasta=hasta, motor=motor_datos.motor_activo(motor))
+        return datos, diario
+    datos = ej.correr(cargar_datos, ej.archivo(ruta_datos), desde=desde, hasta=hasta, location=location)
+    if ej.calculada(datos):
+        print("Dataset original cargado:", datos.valor.shape)
+    return datos, ej.correr(agregar_diario, datos, motor=motor_datos.motor_activo(motor))
+
+
+def preparar_horizontes(ej, diario, horizontes=HORIZONTES, ventanas=False, test_size=0.2, random_state=42):
+    """{horizonte: (features, split)} a partir de la misma tabla diaria"""
+    splits = {}
+    for h in horizontes:
+        con_target = ej.correr(construir_target, diario, horizonte=h)
+        features = ej.correr(construir_features, con_target, ventanas=ventanas)
+        splits[h] = (features, ej.correr(dividir, features, test_size=test_size, random_state=random_state))
+    return splits
+
+
+def mostrar_datos(splits):
+    df_daily = splits[1][0].valor
+    num_feats, cat_feats = columnas_features(df_daily)
+    print("\nDataset diario procesado (primeras filas):")
+    print(df_daily.head()[num_feats + cat_feats + ['target']])
+
+    _, _, y_train, y_test = splits[1][1].valor
+    print("\nDistribución de clases en Train:")
+    print(y_train.value_counts(normalize=True).round(3))
+    print("\nDistribución de clases en Test:")
+    print(y_test.value_counts(normalize=True).round(3))
+
+
+def entrenar_horizontes(ej, splits, procesos=None, n_estimators=100, max_depth=5, random_state=42):
+    """{horizonte: artefacto del pipeline}, un proceso por horizonte; también devuelve los segundos"""
+    inicio = time.perf_counter()
+    modelos = ej.correr_en_paralelo(entrenar, [
+        ((split,), {"n_estimators": n_estimators, "max_depth": max_depth, "random_state": random_state})
+        for _, split in splits.values()
+    ], procesos)
+    return dict(zip(splits, modelos)), time.perf_counter() - inicio
+
+
+def reportar_metricas(ej, modelos, splits, random_state=42, segundos_entrenamiento=None):
+    """Métricas del modelo de mañana contra el SGD online y, si hay más de uno, por horizonte"""
+    split = splits[1][1]
+    metricas = evaluar(modelos[1].valor, split.valor)
+    print("\nClassification Report:")
+    print(classification_report(split.valor[3], metricas['y_pred'], zero_division=0))
+
+    # Referencia: modelo online (modelo_online.py) con el mismo split, viendo cada fila una sola vez
+    online = ej.correr(modelo_online.entrenar_split, split, random_state=random_state, **modelo_online.PARAMETROS)
+    metricas_online = evaluar(online.valor, split.valor)
+
+    print("\nResumen de métricas finales:")
+    print(pd.DataFrame([{
+        'Modelo': 'Gradient Boosting',
+        'Accuracy': metricas['Accuracy'],
+        'F1 weighted': metricas['F1 weighted'],
+        'F1 macro': metricas['F1 macro']
+    }, {
+        'Modelo': 'SGD online (partial_fit)',
+        'Accuracy': metricas_online['Accuracy'],
+        'F1 weighted': metricas_online['F1 weighted'],
+        'F1 macro': metricas_online['F1 macro']
+    }]))
+
+    if len(modelos) > 1:
+        print(f"\nMétricas por horizonte (entrenamiento: {segundos_entrenamiento:.1f}s):")
+        filas = []
+        for h, modelo_h in modelos.items():
+            m = evaluar(modelo_h.valor, splits[h][1].valor)
+            filas.append({'Horizonte': h, 'Accuracy': m['Accuracy'], 'F1 weighted': m['F1 weighted'],
+                          'F1 macro': m['F1 macro']})
+        print(pd.DataFrame(filas).to_string(index=False))
+    return metricas
+
+
+def guardar_salida(pipeline, model_path=RUTA_MODELO, compacto=False):
+    """Copia del modelo de mañana en model_path (y su artefacto .arr con compacto=True)"""
+    guardar_modelo(pipeline, model_path)
+    print(f"\n✅ Modelo guardado correctamente en: {model_path}")
+    if compacto:
+        ruta_compacta = os.path.splitext(model_path)[0] + artefacto_compacto.EXTENSION
+        artefacto_compacto.exportar(pipeline, ruta_compacta)
+        print(f"✅ Artefacto compacto: {ruta_compacta} ({os.path.getsize(ruta_compacta) / 1e6:.2f} MB, "
+              f"pickle {os.path.getsize(model_path) / 1e6:.2f} MB)")
+    print(pipeline.feature_names_in_)
+
+
+def publicar_tabla(ej, datos, diario, modelo_manana, location=LOCATION,
+                   directorio_registro=registro_modelos.DIRECTORIO, particionado=False, ventanas=False):
+    """Predicciones de mañana para cada día del histórico local: la comparación histórica de la app
+    responde desde esta tabla y solo pide a la API las fechas fuera del rango"""
+    if particionado:
+        diario_api = ej.correr(archivo_particionado.diario_api, datos, location=location)
+    else:
+        diario_api = ej.correr(prediccion.diario_desde_horario, datos)
+    tabla = ej.correr(tabla_predicciones.construir_tabla, diario_api, diario, modelo_manana, ventanas=ventanas)
+    version = registro_modelos.RegistroModelos(directorio_registro).version(location)
+    tabla_predicciones.guardar(tabla.valor, location, version, directorio_registro)
+    print(f"✅ Tabla de predicciones: {len(tabla.valor)} días "
+          f"({tabla.valor.index.min():%Y-%m-%d} a {tabla.valor.index.max():%Y-%m-%d})")
+
+
+def actualizar_almacen(ej, datos, particionado=False):
+    """Almacén de features del sitio por defecto (el que usan la app y predecir_lote.py)"""
+    if particionado:
+        inferencia = ej.correr(archivo_particionado.matriz_inferencia, datos)
+    else:
+        inferencia = ej.correr(matriz_inferencia, datos)
+    almacen = almacen_features.abrir()
+    if (almacen is None or almacen.manifiesto.get("origen") != inferencia.clave
+            or almacen.manifiesto.get("dtype") != almacen_features.DTYPE):
+        manifiesto = almacen_features.escribir(inferencia.valor, LOCATION, origen=inferencia.clave)
+        print(f"✅ Almacén de features: {manifiesto['filas']} días ({manifiesto['inicio']} a {manifiesto['fin']})")
+
+
+def ejecutar(ruta_datos=RUTA_DATASET, model_path=RUTA_MODELO, usar_cache=True, test_size=0.2,
+             random_state=42, n_estimators=100, max_depth=5, desde=None, hasta=None,
+             horizontes=HORIZONTES, procesos=None, location=LOCATION,
+             directorio_registro=registro_modelos.DIRECTORIO, compacto=False, motor=None, particionado=False,
+             ventanas=False):
+    """Corre el pipeline completo; cada etapa se lee de caché si sus entradas y parámetros no cambiaron.
+
+    Se entrena un modelo por horizonte (1 = mañana) en procesos paralelos, todos a partir de la
+    misma tabla diaria, y se publican en el registro bajo 'location'; el de horizonte 1 se guarda
+    además en model_path (si se indica) como siempre. Con compacto=True también se exportan como
+    paquetes de arrays (.arr), que la app y los lotes cargan sin pickle. 'motor' elige pandas
+    o polars para la agregación diaria (motor_datos.py); el resultado es el mismo. Con
+    particionado=True los datos salen del archivo por (estación, año) de archivo_particionado.py
+    y cada año se agrega en su propio proceso. Con ventanas=True se suman las features de varios
+    días hacia atrás (ventana_features.py) y se deja listo el estado con que las calcula la app.
+    Cada paso es una función aparte (leer_diario, preparar_horizontes, entrenar_horizontes, ...).
+    """
+    ej = Ejecutor(usar_cache=usar_cache)
+    datos, diario = leer_diario(ej, ruta_datos, desde, hasta, location, motor, particionado)
+    splits = preparar_horizontes(ej, diario, horizontes, ventanas, test_size, random_state)
+    mostrar_datos(splits)
+
+    modelos, segundos = entrenar_horizontes(ej, splits, procesos, n_estimators, max_depth, random_state)
+    metricas = reportar_metricas(ej, modelos, splits, random_state, segundos)
+    pipeline = modelos[1].valor
+    if model_path:
+        guardar_salida(pipeline, model_path, compacto)
+
+    carpeta = registro_modelos.publicar({h: m.valor for h, m in modelos.items()}, location, directorio_registro,
+                                        compacto=compacto, datos_hasta=f"{diario.valor['date'].max():%Y-%m-%d}")
+    print(f"✅ Registro: {location}, horizontes {horizontes} en {carpeta}")
+    publicar_tabla(ej, datos, diario, modelos[1], location, directorio_registro, particionado, ventanas)
+
+    # Estado de servicio de la ventana: los últimos días de los datos, sin pisar días que la app ya trajo de la API
+    if ventanas:
+        estado = ventana_features.cargar(location).completar(ventana_features.diario_modelo(diario.valor))
+        print(f"✅ Estado de ventana: {ventana_features.guardar(estado)}")
+
+    # El almacén de features es de un solo sitio (el que usan la app y predecir_lote.py)
+    if location == LOCATION:
+        actualizar_almacen(ej, datos, particionado)
+
+    print("\nEtapas:")
+    print(ej.reporte())
+    borrados, liberados = ej.podar()
+    if borrados:
+        print(f"Caché de etapas: {borrados} resultados viejos borrados ({liberados / 1e6:.0f} MB)")
+    return pipeline, metricas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de Gradient Boosting")
+    parser.add_argument("--datos", default=RUTA_DATASET, help="CSV horario o almacén .sqlite (almacen_clima.py)")
+    parser.add_argument("--desde", help="Primer día a usar (YYYY-MM-DD)")
+    parser.add_argument("--hasta", help="Último día a usar (YYYY-MM-DD)")
+    parser.add_argument("--location", default=LOCATION, help="Sitio con el que se publica en el registro")
+    parser.add_argument("--salida", help=f"Copia del modelo de mañana (por defecto {RUTA_MODELO} para {LOCATION})")
+    parser.add_argument("--registro", default=registro_modelos.DIRECTORIO, help="Directorio del registro de modelos")
+    parser.add_argument("--compacto", action="store_true",
+                        help="Exportar también como paquete de arrays (.arr, sin pickle, con memory mapping)")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--motor", choices=motor_datos.MOTORES, default=None,
+                        help="Motor de la agregación diaria (por defecto MOTOR_DATOS o pandas)")
+    parser.add_argument("--particionado", action="store_true",
+                        help="Leer el archivo particionado por año (archivo_particionado.py) y agregar cada año en paralelo")
+    parser.add_argument("--ventanas", action="store_true",
+                        help="Agregar features de ventana (tendencia de presión y lluvia de 3 y 7 días)")
+    parser.add_argument("--sin-cache", action="store_true", help="Recalcular todas las etapas")
+    parser.add_argument("--horizontes", type=int, default=len(HORIZONTES),
+                        help="Entrenar los horizontes 1..N (1 = solo mañana)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para entrenar (por defecto, uno por núcleo)")
+    parser.add_argument("--modo", choices=["diario", "horario"], default="diario",
+                        help="horario: modelo de las próximas horas sobre la serie horaria (modelo_horario.py)")
+    parser.add_argument("--horas", type=int, default=24, help="Con --modo horario, horizonte máximo en horas")
+    args = parser.parse_args()
+
+    if args.modo == "horario":
+        import modelo_horario
+        modelo_horario.ejecutar(args.datos, args.salida or modelo_horario.RUTA_MODELO, horas=args.horas,
+                                desde=args.desde, hasta=args.hasta, location=args.location,
+                                usar_cache=not args.sin_cache)
+        raise SystemExit
 
-model = joblib.load("model_output\gradient_boosting_weather_model.pkl")
-print(model.feature_names_in_)
+    salida = args.salida or (RUTA_MODELO if args.location == LOCATION else None)
+    ejecutar(args.datos, salida, usar_cache=not args.sin_cache,
+             n_estimators=args.n_estimators, max_depth=args.max_depth, desde=args.desde, hasta=args.hasta,
+             horizontes=list(range(1, args.horizontes + 1)), procesos=args.procesos,
+             location=args.location, directorio_registro=args.registro, compacto=args.compacto,
+             motor=args.motor, particionado=args.particionado, ventanas=args.ventanas)
@@ -0,0 +1,351 @@
+import os
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+import modelo
+from cache_etapas import Ejecutor
+from almacen_clima import RUTA_DATASET
+
+# Modelo horario (nowcasting): condición dentro de 1..HORAS horas a partir de la serie horaria,
+# sin pasar por la tabla diaria. Un solo modelo para todos los horizontes (la cantidad de horas
+# es una feature más), así las próximas 24 horas se puntúan en una sola llamada.
+DIRECTORIO = os.path.join("model_output", "horario")
+RUTA_MODELO = os.path.join(DIRECTORIO, "modelo_horario.pkl")
+LOCATION = "Mendoza,Argentina"
+
+HORAS = 24
+SEGUNDOS_HORA = 3600
+DTYPE = np.float32
+
+CLASES = np.array(["Clear", "Cloudy", "Rain"], dtype=object)
+NUBES = ["Partially cloudy", "Overcast"]
+
+VARIABLES = ['temp', 'humidity', 'dew', 'pressure', 'windspeed', 'windgust', 'cloudcover',
+             'visibility', 'precip', 'solarradiation']
+VARIABLES_LAG = ['temp', 'humidity', 'pressure', 'cloudcover', 'precip']
+LAGS = [1, 2, 3, 6, 12, 24]
+VARIABLES_DELTA = ['temp', 'humidity', 'pressure']
+DELTAS = [3, 24]
+VENTANAS_LLUVIA = [6, 24]
+
+COLUMNAS_BASE = (
+    VARIABLES
+    + [f"{v}_lag{l}" for v in VARIABLES_LAG for l in LAGS]
+    + [f"{v}_delta{l}" for v in VARIABLES_DELTA for l in DELTAS]
+    + ['cloudy_ahora', 'rain_ahora']
+    + [f"horas_lluvia_{k}h" for k in VENTANAS_LLUVIA]
+    + ['hora_sin', 'hora_cos']
+)
+COLUMNAS_HORIZONTE = ['horizonte', 'hora_objetivo_sin', 'hora_objetivo_cos', 'dia_objetivo_sin', 'dia_objetivo_cos']
+COLUMNAS = COLUMNAS_BASE + COLUMNAS_HORIZONTE
+# Historia que hace falta antes de la última hora para armar sus features
+HISTORIA = max(LAGS + DELTAS + VENTANAS_LLUVIA)
+
+
+def codigo_clase(condiciones):
+    """0 = Clear, 1 = Cloudy, 2 = Rain para cada hora (resumir_target_v3 de una sola hora + la fusión de nubes)"""
+    texto = pd.Series(condiciones, dtype=object).astype(str).str.strip()
+    return np.select([texto.str.contains("Rain", regex=False), texto.isin(NUBES)], [2, 1], 0).astype(np.int8)
+
+
+# ---------------------------
+# Serie horaria regular
+# ---------------------------
+def serie_horaria(df):
+    """Grilla de una fila por hora (por datetimeEpoch) con las variables en float32 y la clase de cada hora.
+
+    Las horas que faltan quedan en NaN / clase -1, así los desfasajes son siempre de horas
+    reales y no de filas. Devuelve {inicio, valores, clase, desfase} (desfase: hora local - UTC).
+    """
+    epoch = df['datetimeEpoch'].to_numpy(dtype=np.int64)
+    inicio = int(epoch.min())
+    n = int((epoch.max() - inicio) // SEGUNDOS_HORA) + 1
+    posicion = (epoch - inicio) // SEGUNDOS_HORA
+
+    valores = np.full((n, len(VARIABLES)), np.nan, dtype=DTYPE)
+    valores[posicion] = df[VARIABLES].to_numpy(dtype=DTYPE)
+    clase = np.full(n, -1, dtype=np.int8)
+    clase[posicion] = codigo_clase(df['conditions'])
+
+    local = pd.to_datetime(df['datetime_completo']).to_numpy().astype('datetime64[s]').astype(np.int64)
+    desfase = int(np.median(local - epoch))
+    return {"inicio": inicio, "valores": valores, "clase": clase, "desfase": desfase}
+
+
+def _desfasar(x, horas):
+    """x con 'horas' filas de atraso (NaN al principio)"""
+    salida = np.full_like(x, np.nan)
+    salida[horas:] = x[:-horas]
+    return salida
+
+
+def _ciclicas(segundos_locales):
+    hora = (segundos_locales // SEGUNDOS_HORA) % 24
+    dia = pd.to_datetime(segundos_locales, unit="s").dayofyear.to_numpy()
+    return (np.sin(2 * np.pi * hora / 24), np.cos(2 * np.pi * hora / 24),
+            np.sin(2 * np.pi * dia / 365), np.cos(2 * np.pi * dia / 365))
+
+
+def matriz_base(serie):
+    """Features de cada hora de la grilla (COLUMNAS_BASE), todas con desfasajes vectorizados"""
+    valores, clase = serie["valores"], serie["clase"]
+    n = len(clase)
+    base = np.empty((n, len(COLUMNAS_BASE)), dtype=DTYPE)
+    i = len(VARIABLES)
+    base[:, :i] = valores
+
+    for v in VARIABLES_LAG:
+        x = valores[:, VARIABLES.index(v)]
+        for l in LAGS:
+            base[:, i] = _desfasar(x, l)
+            i += 1
+
+    for v in VARIABLES_DELTA:
+        x = valores[:, VARIABLES.index(v)]
+        for l in DELTAS:
+            base[:, i] = x - _desfasar(x, l)
+            i += 1
+
+    base[:, i] = np.where(clase < 0, np.nan, clase == 1)
+    base[:, i + 1] = np.where(clase < 0, np.nan, clase == 2)
+    i += 2
+    # Horas con lluvia en las últimas k (incluida la actual), con sumas acumuladas
+    acumulada = np.concatenate([[0], np.cumsum(clase == 2)])
+    for k in VENTANAS_LLUVIA:
+        horas = np.full(n, np.nan, dtype=DTYPE)
+        horas[k - 1:] = acumulada[k:] - acumulada[:-k]
+        base[:, i] = horas
+        i += 1
+
+    locales = serie["inicio"] + serie["desfase"] + np.arange(n, dtype=np.int64) * SEGUNDOS_HORA
+    hora_sin, hora_cos, _, _ = _ciclicas(locales)
+    base[:, i], base[:, i + 1] = hora_sin, hora_cos
+    return base
+
+
+def _filas(serie, base, t, h):
+    """Matriz COLUMNAS de las horas t con horizonte h (arrays del mismo largo)"""
+    X = np.empty((len(t), len(COLUMNAS)), dtype=DTYPE)
+    X[:, :len(COLUMNAS_BASE)] = base[t]
+    locales = serie["inicio"] + serie["desfase"] + (t + h).astype(np.int64) * SEGUNDOS_HORA
+    X[:, len(COLUMNAS_BASE)] = h
+    X[:, len(COLUMNAS_BASE) + 1:] = np.column_stack(_ciclicas(locales))
+    return X
+
+
+def matriz_entrenamiento(serie, horas=HORAS, muestras=1, random_state=42):
+    """(X float32, y, t, h): por cada hora observada, 'muestras' horizontes al azar entre 1 y 'horas'.
+
+    Muestrear el horizonte en lugar de repetir cada hora 'horas' veces deja el tamaño de la
+    matriz igual al de la serie. Las filas quedan ordenadas por hora (para cortar por tiempo).
+    """
+    clase = serie["clase"]
+    rng = np.random.default_rng(random_state)
+    t = np.repeat(np.flatnonzero(clase >= 0), muestras)
+    h = rng.integers(1, horas + 1, size=len(t))
+    validas = (t + h < len(clase))
+    t, h = t[validas], h[validas]
+    validas = clase[t + h] >= 0
+    t, h = t[validas], h[validas]
+    X = _filas(serie, matriz_base(serie), t, h)
+    return X, CLASES[clase[t + h]], t, h
+
+
+def matriz_evaluacion(serie, desde, horas=HORAS):
+    """(X, y, t, h) con todos los horizontes 1..horas de cada hora observada desde 'desde', para
+    comparar cada horizonte contra la persistencia con la misma cantidad de filas"""
+    clase = serie["clase"]
+    t = np.repeat(np.flatnonzero(clase[desde:] >= 0) + desde, horas)
+    h = np.tile(np.arange(1, horas + 1), len(t) // horas)
+    validas = t + h < len(clase)
+    t, h = t[validas], h[validas]
+    validas = clase[t + h] >= 0
+    t, h = t[validas], h[validas]
+    X = _filas(serie, matriz_base(serie), t, h)
+    return X, CLASES[clase[t + h]], t, h
+
+
+# ---------------------------
+# Modelo
+# ---------------------------
+class ModeloHorario:
+    """Clasificador de la condición dentro de 'horizonte' horas; predict_proba recibe la matriz COLUMNAS.
+
+    usa_modelo[h - 1] dice si en el test el modelo le ganó a la persistencia a h horas; en los
+    horizontes donde no, proximas() devuelve la condición de la última hora observada.
+    """
+
+    def __init__(self, clasificador, horas, datos_hasta=None, usa_modelo=None):
+        self.clasificador = clasificador
+        self.horas = horas
+        self.datos_hasta = datos_hasta
+        self.usa_modelo = np.ones(horas, dtype=bool) if usa_modelo is None else np.asarray(usa_modelo, dtype=bool)
+        self.classes_ = clasificador.classes_
+        self.feature_names_in_ = np.array(COLUMNAS, dtype=object)
+
+    def predict_proba(self, X):
+        return self.clasificador.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def proximas(self, df):
+        """Las próximas 'horas' horas después de la última hora de df (formato del CSV), en una sola llamada.
+
+        df necesita al menos las HISTORIA horas anteriores; devuelve [hora local, horizonte, clase,
+        origen, prob_*], con origen 'persistencia' en los horizontes donde el modelo no le gana.
+        """
+        serie = serie_horaria(df)
+        base = matriz_base(serie)
+        ultima = len(serie["clase"]) - 1
+        h = np.arange(1, self.horas + 1)
+        probs = self.predict_proba(_filas(serie, base, np.full(len(h), ultima), h))
+        persistir = ~self.usa_modelo[h - 1] & (serie["clase"][ultima] >= 0)
+        if persistir.any():
+            actual = list(self.classes_).index(CLASES[serie["clase"][ultima]])
+            probs[persistir] = np.eye(len(self.classes_))[actual]
+        locales = serie["inicio"] + serie["desfase"] + (ultima + h) * SEGUNDOS_HORA
+        salida = pd.DataFrame({
+            "hora": pd.to_datetime(locales, unit="s"),
+            "horizonte": h,
+            "clase": self.classes_[np.argmax(probs, axis=1)],
+            "origen": np.where(persistir, "persistencia", "modelo"),
+        })
+        for i, clase in enumerate(self.classes_):
+            salida[f"prob_{clase}"] = probs[:, i]
+        return salida
+
+
+def proximas_api(modelo_horario, location=LOCATION, ahora=None):
+    """Próximas horas del sitio a partir de la última hora ya observada (consulta ayer..hoy con include=hours).
+
+    La respuesta de hoy trae también las horas pronosticadas por la API; se descartan las
+    posteriores a 'ahora' (epoch), así el modelo parte solo de observaciones.
+    """
+    from clima_api import obtener_datos_clima
+    from prefetch import ZONA_MENDOZA
+    import ingesta
+    ahora = time.time() if ahora is None else ahora
+    hoy = pd.Timestamp(ahora, unit="s", tz="UTC").tz_convert(ZONA_MENDOZA).date()
+    dias, _, _ = obtener_datos_clima(location, f"{hoy - pd.Timedelta(days=1):%Y-%m-%d}", f"{hoy:%Y-%m-%d}",
+                                     include="hours")
+    df = ingesta.filas_desde_api(dias)
+    if df.empty:
+        raise ValueError("La API no devolvió horas para el modelo horario.")
+    df = df.reindex(columns=list(dict.fromkeys(VARIABLES + ['conditions', 'datetime_completo', 'datetimeEpoch'])))
+    df = df[df['datetimeEpoch'] <= ahora]
+    if len(df) < HISTORIA + 1:
+        raise ValueError(f"Se necesitan al menos {HISTORIA + 1} horas observadas (hay {len(df)}).")
+    return modelo_horario.proximas(df)
+
+
+def entrenar(X, y, max_iter=200, learning_rate=0.05, max_leaf_nodes=15, l2_regularization=1.0, random_state=42):
+    """Histogram gradient boosting: agrupa cada columna en 255 bins, así escala a millones de filas"""
+    clasificador = HistGradientBoostingClassifier(max_iter=max_iter, learning_rate=learning_rate,
+                                                  max_leaf_nodes=max_leaf_nodes, l2_regularization=l2_regularization,
+                                                  early_stopping=False, random_state=random_state)
+    return clasificador.fit(X, y)
+
+
+def evaluar(clasificador, X, y, h, persistencia, horizontes=(1, 3, 6, 12, 24)):
+    """Accuracy y F1 macro por horizonte, contra la persistencia (la condición de ahora se mantiene)"""
+    predicho = clasificador.predict(X)
+    filas = []
+    for horizonte in [hh for hh in horizontes if (h == hh).any()] + ["todos"]:
+        m = np.ones(len(h), dtype=bool) if horizonte == "todos" else h == horizonte
+        filas.append({
+            "Horas": horizonte, "Filas": int(m.sum()),
+            "Accuracy": accuracy_score(y[m], predicho[m]),
+            "F1 macro": f1_score(y[m], predicho[m], average="macro"),
+            "Accuracy persistencia": accuracy_score(y[m], persistencia[m]),
+            "F1 macro persistencia": f1_score(y[m], persistencia[m], average="macro"),
+        })
+    return pd.DataFrame(filas)
+
+
+def guardar(modelo_horario, ruta=RUTA_MODELO):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.tmp-{os.getpid()}"
+    joblib.dump(modelo_horario, temporal)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar(ruta=RUTA_MODELO):
+    return joblib.load(ruta) if os.path.exists(ruta) else None
+
+
+def ejecutar(ruta_datos=RUTA_DATASET, salida=RUTA_MODELO, horas=HORAS, muestras=1, test_size=0.2,
+             max_iter=200, random_state=42, desde=None, hasta=None, location=LOCATION, usar_cache=True):
+    """Entrena con las primeras horas y evalúa con el último test_size de la serie (corte temporal:
+    con horas vecinas casi iguales, un split al azar mediría memoria y no pronóstico)"""
+    tiempos = {}
+    inicio = time.perf_counter()
+    # La lectura es la misma etapa (y la misma caché) que la de modelo.py
+    ej = Ejecutor(usar_cache=usar_cache)
+    df = ej.correr(modelo.cargar_datos, ej.archivo(ruta_datos), desde=desde, hasta=hasta, location=location).valor
+    ej.podar()
+    tiempos["lectura"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    serie = serie_horaria(df)
+    X, y, t, h = matriz_entrenamiento(serie, horas, muestras, random_state)
+    tiempos["features"] = time.perf_counter() - inicio
+
+    # Las filas están ordenadas por hora: train es una vista contigua; se descartan las filas
+    # cuyo objetivo cae después del corte para que ninguna hora de test entre al train
+    corte = int(len(serie["clase"]) * (1 - test_size))
+    fin_train = int(np.searchsorted(t, corte - horas))
+    X_test, y_test, t_test, h_test = matriz_evaluacion(serie, corte, horas)
+    print(f"Serie: {len(df)} horas, matriz {X.shape} {X.dtype} ({X.nbytes / 1e6:.0f} MB); "
+          f"train {fin_train} filas, test {len(t_test)} (todos los horizontes)")
+
+    inicio = time.perf_counter()
+    clasificador = entrenar(X[:fin_train], y[:fin_train], max_iter=max_iter, random_state=random_state)
+    tiempos["entrenamiento"] = time.perf_counter() - inicio
+
+    # Cada horizonte usa el modelo solo si en el test le gana a la persistencia en F1 macro
+    persistencia = CLASES[serie["clase"][t_test]]
+    metricas = evaluar(clasificador, X_test, y_test, h_test, persistencia, horizontes=range(1, horas + 1))
+    por_horizonte = metricas[metricas["Horas"] != "todos"].set_index("Horas")
+    usa_modelo = (por_horizonte["F1 macro"] > por_horizonte["F1 macro persistencia"]).reindex(
+        range(1, horas + 1), fill_value=False).to_numpy()
+    metricas["Usa modelo"] = metricas["Horas"].map(lambda hh: "-" if hh == "todos" else bool(usa_modelo[hh - 1]))
+    print("\nTest (último tramo de la serie):")
+    print(metricas[metricas["Horas"].isin([1, 3, 6, 12, 24, "todos"])].to_string(index=False))
+    horizontes_modelo = [hh for hh in range(1, horas + 1) if usa_modelo[hh - 1]]
+    print(f"Horizontes con el modelo: {horizontes_modelo or 'ninguno'}; el resto usa la persistencia")
+
+    modelo_horario = ModeloHorario(clasificador, horas, datos_hasta=f"{df['dia'].max():%Y-%m-%d}",
+                                   usa_modelo=usa_modelo)
+    if salida:
+        print(f"\n✅ Modelo horario guardado en: {guardar(modelo_horario, salida)}")
+
+    inicio = time.perf_counter()
+    proximas = modelo_horario.proximas(df.tail(HISTORIA + 1))
+    tiempos["próximas 24 h"] = time.perf_counter() - inicio
+    print(f"\nPróximas {horas} horas después de {df['datetime_completo'].max()}:")
+    print(proximas[["hora", "horizonte", "clase", "origen"]].head(6).to_string(index=False))
+    print("\nTiempos: " + ", ".join(f"{etapa} {s:.2f}s" for etapa, s in tiempos.items()))
+    return modelo_horario, metricas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modelo horario: condición dentro de 1..N horas")
+    parser.add_argument("--datos", default=RUTA_DATASET, help="CSV horario o almacén .sqlite")
+    parser.add_argument("--horas", type=int, default=HORAS, help="Horizonte máximo en horas")
+    parser.add_argument("--muestras", type=int, default=1, help="Horizontes sorteados por hora de entrenamiento")
+    parser.add_argument("--max-iter", type=int, default=200)
+    parser.add_argument("--desde", help="Primer día a usar (YYYY-MM-DD)")
+    parser.add_argument("--hasta", help="Último día a usar (YYYY-MM-DD)")
+    parser.add_argument("--salida", default=RUTA_MODELO)
+    parser.add_argument("--sin-cache", action="store_true", help="Releer los datos aunque estén en caché")
+    args = parser.parse_args()
+
+    ejecutar(args.datos, args.salida, horas=args.horas, muestras=args.muestras, max_iter=args.max_iter,
+             desde=args.desde, hasta=args.hasta, usar_cache=not args.sin_cache)
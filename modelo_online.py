@@ -0,0 +1,281 @@
+import os
+import json
+import shutil
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+import modelo
+import prediccion
+import almacen_clima
+import ventana_features
+
+LOCATION = "Mendoza,Argentina"
+DIRECTORIO = os.path.join("model_output", "online")
+ACTUAL = "modelo_online.pkl"
+CHECKPOINTS = "checkpoints"
+# Checkpoints diarios que se conservan (el más viejo se borra)
+MANTENER_CHECKPOINTS = 14
+
+# Regularización y paso del SGD (los usan el checkpoint diario y la comparación de modelo.py)
+PARAMETROS = {"alpha": 1e-3, "eta0": 0.01}
+
+CLASES = ["Clear", "Cloudy", "Rain"]
+CATEGORICAS = ["rain_yesterday"]
+NUMERICAS = [c for c in prediccion.FEATURES if c not in CATEGORICAS]
+
+
+# ---------------------------
+# Estandarización incremental
+# ---------------------------
+class EstandarizadorIncremental:
+    """Media y varianza por columna acumuladas lote a lote (fórmula de Chan); los NaN no cuentan.
+
+    Transforma como SimpleImputer(mean) + StandardScaler, pero con las estadísticas de todo
+    lo visto hasta ahora en lugar de las del conjunto de entrenamiento.
+    """
+
+    def __init__(self, n_columnas):
+        self.n = np.zeros(n_columnas)
+        self.media = np.zeros(n_columnas)
+        self.m2 = np.zeros(n_columnas)
+
+    def actualizar(self, X):
+        validos = ~np.isnan(X)
+        n_lote = validos.sum(axis=0)
+        media_lote = np.divide(np.where(validos, X, 0).sum(axis=0), n_lote,
+                               out=np.zeros_like(self.media), where=n_lote > 0)
+        m2_lote = (np.where(validos, X - media_lote, 0) ** 2).sum(axis=0)
+
+        total = self.n + n_lote
+        peso = np.divide(n_lote, total, out=np.zeros_like(self.media), where=total > 0)
+        delta = media_lote - self.media
+        self.media = self.media + delta * peso
+        self.m2 = self.m2 + m2_lote + delta ** 2 * self.n * peso
+        self.n = total
+
+    @property
+    def escala(self):
+        varianza = np.divide(self.m2, self.n, out=np.zeros_like(self.m2), where=self.n > 0)
+        escala = np.sqrt(varianza)
+        return np.where(escala > 0, escala, 1.0)
+
+    def transformar(self, X):
+        return (np.where(np.isnan(X), self.media, X) - self.media) / self.escala
+
+
+# ---------------------------
+# Modelo
+# ---------------------------
+class ModeloOnline:
+    """Clasificador lineal (SGD con log-loss) que aprende por lotes diarios con partial_fit.
+
+    Mismo contrato que el pipeline para la app: predict_proba, predict, classes_, feature_names_in_.
+    Guarda además el último día aprendido y el historial de evaluación día a día
+    (se predice cada día antes de aprender de él).
+    """
+
+    def __init__(self, alpha=PARAMETROS["alpha"], eta0=PARAMETROS["eta0"], random_state=42):
+        self.feature_names_in_ = np.array(prediccion.FEATURES, dtype=object)
+        self.classes_ = np.array(CLASES, dtype=object)
+        self.escalador = EstandarizadorIncremental(len(NUMERICAS))
+        # Paso constante: con un día por actualización, el 'optimal' de scikit-learn da saltos enormes
+        # al principio, y un paso que decae deja de seguir al clima después de unos años
+        self.clasificador = SGDClassifier(loss="log_loss", alpha=alpha, learning_rate="constant", eta0=eta0,
+                                          random_state=random_state)
+        self.ultimo_dia = None
+        self.filas_vistas = 0
+        self.historial = []  # [{dia, real, online, gb}]
+
+    def _numericas(self, X):
+        return X[NUMERICAS].to_numpy(dtype=np.float64)
+
+    def _matriz(self, X, numericas=None):
+        numericas = self._numericas(X) if numericas is None else numericas
+        return np.hstack([self.escalador.transformar(numericas), X[CATEGORICAS].to_numpy(dtype=np.float64)])
+
+    def entrenado(self):
+        return self.filas_vistas > 0
+
+    def actualizar(self, X, y):
+        """Un paso de partial_fit con las filas nuevas (primero se suman a las estadísticas)"""
+        numericas = self._numericas(X)
+        self.escalador.actualizar(numericas)
+        self.clasificador.partial_fit(self._matriz(X, numericas), np.asarray(y), classes=self.classes_)
+        self.filas_vistas += len(X)
+        return self
+
+    def predict_proba(self, X):
+        if not self.entrenado():
+            raise ValueError("El modelo online todavía no aprendió ningún día")
+        return self.clasificador.predict_proba(self._matriz(X))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def filas_entrenamiento(df, ventanas=False):
+    """Filas (features del día d, target = condición del día d+1) con el mismo armado que modelo.py.
+
+    Con ventanas=True se agregan las features de ventana (las necesita el Gradient Boosting
+    publicado con --ventanas para la comparación; el modelo online usa solo FEATURES).
+    """
+    diario = modelo.agregar_diario(df)
+    con_target = modelo.construir_target(diario, horizonte=1)
+    return modelo.construir_features(con_target, ventanas=ventanas)
+
+
+def entrenar_split(split, random_state=42, alpha=PARAMETROS["alpha"], eta0=PARAMETROS["eta0"]):
+    """Una sola pasada de partial_fit sobre el train del split, en orden de fecha y de a un día.
+
+    Es la versión comparable con el Gradient Boosting del reporte de modelo.py: mismo
+    train/test, pero el modelo online ve cada fila una vez, como en producción.
+    """
+    X_train, _, y_train, _ = split
+    orden = np.argsort(X_train.index.to_numpy(), kind="stable")
+    online = ModeloOnline(alpha, eta0, random_state)
+    for i in orden:
+        online.actualizar(X_train.iloc[[i]], y_train.iloc[[i]])
+    return online
+
+
+# ---------------------------
+# Checkpoints
+# ---------------------------
+def cargar(directorio=DIRECTORIO):
+    ruta = os.path.join(directorio, ACTUAL)
+    return joblib.load(ruta) if os.path.exists(ruta) else None
+
+
+def guardar(online, directorio=DIRECTORIO):
+    """Escritura atómica del modelo actual y una copia por último día aprendido"""
+    carpeta = os.path.join(directorio, CHECKPOINTS)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(directorio, ACTUAL)
+    temporal = f"{ruta}.tmp-{os.getpid()}"
+    joblib.dump(online, temporal)
+    shutil.copyfile(temporal, os.path.join(carpeta, f"{online.ultimo_dia}.pkl"))
+    os.replace(temporal, ruta)
+
+    for viejo in sorted(os.listdir(carpeta))[:-MANTENER_CHECKPOINTS]:
+        os.remove(os.path.join(carpeta, viejo))
+    return ruta
+
+
+# ---------------------------
+# Actualización diaria
+# ---------------------------
+def _modelo_gb(location):
+    """(pipeline, datos_hasta) del Gradient Boosting publicado (mañana), o None si no hay"""
+    from registro_modelos import obtener_registro
+    registro = obtener_registro()
+    sitio = next((s for s in registro.sitios() if s["location"] == location), None)
+    if sitio is None or not sitio.get("datos_hasta"):
+        return None
+    return registro.obtener(location), sitio["datos_hasta"]
+
+
+def _predicciones_gb(filas, gb):
+    """Predicción del Gradient Boosting publicado para cada fila; None en los días que ya estaban
+    en sus datos de entrenamiento (ahí acertaría de memoria) o si no hay modelo"""
+    if gb is None:
+        return [None] * len(filas)
+    pipeline, datos_hasta = gb
+    nuevas = (filas['date'] > pd.Timestamp(datos_hasta)).to_numpy()
+    predicho = np.full(len(filas), None, dtype=object)
+    if nuevas.any():
+        columnas = list(getattr(pipeline, "feature_names_in_", prediccion.FEATURES))
+        predicho[nuevas] = pipeline.predict(filas.loc[nuevas, columnas])
+    return list(predicho)
+
+
+def actualizar_diario(ruta_datos=None, hasta=None, directorio=DIRECTORIO, reiniciar=False, location=LOCATION):
+    """Aprende los días posteriores al último checkpoint y guarda uno nuevo.
+
+    Solo se leen los datos horarios desde el día anterior al último aprendido (hace falta para
+    rain_yesterday), así que el costo es proporcional a los días nuevos; con el almacén SQLite
+    la lectura también. Cada día se predice antes de aprender de él, y se anota junto con la
+    predicción del Gradient Boosting publicado. Sin 'hasta', el último día de los datos se toma
+    como incompleto: su fila entra en la próxima corrida.
+    """
+    if ruta_datos is None:
+        ruta_datos = almacen_clima.RUTA if almacen_clima.disponible() else modelo.RUTA_DATASET
+    online = None if reiniciar else cargar(directorio)
+    online = online or ModeloOnline()
+
+    # Si el Gradient Boosting publicado usa features de ventana, hacen falta 8 días antes del primero nuevo
+    gb = _modelo_gb(location)
+    ventanas = gb is not None and bool(ventana_features.requeridas(gb[0]))
+    desde = None
+    if online.ultimo_dia is not None:
+        desde = pd.Timestamp(online.ultimo_dia) - pd.Timedelta(days=ventana_features.DIAS if ventanas else 1)
+    df = modelo.cargar_datos(ruta_datos, desde=desde, hasta=hasta, location=location)
+    if hasta is None and len(df):
+        df = df[df['dia'] < df['dia'].max()]
+    filas = filas_entrenamiento(df, ventanas=ventanas) if len(df) else pd.DataFrame()
+    if len(filas) and online.ultimo_dia is not None:
+        filas = filas[filas['date'] > pd.Timestamp(online.ultimo_dia)]
+    if len(filas) == 0:
+        return {"dias_nuevos": 0, "ultimo_dia": online.ultimo_dia, "ruta": None}
+
+    X = filas[prediccion.FEATURES]
+    y = filas['target'].to_numpy()
+    predicho_gb = _predicciones_gb(filas, gb)
+    for i, dia in enumerate(filas['date']):
+        fila = X.iloc[[i]]
+        predicho = online.predict(fila)[0] if online.entrenado() else None
+        online.actualizar(fila, y[i:i + 1])
+        online.historial.append({
+            "dia": f"{dia:%Y-%m-%d}",
+            "real": y[i],
+            "online": predicho,
+            "gb": predicho_gb[i],
+        })
+    online.ultimo_dia = f"{filas['date'].iloc[-1]:%Y-%m-%d}"
+    return {"dias_nuevos": len(filas), "ultimo_dia": online.ultimo_dia, "ruta": guardar(online, directorio)}
+
+
+def reporte(online, ultimos=None):
+    """Accuracy y F1 sobre los días evaluados de a uno.
+
+    El modelo online se mide en todos; online y Gradient Boosting se comparan además en los
+    mismos días, los posteriores a los datos con que se entrenó el Gradient Boosting.
+    """
+    historial = [h for h in online.historial if h["online"] is not None]
+    if ultimos:
+        historial = historial[-ultimos:]
+    comunes = [h for h in historial if h["gb"] is not None]
+    filas = []
+    for nombre, dias, campo in (("SGD online (partial_fit), todos los días", historial, "online"),
+                                ("SGD online (partial_fit)", comunes, "online"),
+                                ("Gradient Boosting", comunes, "gb")):
+        if dias:
+            real, predicho = [h["real"] for h in dias], [h[campo] for h in dias]
+            filas.append({"Modelo": nombre, "Días": len(dias), "Accuracy": accuracy_score(real, predicho),
+                          "F1 weighted": f1_score(real, predicho, average="weighted"),
+                          "F1 macro": f1_score(real, predicho, average="macro")})
+    return pd.DataFrame(filas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modelo online (SGD): aprende los días nuevos y guarda un checkpoint")
+    parser.add_argument("--datos", help="CSV horario o almacén .sqlite (por defecto, clima.sqlite si existe)")
+    parser.add_argument("--hasta", help="Último día con datos completos (YYYY-MM-DD)")
+    parser.add_argument("--directorio", default=DIRECTORIO)
+    parser.add_argument("--reiniciar", action="store_true", help="Empezar de cero en lugar de seguir el checkpoint")
+    parser.add_argument("--ultimos", type=int, default=None, help="Días del historial para el reporte (por defecto todos)")
+    args = parser.parse_args()
+
+    resultado = actualizar_diario(args.datos, args.hasta, args.directorio, reiniciar=args.reiniciar)
+    print(f"✅ Días aprendidos: {resultado['dias_nuevos']} (último: {resultado['ultimo_dia']})")
+    if resultado["ruta"]:
+        print(f"Checkpoint: {resultado['ruta']}")
+
+    online = cargar(args.directorio)
+    if online is not None:
+        print("\nEvaluación día a día (se predice cada día antes de aprenderlo):")
+        print(reporte(online, args.ultimos).to_string(index=False))
+        print(json.dumps({"filas_vistas": online.filas_vistas, "ultimo_dia": online.ultimo_dia}))
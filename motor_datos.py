@@ -0,0 +1,243 @@
+import os
+import numpy as np
+import pandas as pd
+
+from agregacion import OPCIONES_NUBES, lluvia_diaria, moda_diaria, suma_compensada_por_grupo
+
+# Motor para las agregaciones horario → diario (modelo.py y la pestaña de exploración).
+# pandas es el de siempre; polars (opcional, `pip install polars`) corre las mismas consultas
+# en forma perezosa y en varios hilos, y devuelve exactamente los mismos DataFrames de pandas.
+MOTORES = ("pandas", "polars")
+MOTOR = os.environ.get("MOTOR_DATOS", "pandas")
+
+ORDEN_ESTACIONES = ['Verano', 'Otoño', 'Invierno', 'Primavera']
+LLUVIA_KEYWORDS = [
+    'Rain', 'Drizzle', 'Showers', 'Thunderstorm',
+    'Precipitation', 'Rain And Snow', 'Drizzle/Rain'
+]
+
+
+def motor_activo(motor=None):
+    """Motor pedido (o el de MOTOR_DATOS); ValueError si no existe o no está instalado"""
+    motor = motor or MOTOR
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor} (opciones: {', '.join(MOTORES)})")
+    if motor == "polars":
+        try:
+            import polars  # noqa: F401
+        except ImportError:
+            raise ValueError("El motor 'polars' necesita el paquete polars (pip install polars)")
+    return motor
+
+
+# ---------------------------
+# Suma compensada (la de groupby.sum/mean de pandas)
+# ---------------------------
+def _sumas_por_dia(tabla, columnas, clave='dia'):
+    """DataFrame de polars con clave, '<col>__suma' y '<col>__n' por día, ordenado por clave.
+
+    Una suma común de polars difiere de la de pandas en el último bit: la suma compensada se
+    hace con agregacion.suma_compensada_por_grupo sobre los grupos que arma polars.
+    """
+    import polars as pl
+
+    tabla = tabla.select(clave, *columnas).filter(pl.col(clave).is_not_null()).collect()
+    grupos = (tabla[clave].rank("dense") - 1).to_numpy().astype(np.int64)
+    n_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    valores = tabla.select(pl.col(columnas).cast(pl.Float64).fill_null(float("nan"))).to_numpy()
+    suma, cantidad = suma_compensada_por_grupo(grupos, n_grupos, valores)
+    return pl.DataFrame({
+        clave: tabla[clave].unique().sort(),
+        **{f"{c}__suma": suma[:, i] for i, c in enumerate(columnas)},
+        **{f"{c}__n": cantidad[:, i] for i, c in enumerate(columnas)},
+    })
+
+
+# ---------------------------
+# modelo.py: agregación diaria
+# ---------------------------
+def agregar_diario_polars(df, agg_dict):
+    """Misma salida que modelo.agregar_diario (columnas, orden, tipos y valores) calculada con polars"""
+    import polars as pl
+
+    columnas = list(agg_dict)
+    lf = pl.from_pandas(df[['dia', *columnas, 'conditions']]).lazy().filter(pl.col('dia').is_not_null())
+
+    # sum y mean salen de la suma compensada; max/min/any son exactos en cualquier orden
+    directas, sumadas, salida = [], [], []
+    for columna, funciones in agg_dict.items():
+        for funcion in [funciones] if isinstance(funciones, str) else funciones:
+            nombre = f"{columna}_{funcion}"
+            salida.append(nombre)
+            if funcion == 'sum':
+                sumadas.append(pl.col(f"{columna}__suma").alias(nombre))
+            elif funcion == 'mean':
+                sumadas.append((pl.col(f"{columna}__suma") / pl.col(f"{columna}__n")).alias(nombre))
+            else:
+                directas.append(getattr(pl.col(columna), funcion)().alias(nombre))
+    con_suma = [c for c, f in agg_dict.items() if {'sum', 'mean'} & set([f] if isinstance(f, str) else f)]
+
+    # resumir_target_v3: 'Rain' si alguna hora lo menciona; si no, la categoría de nubes más
+    # frecuente (a igualdad, la que aparece primero) y 'Clear' si no hay ninguna
+    condicion = pl.col('conditions').cast(pl.Utf8).str.strip_chars()
+    nubes = (
+        lf.with_row_index('fila')
+        .with_columns(condicion.alias('condicion'))
+        .filter(pl.col('condicion').is_in(OPCIONES_NUBES))
+        .group_by('dia', 'condicion')
+        .agg(pl.len().alias('n'), pl.col('fila').min().alias('primera'))
+        .sort(['dia', 'n', 'primera'], descending=[False, True, False])
+        .group_by('dia', maintain_order=True)
+        .first()
+    )
+    diario = (
+        lf.group_by('dia')
+        .agg(*directas, condicion.str.contains("Rain", literal=True).fill_null(False).any().alias('lluvia'))
+        .join(_sumas_por_dia(lf, con_suma).lazy().with_columns(sumadas), on='dia', how='left')
+        .join(nubes.select('dia', 'condicion'), on='dia', how='left')
+        .with_columns(
+            pl.when(pl.col('lluvia')).then(pl.lit('Rain'))
+            .otherwise(pl.col('condicion').fill_null('Clear'))
+            .alias('conditions_reduced')
+        )
+        .sort('dia')
+        .select(pl.col('dia').alias('date'), *salida, 'conditions_reduced')
+        .collect()
+    )
+
+    resultado = diario.to_pandas()
+    resultado['date'] = resultado['date'].astype(df['dia'].dtype)
+    resultado['conditions_reduced'] = resultado['conditions_reduced'].astype(object)
+    return resultado
+
+
+# ---------------------------
+# Pestaña de exploración: columnas por hora y tabla diaria
+# ---------------------------
+def obtener_estacion(fecha):
+    mes = fecha.month
+    if mes in [12, 1, 2]:
+        return 'Verano'
+    elif mes in [3, 4, 5]:
+        return 'Otoño'
+    elif mes in [6, 7, 8]:
+        return 'Invierno'
+    else:
+        return 'Primavera'
+
+
+def _exploracion_pandas(df):
+    # Crear columna de día (sin hora)
+    df['dia'] = df['datetime_completo'].dt.date
+    df['dia'] = pd.to_datetime(df['dia'])
+    df['mes'] = df['dia'].dt.month
+    df['mes_nombre'] = df['dia'].dt.strftime('%B')
+    df['estacion'] = df['dia'].apply(obtener_estacion)
+    df['año'] = df['dia'].dt.year
+
+    # Detectar lluvia por hora
+    df['lluvia_hora'] = df['conditions'].str.contains('|'.join(LLUVIA_KEYWORDS), case=False, na=False)
+
+    # Agregación diaria para temperaturas
+    df_dias = (
+        df.groupby(['dia', 'estacion', 'mes', 'mes_nombre'], as_index=False)
+        .agg({
+            'temp': ['max', 'min', 'mean'],
+            'feelslike': 'mean',
+            'humidity': 'mean',
+        })
+    )
+
+    # Aplanar nombres de columnas
+    df_dias.columns = ['dia', 'estacion', 'mes', 'mes_nombre', 'temp_max_dia', 'temp_min_dia',
+                       'temp_avg_dia', 'feelslike_avg', 'humidity_avg']
+
+    # Día con lluvia si alguna hora lo fue (vectorizado sobre códigos de día, sin el 'any' del groupby)
+    df_dias['lluvia_dia'] = df_dias['dia'].map(lluvia_diaria(df['dia'], df['lluvia_hora'])).astype(bool)
+
+    # Condición más frecuente del día (moda vectorizada sobre códigos categóricos)
+    df_dias['conditions'] = df_dias['dia'].map(moda_diaria(df['dia'], df['conditions']))
+    return df, df_dias
+
+
+def _exploracion_polars(df):
+    import polars as pl
+
+    meses = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+             'September', 'October', 'November', 'December']
+    mes = pl.col('dia').dt.month()
+    estacion = (
+        pl.when(mes.is_in([12, 1, 2])).then(pl.lit('Verano'))
+        .when(mes.is_in([3, 4, 5])).then(pl.lit('Otoño'))
+        .when(mes.is_in([6, 7, 8])).then(pl.lit('Invierno'))
+        .otherwise(pl.lit('Primavera'))
+    )
+    patron = "(?i)" + "|".join(LLUVIA_KEYWORDS)
+    horario = (
+        pl.from_pandas(df).lazy()
+        .with_columns(pl.col('datetime_completo').dt.truncate('1d').alias('dia'))
+        .with_columns(
+            mes.cast(pl.Int32).alias('mes'),
+            mes.replace_strict(list(range(1, 13)), meses, return_dtype=pl.Utf8).alias('mes_nombre'),
+            estacion.alias('estacion'),
+            pl.col('dia').dt.year().cast(pl.Int32).alias('año'),
+            pl.col('conditions').str.contains(patron).fill_null(False).alias('lluvia_hora'),
+        )
+        .collect()
+    )
+    validos = horario.lazy().filter(pl.col('dia').is_not_null())
+    # Moda con el mismo desempate que moda_diaria (a igualdad, el menor valor)
+    moda = (
+        validos.filter(pl.col('conditions').is_not_null())
+        .group_by('dia', 'conditions').len()
+        .sort(['dia', 'len', 'conditions'], descending=[False, True, False])
+        .group_by('dia', maintain_order=True).first()
+        .select('dia', 'conditions')
+    )
+    dias = (
+        validos.group_by('dia', 'estacion', 'mes', 'mes_nombre')
+        .agg(
+            pl.col('temp').max().alias('temp_max_dia'),
+            pl.col('temp').min().alias('temp_min_dia'),
+            pl.col('lluvia_hora').any().alias('lluvia_dia'),
+        )
+        .join(_sumas_por_dia(validos, ['temp', 'feelslike', 'humidity']).lazy(), on='dia', how='left')
+        .join(moda, on='dia', how='left')
+        .sort('dia')
+        .select(
+            'dia', 'estacion', 'mes', 'mes_nombre', 'temp_max_dia', 'temp_min_dia',
+            (pl.col('temp__suma') / pl.col('temp__n')).alias('temp_avg_dia'),
+            (pl.col('feelslike__suma') / pl.col('feelslike__n')).alias('feelslike_avg'),
+            (pl.col('humidity__suma') / pl.col('humidity__n')).alias('humidity_avg'),
+            'lluvia_dia', 'conditions',
+        )
+        .collect()
+    )
+
+    df = horario.to_pandas()
+    df_dias = dias.to_pandas()
+    for tabla in (df, df_dias):
+        tabla['dia'] = tabla['dia'].astype('datetime64[ns]')
+        for columna in ('estacion', 'mes_nombre', 'conditions'):
+            tabla[columna] = tabla[columna].astype(object).where(tabla[columna].notna(), np.nan)
+    return df, df_dias
+
+
+def preparar_exploracion(df, motor=None):
+    """(df horario con dia/mes/estación/lluvia, tabla diaria, orden de estaciones) para la pestaña de exploración"""
+    if 'datetime_completo' in df.columns:
+        df['datetime_completo'] = pd.to_datetime(df['datetime_completo'])
+    if motor_activo(motor) == "polars":
+        df, df_dias = _exploracion_polars(df)
+    else:
+        df, df_dias = _exploracion_pandas(df)
+
+    # Agregar columna de año DESPUÉS del aplanamiento
+    df_dias['año'] = df_dias['dia'].dt.year
+
+    # Crear condición_dia categórica
+    df_dias['condicion_dia'] = df_dias['lluvia_dia'].map({False: 'Seco', True: 'Lluvioso'})
+
+    # Orden de estaciones
+    df_dias['estacion'] = pd.Categorical(df_dias['estacion'], categories=ORDEN_ESTACIONES, ordered=True)
+    return df, df_dias, ORDEN_ESTACIONES
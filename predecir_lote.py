@@ -0,0 +1,157 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import clima_api
+import prediccion
+import almacen_features
+import ventana_features
+from almacen_clima import RUTA_DATASET
+
+DIRECTORIO_RESPUESTAS = os.path.join("cache", "respuestas")
+LOCATION = "Mendoza,Argentina"
+
+# Por debajo de este tamaño no conviene pagar el arranque de procesos
+FILAS_POR_PROCESO = 50_000
+DIAS_POR_CONSULTA = 30
+
+
+# ---------------------------
+# Fuentes de datos diarios
+# ---------------------------
+def diario_local(ruta=RUTA_DATASET):
+    """Registro diario a partir del dataset horario local (solo Mendoza)"""
+    columnas = ['dia', 'temp', 'feelslike', 'humidity', 'dew', 'pressure', 'windspeed', 'windgust',
+                'winddir', 'visibility', 'solarradiation', 'uvindex', 'cloudcover', 'precip', 'snow']
+    return prediccion.diario_desde_horario(pd.read_csv(ruta, usecols=columnas))
+
+
+def diario_api(location, desde, hasta, directorio=DIRECTORIO_RESPUESTAS):
+    """Registro diario desde la API (include=days), reutilizando las respuestas ya guardadas"""
+    carpeta = os.path.join(directorio, _slug(location))
+    os.makedirs(carpeta, exist_ok=True)
+    dias = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=DIAS_POR_CONSULTA - 1), hasta)
+        ruta = os.path.join(carpeta, f"{inicio:%Y-%m-%d}_{fin:%Y-%m-%d}.json")
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                tramo = json.load(f)
+        else:
+            tramo, _, _ = clima_api.obtener_datos_clima(location, f"{inicio:%Y-%m-%d}", f"{fin:%Y-%m-%d}")
+            # Solo se guardan tramos cerrados; el día actual todavía cambia
+            if fin < datetime.today().date():
+                with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(tramo, f)
+                os.replace(f"{ruta}.tmp", ruta)
+        dias.extend(tramo)
+        inicio = fin + timedelta(days=1)
+    return prediccion.diario_desde_api(dias)
+
+
+def _slug(location):
+    return "".join(c if c.isalnum() else "-" for c in location).strip("-").lower()
+
+
+# ---------------------------
+# Scoring
+# ---------------------------
+_modelo_proceso = None
+
+
+def _iniciar_proceso(ruta_modelo):
+    # Cada proceso carga el pipeline una sola vez
+    global _modelo_proceso
+    _modelo_proceso = prediccion.cargar_modelo(ruta_modelo)
+
+
+def _puntuar_bloque(X):
+    return _modelo_proceso.predict_proba(X)
+
+
+def puntuar(X, ruta_modelo=prediccion.RUTA_MODELO, procesos=None, filas_por_proceso=FILAS_POR_PROCESO):
+    """Devuelve (probabilidades, clases); reparte en procesos solo si el lote es grande"""
+    model = prediccion.cargar_modelo(ruta_modelo)
+    X = X[list(getattr(model, "feature_names_in_", X.columns))]
+    procesos = procesos or os.cpu_count() or 1
+    if len(X) <= filas_por_proceso or procesos == 1:
+        return model.predict_proba(X), model.classes_
+
+    bloques = [X.iloc[i:i + filas_por_proceso] for i in range(0, len(X), filas_por_proceso)]
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(ruta_modelo,)) as pool:
+        probs = list(pool.map(_puntuar_bloque, bloques))
+    return np.vstack(probs), model.classes_
+
+
+def predecir_rango(desde, hasta, locations, fuente="local", ruta_modelo=prediccion.RUTA_MODELO, procesos=None):
+    """Predice todas las fechas de [desde, hasta] para cada ubicación en un único lote"""
+    fechas = pd.date_range(desde, hasta, freq="D")
+    # Los modelos con features de ventana (modelo.py --ventanas) necesitan 8 días antes de cada
+    # fecha; el almacén de features guarda solo las de siempre
+    ventanas = bool(ventana_features.requeridas(prediccion.cargar_modelo(ruta_modelo)))
+    dias_antes = ventana_features.DIAS if ventanas else 2
+    almacen = almacen_features.abrir() if fuente == "local" and not ventanas else None
+    matrices = []
+    for location in locations:
+        if almacen is not None and almacen.location == location and almacen.cubre(desde, hasta):
+            # Vista sobre la matriz mapeada que dejó el entrenamiento; no hay que reagregar el CSV
+            X = almacen.dataframe(desde, hasta)
+        else:
+            if fuente == "local":
+                diario = diario_local()
+            else:
+                diario = diario_api(location, desde - timedelta(days=dias_antes), hasta)
+            X = prediccion.construir_features_lote(diario, fechas, ventanas=ventanas)
+        matrices.append((location, X))
+
+    # Con una sola ubicación no se concatena, así la vista del almacén llega intacta al modelo
+    X = matrices[0][1] if len(matrices) == 1 else pd.concat([m for _, m in matrices])
+    if len(X) == 0:
+        return pd.DataFrame(columns=["location", "fecha", "clase"])
+    probs, clases = puntuar(X, ruta_modelo, procesos)
+
+    salida = pd.DataFrame({
+        "location": np.repeat([l for l, _ in matrices], [len(m) for _, m in matrices]),
+        "fecha": X.index.strftime("%Y-%m-%d"),
+        "clase": clases[np.argmax(probs, axis=1)],
+    })
+    for i, clase in enumerate(clases):
+        salida[f"prob_{clase}"] = probs[:, i].round(4)
+    return salida
+
+
+def guardar(df, ruta):
+    if ruta.endswith(".parquet"):
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predicción por lotes sin interfaz (CSV/Parquet)")
+    parser.add_argument("desde", help="Primera fecha a predecir (YYYY-MM-DD)")
+    parser.add_argument("hasta", help="Última fecha a predecir (YYYY-MM-DD)")
+    parser.add_argument("--location", action="append", help="Se puede repetir; por defecto Mendoza")
+    parser.add_argument("--fuente", choices=["local", "api"], default="local",
+                        help="'local' usa joined_weather_data.csv; 'api' usa respuestas guardadas o la API")
+    parser.add_argument("--modelo", default=prediccion.RUTA_MODELO)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--salida", default="predicciones.csv", help="Extensión .csv o .parquet")
+    args = parser.parse_args()
+
+    locations = args.location or [LOCATION]
+    if args.fuente == "local" and locations != [LOCATION]:
+        parser.error("El dataset local solo tiene datos de Mendoza; usar --fuente api para otras ubicaciones")
+
+    resultado = predecir_rango(
+        datetime.strptime(args.desde, "%Y-%m-%d").date(),
+        datetime.strptime(args.hasta, "%Y-%m-%d").date(),
+        locations, args.fuente, args.modelo, args.procesos,
+    )
+    guardar(resultado, args.salida)
+    print(f"✅ {len(resultado)} predicciones guardadas en {args.salida}")
@@ -0,0 +1,224 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+import ventana_features
+
+RUTA_MODELO = "model_output/gradient_boosting_weather_model.pkl"
+
+# Orden de columnas con el que se entrenó el pipeline (ver modelo.py)
+FEATURES = [
+    'temp_mean', 'feelslike_mean', 'humidity_mean', 'dew_mean', 'pressure_mean',
+    'windspeed_mean', 'windgust_mean', 'winddir_mean', 'visibility_mean',
+    'solarradiation_mean', 'uvindex_mean', 'cloudcover_mean', 'precip_sum', 'snow_sum',
+    'temp_range', 'dew_point_diff', 'month_sin', 'month_cos', 'dayofyear_sin', 'dayofyear_cos',
+    'rain_yesterday'
+]
+
+
+# Función para construir las features del modelo a partir de dos días de la API
+def fecha_features(ayer, fecha_objetivo):
+    """Fecha de las features cíclicas: la del registro 'ayer' que se pasa, como al entrenar (en
+    modelo.construir_features cada fila lleva el mes/día del año de su propia fecha y solo el
+    target se corre). Sin 'datetime' en el registro se toma el día anterior a fecha_objetivo."""
+    if "datetime" in ayer:
+        return pd.Timestamp(ayer["datetime"]).date()
+    return fecha_objetivo - timedelta(days=1)
+
+
+def construir_features(ayer, anteayer, fecha_objetivo):
+    """Arma el vector de features para predecir fecha_objetivo con los datos diarios de ayer y anteayer"""
+    fecha = fecha_features(ayer, fecha_objetivo)
+    return {
+        "temp_mean": ayer["temp"],
+        "feelslike_mean": ayer["feelslike"],
+        "humidity_mean": ayer["humidity"],
+        "dew_mean": ayer["dew"],
+        "pressure_mean": ayer["pressure"],
+        "windspeed_mean": ayer["windspeed"],
+        "windgust_mean": ayer["windgust"],
+        "winddir_mean": ayer["winddir"],
+        "visibility_mean": ayer["visibility"],
+        "solarradiation_mean": ayer["solarradiation"],
+        "uvindex_mean": ayer["uvindex"],
+        "cloudcover_mean": ayer["cloudcover"],
+        "precip_sum": ayer["precip"],
+        "snow_sum": ayer["snow"],
+        "temp_range": ayer["tempmax"] - ayer["tempmin"],
+        "dew_point_diff": ayer["temp"] - ayer["dew"],
+
+        # Features cíclicas (usando la fecha de 'ayer', ver fecha_features)
+        "month_sin": np.sin(2 * np.pi * fecha.month / 12),
+        "month_cos": np.cos(2 * np.pi * fecha.month / 12),
+        "dayofyear_sin": np.sin(2 * np.pi * fecha.timetuple().tm_yday / 365),
+        "dayofyear_cos": np.cos(2 * np.pi * fecha.timetuple().tm_yday / 365),
+
+        # Lluvia ayer (usando día-2)
+        "rain_yesterday": 1 if anteayer["precip"] > 0 else 0,
+    }
+
+
+def hash_features(features):
+    """Hash estable del vector de features (independiente del orden de las claves)"""
+    normalizado = {k: (None if v is None else round(float(v), 6)) for k, v in sorted(features.items())}
+    return hashlib.sha1(json.dumps(normalizado).encode("utf-8")).hexdigest()[:16]
+
+
+_versiones = {}
+
+
+def version_modelo(ruta=RUTA_MODELO):
+    """Hash corto del contenido del artefacto; se recalcula solo si cambia mtime/tamaño"""
+    estado = os.stat(ruta)
+    clave = (ruta, estado.st_mtime_ns, estado.st_size)
+    if clave not in _versiones:
+        with open(ruta, "rb") as f:
+            _versiones[clave] = hashlib.sha1(f.read()).hexdigest()[:12]
+    return _versiones[clave]
+
+
+def cargar_modelo(ruta=RUTA_MODELO):
+    # Artefacto compacto (.arr): arrays mapeados en memoria, sin pickle ni scikit-learn
+    if ruta.endswith(".arr"):
+        import artefacto_compacto
+        return artefacto_compacto.cargar(ruta)
+    # joblib (y scikit-learn al deserializar) solo se importan cuando hace falta el modelo
+    import joblib
+    return joblib.load(ruta)
+
+
+def predecir(model, X):
+    """Devuelve (clase predicha, probabilidades, clases) para la primera fila de X"""
+    # Columnas en el orden con que se entrenó (los modelos con ventana las tienen en otro orden)
+    probs = model.predict_proba(X[list(getattr(model, "feature_names_in_", X.columns))])[0]
+    clases = model.classes_
+    return clases[int(np.argmax(probs))], probs, clases
+
+
+def features_a_dataframe(features):
+    """Una fila con FEATURES y, si vienen en el dict, las features de ventana"""
+    columnas = FEATURES + [c for c in ventana_features.FEATURES_VENTANA if c in features]
+    return pd.DataFrame([features])[columnas]
+
+
+# ---------------------------
+# Varios horizontes (semana)
+# ---------------------------
+def features_horizontes(ayer, anteayer, fecha_manana, horizontes, ventana=None):
+    """Una fila por horizonte, la misma para todos: la del modelo de mañana (construir_features).
+
+    El horizonte h predice fecha_manana + (h - 1) días; al entrenar solo el target se corre h
+    días, así que ni los datos de ayer/anteayer ni las features cíclicas cambian con h.
+    'ventana' son las features de ventana de ayer (iguales para todos los horizontes).
+    """
+    fila = {**construir_features(ayer, anteayer, fecha_manana), **(ventana or {})}
+    return pd.DataFrame([fila] * len(horizontes), index=list(horizontes))[FEATURES + list(ventana or {})]
+
+
+def predecir_horizontes(modelos, ayer, anteayer, fecha_manana, ventana=None):
+    """Puntúa {horizonte: pipeline} con una sola matriz de features.
+
+    Devuelve [{horizonte, fecha, clase, probabilidades, clases}] ordenado por horizonte.
+    """
+    horizontes = sorted(modelos)
+    X = features_horizontes(ayer, anteayer, fecha_manana, horizontes, ventana)
+    resultado = []
+    for h in horizontes:
+        # Cada modelo recibe las columnas con que se entrenó (con o sin ventana)
+        columnas = list(getattr(modelos[h], "feature_names_in_", FEATURES))
+        probs = modelos[h].predict_proba(X.loc[[h], columnas])[0]
+        clases = modelos[h].classes_
+        resultado.append({
+            "horizonte": h,
+            "fecha": fecha_manana + timedelta(days=h - 1),
+            "clase": clases[int(np.argmax(probs))],
+            "probabilidades": probs,
+            "clases": clases,
+        })
+    return resultado
+
+
+# ---------------------------
+# Versión vectorizada (lotes de fechas)
+# ---------------------------
+def diario_desde_horario(df):
+    """Agrega el CSV horario a un registro diario con los nombres de la API (include=days)"""
+    dia = pd.to_datetime(df['dia'])
+    diario = df.groupby(dia).agg(
+        temp=('temp', 'mean'),
+        tempmax=('temp', 'max'),
+        tempmin=('temp', 'min'),
+        feelslike=('feelslike', 'mean'),
+        humidity=('humidity', 'mean'),
+        dew=('dew', 'mean'),
+        pressure=('pressure', 'mean'),
+        windspeed=('windspeed', 'mean'),
+        windgust=('windgust', 'mean'),
+        winddir=('winddir', 'mean'),
+        visibility=('visibility', 'mean'),
+        solarradiation=('solarradiation', 'mean'),
+        uvindex=('uvindex', 'mean'),
+        cloudcover=('cloudcover', 'mean'),
+        precip=('precip', 'sum'),
+        snow=('snow', 'sum'),
+    )
+    diario.index.name = 'fecha'
+    return diario
+
+
+def diario_desde_api(dias):
+    """Convierte la lista days[] de la API en un DataFrame diario indexado por fecha"""
+    diario = pd.DataFrame(dias)
+    diario.index = pd.to_datetime(diario['datetime'])
+    diario.index.name = 'fecha'
+    return diario
+
+
+def construir_features_lote(diario, fechas, ventanas=False):
+    """Equivalente vectorizado de construir_features para muchas fechas objetivo a la vez.
+
+    Devuelve la matriz de features (columnas FEATURES, más las de ventana si ventanas=True)
+    solo para las fechas que tienen día-1 y día-2 en 'diario'.
+    """
+    fechas = pd.DatetimeIndex(fechas)
+    ayer = diario.reindex(fechas - pd.Timedelta(days=1))
+    anteayer = diario.reindex(fechas - pd.Timedelta(days=2))
+    ayer.index = anteayer.index = fechas
+
+    # Features cíclicas con la fecha de día-1, como construir_features
+    dia1 = fechas - pd.Timedelta(days=1)
+    X = pd.DataFrame({
+        "temp_mean": ayer["temp"],
+        "feelslike_mean": ayer["feelslike"],
+        "humidity_mean": ayer["humidity"],
+        "dew_mean": ayer["dew"],
+        "pressure_mean": ayer["pressure"],
+        "windspeed_mean": ayer["windspeed"],
+        "windgust_mean": ayer["windgust"],
+        "winddir_mean": ayer["winddir"],
+        "visibility_mean": ayer["visibility"],
+        "solarradiation_mean": ayer["solarradiation"],
+        "uvindex_mean": ayer["uvindex"],
+        "cloudcover_mean": ayer["cloudcover"],
+        "precip_sum": ayer["precip"],
+        "snow_sum": ayer["snow"],
+        "temp_range": ayer["tempmax"] - ayer["tempmin"],
+        "dew_point_diff": ayer["temp"] - ayer["dew"],
+        "month_sin": np.sin(2 * np.pi * dia1.month / 12),
+        "month_cos": np.cos(2 * np.pi * dia1.month / 12),
+        "dayofyear_sin": np.sin(2 * np.pi * dia1.dayofyear / 365),
+        "dayofyear_cos": np.cos(2 * np.pi * dia1.dayofyear / 365),
+        "rain_yesterday": (anteayer["precip"] > 0).astype(int),
+    }, index=fechas)
+
+    columnas = FEATURES
+    if ventanas:
+        ventana = ventana_features.calcular(diario).reindex(fechas - pd.Timedelta(days=1))
+        X[ventana_features.FEATURES_VENTANA] = ventana.to_numpy()
+        columnas = FEATURES + ventana_features.FEATURES_VENTANA
+
+    completos = ayer["temp"].notna() & anteayer["precip"].notna()
+    return X[completos.values][columnas]
@@ -0,0 +1,135 @@
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from clima_api import obtener_datos_clima
+from prediccion import construir_features, features_a_dataframe, predecir, predecir_horizontes
+from registro_modelos import obtener_registro
+import ventana_features
+
+# Mendoza no tiene horario de verano: UTC-3 todo el año
+ZONA_MENDOZA = timezone(timedelta(hours=-3))
+
+# Si un refresco falla se reintenta antes de la próxima medianoche
+REINTENTO_SEGUNDOS = 10 * 60
+
+
+def calcular_manana(location, hoy, registro=None):
+    """Pide anteayer..hoy y predice mañana; misma lógica que la sección 'Predicción para mañana'.
+
+    Si el modelo usa features de ventana, ayer se suma al estado guardado del sitio
+    (ventana_features.py); la consulta se alarga solo si al estado le faltan días.
+    """
+    registro = registro or obtener_registro()
+    model = registro.obtener(location)
+    fecha_anteayer = hoy - timedelta(days=2)
+    fecha_manana = hoy + timedelta(days=1)
+
+    estado = None
+    fecha_desde = fecha_anteayer
+    if ventana_features.requeridas(model):
+        estado = ventana_features.cargar(location)
+        fecha_desde = min([fecha_anteayer, *estado.faltantes(hoy - timedelta(days=1))])
+
+    data, _, numero_key = obtener_datos_clima(
+        location,
+        fecha_desde.strftime("%Y-%m-%d"),      # día-2 (o el primer día que le falta a la ventana)
+        hoy.strftime("%Y-%m-%d"),              # día actual
+    )
+    i = (fecha_anteayer - fecha_desde).days
+    if len(data) < i + 2:
+        raise ValueError("No se obtuvieron datos suficientes para predecir mañana.")
+
+    # data[i] = anteayer (para rain_yesterday), data[i + 1] = ayer (para features del modelo)
+    anteayer, ayer = data[i], data[i + 1]
+    features = construir_features(ayer, anteayer, fecha_manana)
+    ventana = None
+    if estado is not None:
+        # Hoy todavía no terminó: entran solo los días completos
+        estado.actualizar(data[:i + 2])
+        ventana_features.guardar(estado)
+        ventana = estado.features(hoy - timedelta(days=1))
+        features.update(ventana)
+    X = features_a_dataframe(features)
+    clase, probs, clases = predecir(model, X)
+
+    # Semana: mismos datos de entrada, un modelo por horizonte (si el sitio tiene más de uno)
+    semana = None
+    horizontes = registro.horizontes(location)
+    if len(horizontes) > 1:
+        modelos = {h: registro.obtener(location, h) for h in horizontes}
+        semana = predecir_horizontes(modelos, ayer, anteayer, fecha_manana, ventana)
+    return {
+        "fecha_manana": fecha_manana,
+        "clase": clase,
+        "probabilidades": probs,
+        "clases": clases,
+        "X": X,
+        "semana": semana,
+        "numero_key": numero_key,
+    }
+
+
+def segundos_hasta_medianoche(ahora):
+    siguiente = (ahora + timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0)
+    return (siguiente - ahora).total_seconds()
+
+
+class PrefetchDiario:
+    """Hilo de fondo que recalcula la predicción de mañana al iniciar y en cada medianoche de Mendoza"""
+
+    def __init__(self, location="Mendoza,Argentina"):
+        self.location = location
+        self.resultado = None
+        self.actualizado = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def refrescar(self):
+        """Recalcula ya mismo; deja el último resultado bueno si falla"""
+        ahora = datetime.now(ZONA_MENDOZA)
+        try:
+            resultado = calcular_manana(self.location, ahora.date())
+            with self._lock:
+                self.resultado = resultado
+                self.actualizado = ahora
+                self.error = None
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self.error = f"{ahora:%Y-%m-%d %H:%M}: {e}"
+        finally:
+            self._listo.set()
+        return self.error is None
+
+    def estado(self, esperar=0):
+        """Devuelve (resultado, actualizado, error); espera el primer refresco hasta 'esperar' segundos"""
+        if esperar:
+            self._listo.wait(esperar)
+        with self._lock:
+            resultado = self.resultado
+            # Un resultado de un día anterior ya no es "mañana"
+            if resultado is not None and resultado["fecha_manana"] <= datetime.now(ZONA_MENDOZA).date():
+                resultado = None
+            return resultado, self.actualizado, self.error
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            ok = self.refrescar()
+            espera = segundos_hasta_medianoche(datetime.now(ZONA_MENDOZA))
+            if not ok:
+                espera = min(espera, REINTENTO_SEGUNDOS)
+            self._detener.wait(espera)
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="prefetch-diario", daemon=True)
+                self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
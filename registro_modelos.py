@@ -0,0 +1,352 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+import prediccion
+
+# Un directorio por sitio: <DIRECTORIO>/<sitio>/h<N>.pkl (un pipeline por horizonte) + sitio.json;
+# si también está h<N>.arr (artefacto_compacto.py) se usa ese
+DIRECTORIO = os.path.join("model_output", "registro")
+SITIO = "sitio.json"
+USO = "uso.json"
+LOCATION = "Mendoza,Argentina"
+
+# Memoria máxima para pipelines cargados; al pasarla se descargan los usados hace más tiempo
+PRESUPUESTO_MB = int(os.environ.get("REGISTRO_MODELOS_MB", "512"))
+
+# Sitios más consultados (según uso.json) que se cargan en segundo plano al iniciar
+PRECARGAR = int(os.environ.get("REGISTRO_PRECARGAR", "2"))
+
+# Cada cuántas consultas se suman los contadores de uso al archivo compartido
+GUARDAR_USO_CADA = 50
+
+
+def slug(location):
+    return re.sub(r"[^a-z0-9]+", "-", location.lower()).strip("-")
+
+
+def _escribir_json(datos, ruta):
+    temporal = f"{ruta}.tmp-{os.getpid()}"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+# ---------------------------
+# Publicación (la usa modelo.py)
+# ---------------------------
+def publicar(pipelines, location, directorio=DIRECTORIO, compacto=False, datos_hasta=None):
+    """Guarda {horizonte: pipeline} del sitio; reemplaza los horizontes que ya no se entrenan.
+
+    Con compacto=True exporta además cada pipeline como paquete de arrays (.arr). 'datos_hasta'
+    es el último día ('YYYY-MM-DD') de los datos de entrenamiento, si se conoce.
+    """
+    import joblib
+    import artefacto_compacto
+    carpeta = os.path.join(directorio, slug(location))
+    os.makedirs(carpeta, exist_ok=True)
+    for h, pipeline in pipelines.items():
+        ruta = os.path.join(carpeta, f"h{h}.pkl")
+        temporal = f"{ruta}.tmp-{os.getpid()}"
+        joblib.dump(pipeline, temporal)
+        os.replace(temporal, ruta)
+        ruta_compacta = os.path.join(carpeta, f"h{h}{artefacto_compacto.EXTENSION}")
+        if compacto:
+            artefacto_compacto.exportar(pipeline, ruta_compacta)
+        elif os.path.exists(ruta_compacta):
+            os.remove(ruta_compacta)
+    for archivo in os.listdir(carpeta):
+        encontrado = re.fullmatch(r"h(\d+)\.(pkl|arr)", archivo)
+        if encontrado and int(encontrado.group(1)) not in pipelines:
+            os.remove(os.path.join(carpeta, archivo))
+    features = [str(c) for c in getattr(pipelines[min(pipelines)], "feature_names_in_", prediccion.FEATURES)]
+    _escribir_json({"location": location, "horizontes": sorted(pipelines), "features": features,
+                    "datos_hasta": datos_hasta}, os.path.join(carpeta, SITIO))
+    return carpeta
+
+
+# ---------------------------
+# Tamaño en memoria
+# ---------------------------
+def tamano_bytes(objeto, vistos=None):
+    """Bytes aproximados de un pipeline: recorre sus atributos sumando arrays y árboles.
+
+    Los árboles de scikit-learn guardan nodos y valores en arrays de numpy (expuestos por
+    __getstate__), que es lo que domina el tamaño de un Gradient Boosting.
+    """
+    # Se guardan los objetos (no solo el id): __getstate__ arma arrays temporales y, si se
+    # liberaran, otro objeto podría reusar su id y quedar sin contar
+    vistos = {} if vistos is None else vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos[id(objeto)] = objeto
+
+    # Un memmap vive en la caché de páginas del sistema, compartida entre procesos
+    if isinstance(objeto, np.memmap):
+        return 0
+    if isinstance(objeto, np.ndarray):
+        if objeto.dtype == object:
+            return objeto.nbytes + sum(tamano_bytes(o, vistos) for o in objeto.ravel())
+        return objeto.nbytes
+    if isinstance(objeto, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(tamano_bytes(v, vistos) for v in objeto.values())
+    if isinstance(objeto, (list, tuple, set)):
+        return sys.getsizeof(objeto) + sum(tamano_bytes(v, vistos) for v in objeto)
+    try:
+        estado = objeto.__getstate__()
+    except Exception:
+        estado = getattr(objeto, "__dict__", None)
+    if isinstance(estado, dict):
+        return sys.getsizeof(objeto) + sum(tamano_bytes(v, vistos) for v in estado.values())
+    return sys.getsizeof(objeto)
+
+
+# ---------------------------
+# Registro
+# ---------------------------
+class RegistroModelos:
+    """Pipelines por (location, horizonte, versión), cargados al primer uso y desalojados por LRU.
+
+    La versión es el hash del archivo (prediccion.version_modelo): si modelo.py publica un
+    artefacto nuevo, la próxima consulta lo carga y descarta la versión anterior. Un solo hilo
+    carga cada modelo aunque lo pidan varias sesiones a la vez.
+    """
+
+    def __init__(self, directorio=DIRECTORIO, presupuesto_mb=PRESUPUESTO_MB):
+        self.directorio = directorio
+        self.presupuesto = presupuesto_mb * 1024 * 1024
+        self._cargados = OrderedDict()  # clave -> (pipeline, bytes), del menos al más reciente
+        self._metricas = {}
+        self._cargando = {}
+        self._uso_pendiente = Counter()
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # Catálogo
+    # ---------------------------
+    def sitios(self):
+        """[{location, horizontes, features}] publicados; si no hay ninguno, el modelo de siempre"""
+        sitios = []
+        if os.path.isdir(self.directorio):
+            for carpeta in sorted(os.listdir(self.directorio)):
+                ruta = os.path.join(self.directorio, carpeta, SITIO)
+                if os.path.exists(ruta):
+                    with open(ruta, encoding="utf-8") as f:
+                        sitios.append(json.load(f))
+        if not any(s["location"] == LOCATION for s in sitios) and os.path.exists(prediccion.RUTA_MODELO):
+            sitios.insert(0, {"location": LOCATION, "horizontes": [1], "features": prediccion.FEATURES})
+        return sitios
+
+    def horizontes(self, location):
+        for sitio in self.sitios():
+            if sitio["location"] == location:
+                return sitio["horizontes"]
+        return []
+
+    def ruta(self, location, horizonte=1):
+        for extension in (".arr", ".pkl"):
+            ruta = os.path.join(self.directorio, slug(location), f"h{horizonte}{extension}")
+            if os.path.exists(ruta):
+                return ruta
+        # Artefacto de antes del registro (modelo.py --salida): Mendoza, mañana
+        if location == LOCATION and horizonte == 1:
+            for ruta in (os.path.splitext(prediccion.RUTA_MODELO)[0] + ".arr", prediccion.RUTA_MODELO):
+                if os.path.exists(ruta):
+                    return ruta
+        raise FileNotFoundError(f"No hay modelo para {location} (horizonte {horizonte})")
+
+    def version(self, location, horizonte=1):
+        return prediccion.version_modelo(self.ruta(location, horizonte))
+
+    # ---------------------------
+    # Carga y desalojo
+    # ---------------------------
+    def obtener(self, location, horizonte=1):
+        """Pipeline listo para predecir; lo carga si no está en memoria"""
+        return self._obtener(location, horizonte, contar=True)
+
+    def _obtener(self, location, horizonte, contar):
+        ruta = self.ruta(location, horizonte)
+        clave = (location, horizonte, prediccion.version_modelo(ruta))
+        with self._lock:
+            if contar:
+                self._uso_pendiente[f"{location}|{horizonte}"] += 1
+                volcar = sum(self._uso_pendiente.values()) >= GUARDAR_USO_CADA
+            metrica = self._metrica(clave)
+            if clave in self._cargados:
+                self._cargados.move_to_end(clave)
+                if contar:
+                    metrica["hits"] += 1
+                pipeline = self._cargados[clave][0]
+            else:
+                if contar:
+                    metrica["misses"] += 1
+                pipeline = None
+                lock_carga = self._cargando.setdefault(clave, threading.Lock())
+
+        if pipeline is None:
+            with lock_carga:
+                pipeline = self._cargar(clave, ruta)
+        if contar and volcar:
+            self.guardar_uso()
+        return pipeline
+
+    def _metrica(self, clave):
+        if clave not in self._metricas:
+            self._metricas[clave] = {"cargas": 0, "hits": 0, "misses": 0, "desalojos": 0,
+                                     "segundos_carga": None, "bytes": None}
+        return self._metricas[clave]
+
+    def _cargar(self, clave, ruta):
+        with self._lock:
+            # Otro hilo pudo terminar de cargarlo mientras se esperaba el lock de carga
+            if clave in self._cargados:
+                return self._cargados[clave][0]
+
+        inicio = time.perf_counter()
+        pipeline = prediccion.cargar_modelo(ruta)
+        segundos = time.perf_counter() - inicio
+        n_bytes = tamano_bytes(pipeline)
+
+        with self._lock:
+            # Versiones anteriores del mismo (location, horizonte) ya no se van a pedir
+            for vieja in [c for c in self._cargados if c[:2] == clave[:2]]:
+                del self._cargados[vieja]
+            self._cargados[clave] = (pipeline, n_bytes)
+            metrica = self._metrica(clave)
+            metrica["cargas"] += 1
+            metrica["segundos_carga"] = segundos
+            metrica["bytes"] = n_bytes
+            self._desalojar()
+            self._cargando.pop(clave, None)
+        return pipeline
+
+    def _desalojar(self):
+        # Nunca se descarta el último cargado, aunque solo él ya pase el presupuesto
+        total = sum(b for _, b in self._cargados.values())
+        while total > self.presupuesto and len(self._cargados) > 1:
+            clave, (_, n_bytes) = self._cargados.popitem(last=False)
+            self._metricas[clave]["desalojos"] += 1
+            total -= n_bytes
+
+    def bytes_cargados(self):
+        with self._lock:
+            return sum(b for _, b in self._cargados.values())
+
+    # ---------------------------
+    # Uso y precarga
+    # ---------------------------
+    def uso(self):
+        """Consultas acumuladas por 'location|horizonte' (todos los procesos)"""
+        ruta = os.path.join(self.directorio, USO)
+        if not os.path.exists(ruta):
+            return Counter()
+        with open(ruta, encoding="utf-8") as f:
+            return Counter(json.load(f))
+
+    def guardar_uso(self):
+        """Suma los contadores pendientes al archivo compartido.
+
+        Dos procesos que vuelcan a la vez pueden pisarse y perder algunas consultas; para
+        ordenar la precarga alcanza con una aproximación.
+        """
+        with self._lock:
+            pendiente, self._uso_pendiente = self._uso_pendiente, Counter()
+        if not pendiente:
+            return
+        uso = self.uso()
+        uso.update(pendiente)
+        os.makedirs(self.directorio, exist_ok=True)
+        _escribir_json(dict(uso), os.path.join(self.directorio, USO))
+
+    def mas_usados(self, cantidad=PRECARGAR):
+        por_sitio = Counter()
+        for clave, n in self.uso().items():
+            por_sitio[clave.rsplit("|", 1)[0]] += n
+        sitios = [s["location"] for s in self.sitios()]
+        return sorted(sitios, key=lambda location: -por_sitio[location])[:cantidad]
+
+    def precargar(self, cantidad=PRECARGAR):
+        """Carga en un hilo de fondo todos los horizontes de los sitios más consultados.
+
+        Se detiene antes de pasar el presupuesto: la precarga nunca desaloja modelos en uso.
+        """
+        def _bucle():
+            ultimo = 0
+            for location in self.mas_usados(cantidad):
+                for h in self.horizontes(location):
+                    if self.bytes_cargados() + ultimo > self.presupuesto:
+                        return
+                    try:
+                        self._obtener(location, h, contar=False)
+                        ultimo = self._metricas[(location, h, self.version(location, h))]["bytes"] or 0
+                    except Exception:
+                        traceback.print_exc()
+
+        hilo = threading.Thread(target=_bucle, name="precarga-modelos", daemon=True)
+        hilo.start()
+        return hilo
+
+    # ---------------------------
+    # Métricas
+    # ---------------------------
+    def estadisticas(self):
+        """[{location, horizonte, version, cargado, mb, segundos_carga, cargas, hits, misses, desalojos, tasa_hits}]"""
+        with self._lock:
+            filas = []
+            for (location, horizonte, version), m in sorted(self._metricas.items()):
+                consultas = m["hits"] + m["misses"]
+                filas.append({
+                    "location": location, "horizonte": horizonte, "version": version,
+                    "cargado": (location, horizonte, version) in self._cargados,
+                    "mb": None if m["bytes"] is None else m["bytes"] / 1e6,
+                    "segundos_carga": m["segundos_carga"], "cargas": m["cargas"],
+                    "hits": m["hits"], "misses": m["misses"], "desalojos": m["desalojos"],
+                    "tasa_hits": round(m["hits"] / consultas, 3) if consultas else None,
+                })
+            return filas
+
+
+_registros = {}
+_lock_registros = threading.Lock()
+
+
+def obtener_registro(directorio=None):
+    """Instancia única por proceso para cada directorio (la comparten sesiones y prefetch)"""
+    directorio = directorio or DIRECTORIO
+    with _lock_registros:
+        if directorio not in _registros:
+            _registros[directorio] = RegistroModelos(directorio)
+        return _registros[directorio]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modelos publicados por sitio y horizonte")
+    parser.add_argument("--directorio", default=DIRECTORIO)
+    parser.add_argument("--cargar", action="store_true", help="Cargar todos y medir tiempo y memoria")
+    parser.add_argument("--presupuesto-mb", type=int, default=PRESUPUESTO_MB)
+    args = parser.parse_args()
+
+    registro = RegistroModelos(args.directorio, args.presupuesto_mb)
+    for sitio in registro.sitios():
+        print(f"{sitio['location']}: horizontes {sitio['horizontes']}")
+        if args.cargar:
+            for h in sitio["horizontes"]:
+                registro.obtener(sitio["location"], h)
+
+    if args.cargar:
+        print(f"\n{'sitio':<24} {'h':>2} {'versión':<12} {'MB':>7} {'carga ms':>9} {'en memoria':>10}")
+        for m in registro.estadisticas():
+            print(f"{m['location']:<24} {m['horizonte']:>2} {m['version']:<12} {m['mb']:7.2f} "
+                  f"{m['segundos_carga'] * 1000:9.1f} {'sí' if m['cargado'] else 'no':>10}")
+        print(f"Total en memoria: {registro.bytes_cargados() / 1e6:.1f} MB de {args.presupuesto_mb} MB")
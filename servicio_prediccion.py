@@ -0,0 +1,245 @@
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from clima_api import obtener_datos_clima
+from telemetria_api import telemetria
+import prediccion
+import almacen_features
+import ventana_features
+
+VENTANA_MS = 5
+MAX_LOTE = 512
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    return float(np.percentile(valores, p))
+
+
+# ---------------------------
+# Micro-batching
+# ---------------------------
+class MicroBatcher:
+    """Junta las filas que llegan dentro de una ventana corta y las predice con un único predict_proba"""
+
+    def __init__(self, model, ventana_ms=VENTANA_MS, max_lote=MAX_LOTE):
+        self.model = model
+        # Columnas con que se entrenó el modelo (las de siempre, más las de ventana si se usó --ventanas)
+        self.columnas = list(getattr(model, "feature_names_in_", prediccion.FEATURES))
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self.tamanos_lote = Counter()
+        self.latencias_ms = []
+        threading.Thread(target=self._bucle, name="microbatcher", daemon=True).start()
+
+    def predecir(self, X):
+        """Encola un DataFrame de features y bloquea hasta tener (clases, probabilidades)"""
+        futuro = Future()
+        self._cola.put((X, futuro))
+        return futuro.result()
+
+    def _bucle(self):
+        while True:
+            pendientes = [self._cola.get()]
+            filas = len(pendientes[0][0])
+            limite = time.perf_counter() + self.ventana
+            while filas < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pendientes.append(item)
+                filas += len(item[0])
+            self._procesar(pendientes, filas)
+
+    def _procesar(self, pendientes, filas):
+        clases = self.model.classes_
+        try:
+            X = pd.concat([x for x, _ in pendientes], ignore_index=True)
+            probs = self.model.predict_proba(X[self.columnas])
+        except Exception as e:
+            # Un pedido con datos inválidos no puede tirar a los demás del lote: cada uno por separado
+            if len(pendientes) == 1:
+                pendientes[0][1].set_exception(e)
+                return
+            for x, futuro in pendientes:
+                try:
+                    bloque = self.model.predict_proba(x[self.columnas])
+                except Exception as error:
+                    futuro.set_exception(error)
+                    continue
+                futuro.set_result((clases[np.argmax(bloque, axis=1)], bloque))
+            return
+        with self._lock:
+            self.tamanos_lote[filas] += 1
+        inicio = 0
+        for x, futuro in pendientes:
+            bloque = probs[inicio:inicio + len(x)]
+            inicio += len(x)
+            futuro.set_result((clases[np.argmax(bloque, axis=1)], bloque))
+
+    def registrar_latencia(self, ms):
+        with self._lock:
+            self.latencias_ms.append(ms)
+            # Ventana acotada para no crecer sin límite
+            if len(self.latencias_ms) > 100_000:
+                del self.latencias_ms[:50_000]
+
+    def metricas(self):
+        with self._lock:
+            latencias = list(self.latencias_ms)
+            lotes = dict(sorted(self.tamanos_lote.items()))
+        return {
+            "pedidos": len(latencias),
+            "latencia_p50_ms": percentil(latencias, 50),
+            "latencia_p99_ms": percentil(latencias, 99),
+            "lotes": sum(lotes.values()),
+            "histograma_tamano_lote": lotes,
+        }
+
+
+# ---------------------------
+# Construcción de features para (location, fecha)
+# ---------------------------
+def features_para_consulta(location, fecha, model=None):
+    """Features de la fecha: del almacén mapeado si la tiene, si no pide día-2 y día-1 a la API.
+
+    Si el modelo usa features de ventana se piden los 8 días anteriores (el almacén guarda solo
+    las de siempre), igual que en la comparación histórica de la app.
+    """
+    ventanas = bool(ventana_features.requeridas(model))
+    almacen = None if ventanas else almacen_features.abrir()
+    if almacen is not None and almacen.location == location:
+        features = almacen.features(fecha)
+        if features is not None:
+            return features
+    dias = ventana_features.DIAS if ventanas else 2
+    data, _, _ = obtener_datos_clima(
+        location, (fecha - timedelta(days=dias)).strftime("%Y-%m-%d"), (fecha - timedelta(days=1)).strftime("%Y-%m-%d")
+    )
+    if len(data) < dias:
+        raise ValueError(f"No hay datos suficientes para {location} {fecha}")
+    features = prediccion.construir_features(data[-1], data[-2], fecha)
+    if ventanas:
+        features.update(ventana_features.EstadoVentana(location).actualizar(data).features(fecha - timedelta(days=1)))
+    return features
+
+
+# ---------------------------
+# Servidor HTTP
+# ---------------------------
+class _ManejadorPrediccion(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/metricas":
+            self._responder(200, self.server.batcher.metricas())
+        elif self.path == "/metrics":
+            # Telemetría del cliente de la API (consultas {location, fecha}) en formato Prometheus
+            datos = telemetria.texto_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+        elif self.path == "/salud":
+            self._responder(200, {"ok": True})
+        else:
+            self._responder(404, {"error": "ruta desconocida"})
+
+    def do_POST(self):
+        if self.path != "/predecir":
+            self._responder(404, {"error": "ruta desconocida"})
+            return
+        inicio = time.perf_counter()
+        try:
+            largo = int(self.headers.get("Content-Length", 0))
+            cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+            filas = list(cuerpo.get("filas", []))
+            for consulta in cuerpo.get("consultas", []):
+                filas.append(features_para_consulta(consulta["location"], date.fromisoformat(consulta["fecha"]),
+                                                    self.server.batcher.model))
+            if not filas:
+                raise ValueError("Enviar 'filas' (features) o 'consultas' ({location, fecha})")
+            X = pd.DataFrame(filas)
+            columnas = self.server.batcher.columnas
+            faltantes = [c for c in columnas if c not in X.columns]
+            if faltantes:
+                raise ValueError(f"Faltan features: {faltantes}")
+            for c in columnas:
+                try:
+                    X[c] = pd.to_numeric(X[c], errors="raise")
+                except (ValueError, TypeError):
+                    raise ValueError(f"Feature no numérica: {c}")
+        except (ValueError, KeyError, TypeError) as e:
+            self._responder(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._responder(502, {"error": f"Error al obtener datos: {e}"})
+            return
+
+        try:
+            clases, probs = self.server.batcher.predecir(X)
+        except Exception as e:
+            self._responder(500, {"error": f"Error al predecir: {e}"})
+            return
+        nombres = [str(c) for c in self.server.batcher.model.classes_]
+        self._responder(200, {
+            "predicciones": [
+                {"clase": str(c), "probabilidades": dict(zip(nombres, p.round(4).tolist()))}
+                for c, p in zip(clases, probs)
+            ]
+        })
+        self.server.batcher.registrar_latencia((time.perf_counter() - inicio) * 1000)
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class ServidorPrediccion(ThreadingHTTPServer):
+    daemon_threads = True
+    # La cola por defecto (5) hace que bajo ráfagas el cliente reintente el SYN al segundo
+    request_queue_size = 256
+
+
+def crear_servidor(host="127.0.0.1", puerto=8800, ruta_modelo=prediccion.RUTA_MODELO,
+                   ventana_ms=VENTANA_MS, max_lote=MAX_LOTE):
+    servidor = ServidorPrediccion((host, puerto), _ManejadorPrediccion)
+    servidor.batcher = MicroBatcher(prediccion.cargar_modelo(ruta_modelo), ventana_ms, max_lote)
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de predicción con micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8800)
+    parser.add_argument("--modelo", default=prediccion.RUTA_MODELO)
+    parser.add_argument("--ventana-ms", type=float, default=VENTANA_MS)
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE)
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.host, args.puerto, args.modelo, args.ventana_ms, args.max_lote)
+    print(f"Servicio escuchando en http://{args.host}:{args.puerto} (POST /predecir, GET /metricas, GET /metrics)")
+    servidor.serve_forever()
@@ -0,0 +1,245 @@
+import json
+import time
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Mendoza no tiene horario de verano: UTC-3 todo el año
+ZONA_MENDOZA = timezone(timedelta(hours=-3))
+
+CONDICIONES = ["Clear", "Partially cloudy", "Overcast", "Rain, Overcast", "Rain, Partially cloudy"]
+
+
+# ---------------------------
+# Generación de datos sintéticos (deterministas por fecha)
+# ---------------------------
+def generar_horas(dia):
+    """Genera las 24 horas sintéticas de un día con el mismo esquema que la API"""
+    rnd = random.Random(dia.toordinal())
+    base_temp = 15 + 10 * rnd.random()
+    lluvioso = rnd.random() < 0.15
+    horas = []
+    for h in range(24):
+        inicio = datetime(dia.year, dia.month, dia.day, h, tzinfo=ZONA_MENDOZA)
+        temp = round(base_temp + 6 * rnd.uniform(-1, 1), 1)
+        dew = round(temp - rnd.uniform(2, 15), 1)
+        precip = round(rnd.uniform(0, 2), 1) if lluvioso and rnd.random() < 0.3 else 0.0
+        condicion = rnd.choice(CONDICIONES[3:]) if precip > 0 else rnd.choice(CONDICIONES[:3])
+        horas.append({
+            "datetime": f"{h:02d}:00:00",
+            "datetimeEpoch": int(inicio.timestamp()),
+            "temp": temp,
+            "feelslike": temp,
+            "humidity": round(rnd.uniform(20, 95), 2),
+            "dew": dew,
+            "precip": precip,
+            "precipprob": 100.0 if precip > 0 else 0.0,
+            "snow": 0.0,
+            "snowdepth": 0.0,
+            "preciptype": ["rain"] if precip > 0 else None,
+            "windgust": round(rnd.uniform(5, 40), 1),
+            "windspeed": round(rnd.uniform(0, 25), 1),
+            "winddir": round(rnd.uniform(0, 360), 1),
+            "pressure": round(rnd.uniform(1005, 1025), 1),
+            "visibility": round(rnd.uniform(5, 20), 1),
+            "cloudcover": round(rnd.uniform(0, 100), 1),
+            "solarradiation": 0.0 if h < 7 or h > 19 else round(rnd.uniform(50, 800), 1),
+            "solarenergy": 0.0 if h < 7 or h > 19 else round(rnd.uniform(0.1, 3), 1),
+            "uvindex": 0.0 if h < 7 or h > 19 else float(rnd.randint(1, 10)),
+            "conditions": condicion,
+            "icon": "rain" if precip > 0 else "clear-day",
+            "source": "obs",
+        })
+    return horas
+
+
+def generar_dia(dia, incluir_horas=False):
+    """Resume las horas sintéticas de un día al formato de include=days"""
+    horas = generar_horas(dia)
+
+    def media(campo):
+        return round(sum(h[campo] for h in horas) / len(horas), 1)
+
+    temps = [h["temp"] for h in horas]
+    precip = round(sum(h["precip"] for h in horas), 1)
+    registro = {
+        "datetime": dia.strftime("%Y-%m-%d"),
+        "datetimeEpoch": horas[0]["datetimeEpoch"],
+        "tempmax": max(temps),
+        "tempmin": min(temps),
+        "temp": media("temp"),
+        "feelslike": media("feelslike"),
+        "humidity": media("humidity"),
+        "dew": media("dew"),
+        "precip": precip,
+        "precipprob": 100.0 if precip > 0 else 0.0,
+        "snow": 0.0,
+        "snowdepth": 0.0,
+        "windgust": max(h["windgust"] for h in horas),
+        "windspeed": max(h["windspeed"] for h in horas),
+        "winddir": media("winddir"),
+        "pressure": media("pressure"),
+        "visibility": media("visibility"),
+        "cloudcover": media("cloudcover"),
+        "solarradiation": media("solarradiation"),
+        "solarenergy": round(sum(h["solarenergy"] for h in horas), 1),
+        "uvindex": max(h["uvindex"] for h in horas),
+        "conditions": "Rain, Partially cloudy" if precip > 0 else "Partially cloudy",
+        "source": "obs",
+    }
+    if incluir_horas:
+        registro["hours"] = horas
+    return registro
+
+
+# ---------------------------
+# Servidor HTTP del stub
+# ---------------------------
+class _ManejadorTimeline(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        partes = [unquote(p) for p in url.path.strip("/").split("/")]
+        params = parse_qs(url.query)
+        stub.registrar_llamada(self.path)
+
+        time.sleep(stub.demora())
+        rechazo = stub.rechazar()
+        if rechazo:
+            self._responder(429, {"error": rechazo})
+            return
+
+        # Formato esperado: /timeline/{location}/{desde}/{hasta}
+        if len(partes) != 4 or partes[0] != "timeline":
+            self._responder(404, {"error": "ruta desconocida"})
+            return
+        try:
+            desde = date.fromisoformat(partes[2])
+            hasta = date.fromisoformat(partes[3])
+        except ValueError:
+            self._responder(400, {"error": "fecha inválida"})
+            return
+
+        incluir_horas = "hours" in params.get("include", ["days"])[0]
+        dias = []
+        dia = desde
+        while dia <= hasta:
+            dias.append(generar_dia(dia, incluir_horas))
+            dia += timedelta(days=1)
+        cuerpo = {
+            "queryCost": len(dias),
+            "resolvedAddress": partes[1],
+            "timezone": "America/Argentina/Mendoza",
+            "days": dias,
+        }
+        if stub.relleno_kb:
+            # Simula respuestas más pesadas (por ejemplo estaciones y alertas) sin cambiar los datos
+            cuerpo["relleno"] = "x" * (stub.relleno_kb * 1024)
+        stub.registrar_costo(len(dias))
+        self._responder(200, cuerpo)
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class StubVisualCrossing:
+    """Stub local del endpoint timeline de Visual Crossing para pruebas sin red.
+
+    latencia_ms/jitter_ms agregan una demora uniforme en [latencia - jitter, latencia + jitter];
+    tasa_429 es la probabilidad de responder 429 por límite de ritmo, cuota_dias el costo (en días)
+    después del cual cada pedido recibe el 429 de cuota diaria agotada, y relleno_kb agranda
+    cada respuesta.
+    """
+
+    def __init__(self, host="127.0.0.1", puerto=0, latencia_ms=0, jitter_ms=0, tasa_429=0.0,
+                 relleno_kb=0, semilla=0, cuota_dias=None):
+        self.servidor = ThreadingHTTPServer((host, puerto), _ManejadorTimeline)
+        self.servidor.stub = self
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.tasa_429 = tasa_429
+        self.cuota_dias = cuota_dias
+        self.relleno_kb = relleno_kb
+        self.llamadas = []
+        self.rechazadas = 0
+        self.costo = 0
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    @property
+    def base_url(self):
+        host, puerto = self.servidor.server_address[:2]
+        return f"http://{host}:{puerto}/timeline"
+
+    def registrar_llamada(self, ruta):
+        with self._lock:
+            self.llamadas.append(ruta)
+
+    def registrar_costo(self, dias):
+        with self._lock:
+            self.costo += dias
+
+    def demora(self):
+        with self._lock:
+            ms = self.latencia_ms + self._rnd.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(ms, 0) / 1000
+
+    def rechazar(self):
+        """Mensaje del 429 a responder, o None si el pedido pasa"""
+        with self._lock:
+            if self.cuota_dias is not None and self.costo >= self.cuota_dias:
+                rechazo = "Maximum daily cost exceeded"
+            elif self._rnd.random() < self.tasa_429:
+                rechazo = "Too many requests, please slow down"
+            else:
+                rechazo = None
+            self.rechazadas += rechazo is not None
+        return rechazo
+
+    def estadisticas(self):
+        with self._lock:
+            return {"llamadas": len(self.llamadas), "rechazadas_429": self.rechazadas, "costo_dias": self.costo}
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stub local de la API timeline de Visual Crossing")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Probabilidad de responder 429 (límite de ritmo)")
+    parser.add_argument("--cuota-dias", type=int, help="Costo en días después del cual se agota la cuota diaria")
+    parser.add_argument("--relleno-kb", type=int, default=0, help="KB extra por respuesta")
+    args = parser.parse_args()
+
+    stub = StubVisualCrossing(puerto=args.puerto, latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms,
+                              tasa_429=args.tasa_429, relleno_kb=args.relleno_kb, cuota_dias=args.cuota_dias)
+    print(f"Stub escuchando en {stub.base_url} (usar VISUAL_CROSSING_URL={stub.base_url})")
+    stub.servidor.serve_forever()
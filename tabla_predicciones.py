@@ -0,0 +1,145 @@
+import os
+import threading
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import prediccion
+import ventana_features
+from registro_modelos import DIRECTORIO, LOCATION, slug
+
+# Predicciones del modelo de mañana para cada día del histórico local, armadas por modelo.py al
+# entrenar: <registro>/<sitio>/predicciones.parquet. La comparación histórica de la app responde
+# desde acá (sin API ni modelo) y va a la API solo para fechas fuera del rango local.
+ARCHIVO = "predicciones.parquet"
+FUSION_NUBES = {'Partially cloudy': 'Cloudy', 'Overcast': 'Cloudy'}
+
+# Tabla cargada por archivo: (ruta, mtime, tamaño) -> DataFrame indexado por fecha
+_tablas = {}
+_lock = threading.Lock()
+
+
+# ---------------------------
+# Construcción (la hace modelo.py)
+# ---------------------------
+def construir_tabla(diario_api, df_daily, pipeline, ventanas=False):
+    """Una fila por fecha con día-1 y día-2 locales: features, clase, prob_<clase> y la condición real.
+
+    Las features salen de los registros diarios con nombres de la API (prediccion.diario_desde_horario),
+    igual que en la app; la condición real es conditions_reduced de la tabla diaria de modelo.py
+    con las nubes fusionadas, la misma que se usa como target.
+    """
+    fechas = diario_api.index[2:]
+    X = prediccion.construir_features_lote(diario_api, fechas, ventanas=ventanas)
+    columnas = list(getattr(pipeline, "feature_names_in_", X.columns))
+    probs = pipeline.predict_proba(X[columnas].astype("float64"))
+    clases = [str(c) for c in pipeline.classes_]
+
+    tabla = X.copy()
+    tabla["clase"] = np.array(clases, dtype=object)[np.argmax(probs, axis=1)]
+    for i, clase in enumerate(clases):
+        tabla[f"prob_{clase}"] = probs[:, i]
+    real = df_daily.set_index(pd.to_datetime(df_daily['date']))['conditions_reduced'].replace(FUSION_NUBES)
+    tabla["real"] = real.reindex(tabla.index).to_numpy()
+    tabla.index.name = "fecha"
+    return tabla
+
+
+def ruta(location=LOCATION, directorio=DIRECTORIO):
+    return os.path.join(directorio, slug(location), ARCHIVO)
+
+
+def guardar(tabla, location=LOCATION, version=None, directorio=DIRECTORIO):
+    """Escritura atómica; 'version' es la del modelo de mañana publicado (prediccion.version_modelo)"""
+    archivo = ruta(location, directorio)
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    tabla = tabla.assign(version=version)
+    tabla.index.name = "fecha"
+    temporal = f"{archivo}.tmp-{os.getpid()}"
+    tabla.reset_index().to_parquet(temporal, index=False)
+    os.replace(temporal, archivo)
+    return archivo
+
+
+def descartar(dias, location=LOCATION, directorio=DIRECTORIO):
+    """Saca las fechas que dependen de días reescritos (la ingesta vuelve a pedir el último día,
+    que pudo quedar incompleto): el día mismo y los que lo usan como día-1..día-8. Devuelve cuántas."""
+    tabla = cargar(location, directorio)
+    if tabla is None or not dias:
+        return 0
+    afectadas = pd.DatetimeIndex([pd.Timestamp(d) + pd.Timedelta(days=k)
+                                  for d in dias for k in range(ventana_features.DIAS + 1)])
+    quedan = tabla[~tabla.index.isin(afectadas)]
+    if len(quedan) == len(tabla):
+        return 0
+    guardar(quedan.drop(columns="version"), location, tabla["version"].iloc[0], directorio)
+    return len(tabla) - len(quedan)
+
+
+# ---------------------------
+# Consulta (la hace la app)
+# ---------------------------
+def cargar(location=LOCATION, directorio=DIRECTORIO):
+    """Tabla del sitio indexada por fecha (None si no hay); se relee solo si cambia el archivo"""
+    archivo = ruta(location, directorio)
+    try:
+        estado = os.stat(archivo)
+    except FileNotFoundError:
+        return None
+    clave = (archivo, estado.st_mtime_ns, estado.st_size)
+    with _lock:
+        if clave not in _tablas:
+            for vieja in [c for c in _tablas if c[0] == archivo]:
+                del _tablas[vieja]
+            tabla = pd.read_parquet(archivo)
+            _tablas[clave] = tabla.set_index(pd.DatetimeIndex(tabla.pop("fecha")))
+        return _tablas[clave]
+
+
+def buscar(version, location, fecha, hoy=None, directorio=DIRECTORIO):
+    """Entrada con el formato de cache_predicciones para 'fecha', o None si la tabla no la cubre.
+
+    Solo vale para la versión del modelo con que se armó la tabla. El día de hoy nunca sale de
+    la tabla: en el CSV puede estar incompleto y la API lo sigue actualizando.
+    """
+    if fecha >= (hoy or date.today()):
+        return None
+    tabla = cargar(location, directorio)
+    if tabla is None or len(tabla) == 0 or tabla["version"].iloc[0] != version:
+        return None
+    clave = pd.Timestamp(fecha)
+    if clave not in tabla.index:
+        return None
+    fila = tabla.loc[clave]
+    if pd.isna(fila["real"]):
+        return None
+    clases = [c.removeprefix("prob_") for c in tabla.columns if c.startswith("prob_")]
+    columnas = prediccion.FEATURES + [c for c in ventana_features.FEATURES_VENTANA if c in tabla.columns]
+    return {
+        "version": version,
+        "location": location,
+        "fecha": f"{fecha:%Y-%m-%d}",
+        "clase": str(fila["clase"]),
+        "probabilidades": [float(fila[f"prob_{c}"]) for c in clases],
+        "clases": clases,
+        "real": str(fila["real"]),
+        "features": {c: (None if pd.isna(fila[c]) else float(fila[c])) for c in columnas},
+        "origen": "local",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabla de predicciones del histórico local")
+    parser.add_argument("--location", default=LOCATION)
+    parser.add_argument("--directorio", default=DIRECTORIO)
+    args = parser.parse_args()
+
+    tabla = cargar(args.location, args.directorio)
+    if tabla is None:
+        raise SystemExit(f"No hay tabla para {args.location}; se arma con 'python modelo.py'")
+    print(f"{len(tabla)} días ({tabla.index.min():%Y-%m-%d} a {tabla.index.max():%Y-%m-%d}), "
+          f"versión {tabla['version'].iloc[0]}")
+    print(f"Acierto contra la condición real: {(tabla['clase'] == tabla['real']).mean():.3f}")
+    print(tabla[["clase", "real"] + [c for c in tabla.columns if c.startswith("prob_")]].tail(10))
@@ -0,0 +1,247 @@
+import os
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Límites (segundos) del histograma de latencia, como los buckets 'le' de Prometheus
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Créditos diarios de cada key de Visual Crossing (plan gratuito: 1000 registros por día)
+CREDITOS_POR_DIA = int(os.environ.get("VISUAL_CROSSING_CREDITOS_DIA", "1000"))
+
+# Exportación opcional: endpoint local (/metrics) y/o archivo de texto para el textfile collector
+PUERTO = os.environ.get("TELEMETRIA_PUERTO")
+ARCHIVO = os.environ.get("TELEMETRIA_ARCHIVO")
+INTERVALO_ARCHIVO = 15
+
+
+def _hoy_utc():
+    return datetime.now(timezone.utc).date()
+
+
+def cuantil(buckets, conteos, q):
+    """Cuantil aproximado de un histograma acumulado (interpolando dentro del bucket, como histogram_quantile)"""
+    total = conteos[-1]
+    if not total:
+        return None
+    objetivo = q * total
+    anterior_limite, anterior_conteo = 0.0, 0
+    for limite, conteo in zip(buckets, conteos):
+        if conteo >= objetivo:
+            if conteo == anterior_conteo:
+                return limite
+            return anterior_limite + (limite - anterior_limite) * (objetivo - anterior_conteo) / (conteo - anterior_conteo)
+        anterior_limite, anterior_conteo = limite, conteo
+    return buckets[-1]
+
+
+class Telemetria:
+    """Contadores del cliente de la API en este proceso (los comparten todas las sesiones y hilos).
+
+    Cada llamada HTTP registra key, código de estado ('error' si no hubo respuesta), latencia,
+    bytes y créditos (queryCost). Otros módulos agregan medidores que se leen al exportar
+    (por ejemplo, qué keys están agotadas hoy).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._medidores = []
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.inicio = time.time()
+            self.llamadas = defaultdict(int)                   # (key, estado) -> n
+            self.histogramas = {}                              # key -> [conteo acumulado por bucket..., total]
+            self.segundos = defaultdict(float)                 # key -> suma de latencias
+            self.bytes = defaultdict(int)                      # key -> bytes recibidos
+            self.creditos = defaultdict(int)                   # key -> créditos totales
+            self.creditos_hoy = {}                             # key -> (día UTC, créditos de ese día)
+            self.reintentos = defaultdict(int)                 # motivo -> n
+            self.cache = defaultdict(int)                      # 'hit' / 'miss' -> n
+
+    # ---------------------------
+    # Registro (lo llama clima_api)
+    # ---------------------------
+    def registrar_llamada(self, key, estado, segundos, n_bytes=0):
+        with self._lock:
+            self.llamadas[(key, str(estado))] += 1
+            histograma = self.histogramas.setdefault(key, [0] * (len(BUCKETS) + 1))
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    histograma[i] += 1
+            histograma[-1] += 1
+            self.segundos[key] += segundos
+            self.bytes[key] += n_bytes
+
+    def registrar_creditos(self, key, costo):
+        if not costo:
+            return
+        hoy = _hoy_utc()
+        with self._lock:
+            self.creditos[key] += costo
+            dia, usados = self.creditos_hoy.get(key, (hoy, 0))
+            self.creditos_hoy[key] = (hoy, (usados if dia == hoy else 0) + costo)
+
+    def registrar_reintento(self, motivo):
+        with self._lock:
+            self.reintentos[motivo] += 1
+
+    def registrar_cache(self, acierto):
+        with self._lock:
+            self.cache["hit" if acierto else "miss"] += 1
+
+    def agregar_medidor(self, nombre, ayuda, funcion):
+        """funcion() -> [(etiquetas (dict o None), valor)]; se evalúa en cada exportación"""
+        self._medidores.append((nombre, ayuda, funcion))
+
+    # ---------------------------
+    # Lectura
+    # ---------------------------
+    def resumen_keys(self):
+        """[{key, llamadas, ok, rechazadas_429, errores, p50_ms, p95_ms, mb, creditos_hoy, creditos_restantes}]"""
+        hoy = _hoy_utc()
+        with self._lock:
+            keys = sorted({k for k, _ in self.llamadas} | set(self.creditos))
+            filas = []
+            for key in keys:
+                por_estado = {e: n for (k, e), n in self.llamadas.items() if k == key}
+                histograma = self.histogramas.get(key, [0] * (len(BUCKETS) + 1))
+                dia, usados = self.creditos_hoy.get(key, (hoy, 0))
+                usados = usados if dia == hoy else 0
+                p50, p95 = cuantil(BUCKETS, histograma, 0.5), cuantil(BUCKETS, histograma, 0.95)
+                filas.append({
+                    "key": key,
+                    "llamadas": sum(por_estado.values()),
+                    "ok": sum(n for e, n in por_estado.items() if e.startswith("2")),
+                    "rechazadas_429": por_estado.get("429", 0),
+                    "errores": sum(n for e, n in por_estado.items() if not e.startswith("2") and e != "429"),
+                    "p50_ms": None if p50 is None else p50 * 1000,
+                    "p95_ms": None if p95 is None else p95 * 1000,
+                    "mb": self.bytes.get(key, 0) / 1e6,
+                    "creditos_hoy": usados,
+                    "creditos_restantes": max(CREDITOS_POR_DIA - usados, 0),
+                })
+            return filas
+
+    def tasa_cache(self):
+        with self._lock:
+            total = self.cache["hit"] + self.cache["miss"]
+            return {"hits": self.cache["hit"], "misses": self.cache["miss"],
+                    "tasa_hits": round(self.cache["hit"] / total, 3) if total else None}
+
+    def histograma(self):
+        """{key: [(límite, llamadas en ese bucket, no acumuladas)]} para graficar"""
+        with self._lock:
+            resultado = {}
+            for key, acumulado in self.histogramas.items():
+                limites = [*BUCKETS, float("inf")]
+                previos = [0, *acumulado[:-1]]
+                resultado[key] = [(l, a - p) for l, a, p in zip(limites, acumulado, previos)]
+            return resultado
+
+    # ---------------------------
+    # Exportación
+    # ---------------------------
+    def texto_prometheus(self):
+        """Formato de texto de Prometheus (version 0.0.4)"""
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in valores:
+                texto = ",".join(f'{k}="{v}"' for k, v in (etiquetas or {}).items())
+                lineas.append(f"{nombre}{{{texto}}} {valor}" if texto else f"{nombre} {valor}")
+
+        hoy = _hoy_utc()
+        with self._lock:
+            metrica("clima_api_llamadas_total", "counter", "Llamadas HTTP a la API por key y código de estado",
+                    [({"key": k, "estado": e}, n) for (k, e), n in sorted(self.llamadas.items())])
+            lineas.append("# HELP clima_api_latencia_segundos Latencia de cada llamada HTTP a la API")
+            lineas.append("# TYPE clima_api_latencia_segundos histogram")
+            for key, acumulado in sorted(self.histogramas.items()):
+                for limite, conteo in zip(BUCKETS, acumulado):
+                    lineas.append(f'clima_api_latencia_segundos_bucket{{key="{key}",le="{limite}"}} {conteo}')
+                lineas.append(f'clima_api_latencia_segundos_bucket{{key="{key}",le="+Inf"}} {acumulado[-1]}')
+                lineas.append(f'clima_api_latencia_segundos_sum{{key="{key}"}} {self.segundos[key]:.6f}')
+                lineas.append(f'clima_api_latencia_segundos_count{{key="{key}"}} {acumulado[-1]}')
+            metrica("clima_api_bytes_recibidos_total", "counter", "Bytes de respuesta recibidos por key",
+                    [({"key": k}, n) for k, n in sorted(self.bytes.items())])
+            metrica("clima_api_creditos_total", "counter", "Créditos consumidos (queryCost) por key",
+                    [({"key": k}, n) for k, n in sorted(self.creditos.items())])
+            metrica("clima_api_creditos_hoy", "gauge", "Créditos consumidos hoy (UTC) por key en este proceso",
+                    [({"key": k}, n if dia == hoy else 0) for k, (dia, n) in sorted(self.creditos_hoy.items())])
+            metrica("clima_api_creditos_por_dia", "gauge", "Créditos diarios de cada key", [(None, CREDITOS_POR_DIA)])
+            metrica("clima_api_reintentos_total", "counter", "Llamadas repetidas con otra key, por motivo",
+                    [({"motivo": m}, n) for m, n in sorted(self.reintentos.items())])
+            metrica("clima_api_cache_total", "counter", "Consultas resueltas por la caché compartida (hit) o por la API (miss)",
+                    [({"resultado": r}, self.cache[r]) for r in ("hit", "miss")])
+            metrica("clima_api_inicio_segundos", "gauge", "Momento (epoch) desde el que se cuenta", [(None, f"{self.inicio:.0f}")])
+            medidores = list(self._medidores)
+
+        for nombre, ayuda, funcion in medidores:
+            metrica(nombre, "gauge", ayuda, funcion())
+        return "\n".join(lineas) + "\n"
+
+    def escribir_archivo(self, ruta):
+        """Escritura atómica (el textfile collector nunca lee un archivo a medias)"""
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.tmp-{os.getpid()}"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporal, ruta)
+
+    def servir(self, puerto, host="127.0.0.1"):
+        """Endpoint local GET /metrics en un hilo de fondo; devuelve el servidor"""
+        telemetria = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def log_message(self, formato, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                datos = telemetria.texto_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+        servidor = ThreadingHTTPServer((host, int(puerto)), _Manejador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="telemetria-http", daemon=True).start()
+        return servidor
+
+
+telemetria = Telemetria()
+_exportando = {}
+_lock_exportacion = threading.Lock()
+
+
+def iniciar_exportacion(puerto=None, archivo=None, intervalo=INTERVALO_ARCHIVO):
+    """Levanta el endpoint y/o el volcado periódico a archivo (una sola vez por proceso)"""
+    puerto = puerto or PUERTO
+    archivo = archivo or ARCHIVO
+    with _lock_exportacion:
+        if puerto and "servidor" not in _exportando:
+            _exportando["servidor"] = telemetria.servir(puerto)
+        if archivo and "archivo" not in _exportando:
+            def _bucle():
+                while True:
+                    try:
+                        telemetria.escribir_archivo(archivo)
+                    except OSError:
+                        pass
+                    time.sleep(intervalo)
+            _exportando["archivo"] = threading.Thread(target=_bucle, name="telemetria-archivo", daemon=True)
+            _exportando["archivo"].start()
+    return _exportando
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+import prediccion
+
+
+def _dia(fecha, semilla):
+    rng = np.random.default_rng(semilla)
+    dia = {c: float(rng.uniform(0, 30)) for c in [
+        "temp", "feelslike", "humidity", "dew", "pressure", "windspeed", "windgust", "winddir",
+        "visibility", "solarradiation", "uvindex", "cloudcover", "precip", "snow", "tempmax", "tempmin"]}
+    dia["datetime"] = f"{fecha:%Y-%m-%d}"
+    return dia
+
+
+def _modelo(semilla):
+    rng = np.random.default_rng(semilla)
+    X = pd.DataFrame(rng.normal(size=(60, len(prediccion.FEATURES))), columns=prediccion.FEATURES)
+    y = np.array(["Clear", "Cloudy", "Rain"])[np.arange(60) % 3]
+    return LogisticRegression(max_iter=500).fit(X, y)
+
+
+def test_horizonte_1_de_la_semana_igual_a_la_tarjeta_de_manana():
+    # Mismas entradas que prefetch.predecir_manana: ayer = hoy-1, anteayer = hoy-2, mañana = hoy+1
+    hoy = date(2025, 3, 1)
+    ayer, anteayer, manana = _dia(hoy - timedelta(days=1), 1), _dia(hoy - timedelta(days=2), 2), hoy + timedelta(days=1)
+    modelo = _modelo(0)
+
+    X = prediccion.features_a_dataframe(prediccion.construir_features(ayer, anteayer, manana))
+    clase, probs, _ = prediccion.predecir(modelo, X)
+    semana = prediccion.predecir_horizontes({1: modelo, 2: _modelo(1)}, ayer, anteayer, manana)
+
+    assert semana[0]["horizonte"] == 1 and semana[0]["fecha"] == manana
+    assert semana[0]["clase"] == clase
+    np.testing.assert_array_equal(semana[0]["probabilidades"], probs)
+    pd.testing.assert_series_equal(
+        prediccion.features_horizontes(ayer, anteayer, manana, [1, 2]).loc[1], X.iloc[0], check_names=False)
+
+
+def test_features_ciclicas_con_la_fecha_de_ayer_como_en_el_entrenamiento():
+    ayer, anteayer = _dia(date(2025, 2, 28), 1), _dia(date(2025, 2, 27), 2)
+    features = prediccion.construir_features(ayer, anteayer, date(2025, 3, 2))
+    assert features["month_sin"] == np.sin(2 * np.pi * 2 / 12)
+    assert features["dayofyear_sin"] == np.sin(2 * np.pi * 59 / 365)
+
+    # La versión por lotes usa el día-1 de cada fecha objetivo
+    diario = prediccion.diario_desde_api([anteayer, ayer])
+    lote = prediccion.construir_features_lote(diario, [pd.Timestamp("2025-03-01")])
+    assert lote["month_sin"].iloc[0] == features["month_sin"]
+    assert lote["dayofyear_sin"].iloc[0] == features["dayofyear_sin"]
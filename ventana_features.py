@@ -0,0 +1,164 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+# Features de ventana: contexto de varios días hacia atrás del día-1 (el último día con datos).
+# Entrenamiento: se calculan vectorizadas sobre toda la tabla diaria. Servicio: un estado por sitio
+# con los últimos días (EstadoVentana) al que cada día se le suma solo el registro nuevo.
+LOCATION = "Mendoza,Argentina"
+DIRECTORIO = os.path.join("model_output", "ventana")
+
+VENTANAS = [3, 7]
+FEATURES_VENTANA = (
+    [f"pressure_trend_{k}d" for k in VENTANAS]   # presión del día - presión de k días antes
+    + [f"precip_sum_{k}d" for k in VENTANAS]     # precipitación de los últimos k días
+)
+# Variables diarias (nombres de la API) que guarda el estado
+VARIABLES = ["pressure", "precip"]
+# Días que hacen falta para el día-1: él mismo y los 7 anteriores
+DIAS = max(VENTANAS) + 1
+
+
+def calcular(diario):
+    """Features de ventana de cada día de 'diario' (índice de fechas, columnas pressure y precip).
+
+    Solo mira hacia atrás; si falta algún día de la ventana el valor queda NaN. Las sumas
+    se hacen siempre en el mismo orden (del día más viejo al más nuevo), así el estado de
+    servicio da exactamente los mismos números que el entrenamiento.
+    """
+    if len(diario) == 0:
+        return pd.DataFrame(columns=FEATURES_VENTANA, index=diario.index, dtype=float)
+    calendario = pd.date_range(diario.index.min(), diario.index.max(), freq="D")
+    completo = diario.reindex(calendario)
+    presion = completo["pressure"].astype(float)
+    precip = completo["precip"].astype(float)
+
+    salida = {}
+    for k in VENTANAS:
+        salida[f"pressure_trend_{k}d"] = presion - presion.shift(k)
+    for k in VENTANAS:
+        total = precip.shift(k - 1)
+        for j in range(k - 2, -1, -1):
+            total = total + precip.shift(j)
+        salida[f"precip_sum_{k}d"] = total
+    return pd.DataFrame(salida, index=calendario).reindex(diario.index)[FEATURES_VENTANA]
+
+
+def diario_modelo(df_daily):
+    """Tabla diaria de modelo.py (date, pressure_mean, precip_sum) con los nombres de la API"""
+    diario = df_daily[["pressure_mean", "precip_sum"]].set_axis(["pressure", "precip"], axis=1)
+    return diario.set_axis(pd.DatetimeIndex(pd.to_datetime(df_daily["date"]), name="fecha"))
+
+
+def requeridas(modelo):
+    """Features de ventana con las que se entrenó el modelo (vacío para los modelos de siempre)"""
+    columnas = set(getattr(modelo, "feature_names_in_", []))
+    return [c for c in FEATURES_VENTANA if c in columnas]
+
+
+def dias_contexto(modelo):
+    """Días antes de la fecha a predecir que hay que tener: día-1 y día-2, o toda la ventana"""
+    return DIAS if requeridas(modelo) else 2
+
+
+def _numero(valor):
+    return np.nan if valor is None else float(valor)
+
+
+# ---------------------------
+# Estado para servicio
+# ---------------------------
+class EstadoVentana:
+    """Últimos DIAS registros diarios (pressure, precip) de un sitio.
+
+    Con el estado al día, predecir mañana necesita solo el registro de ayer (que ya viene en
+    la consulta de siempre) en lugar de pedir a la API los 8 días de la ventana.
+    """
+
+    def __init__(self, location=LOCATION, dias=None):
+        self.location = location
+        self.dias = dict(dias or {})  # 'YYYY-MM-DD' -> {'pressure': ..., 'precip': ...}
+
+    def actualizar(self, registros, reemplazar=True):
+        """Suma registros diarios de la API (dicts con datetime, pressure y precip)"""
+        for registro in registros:
+            if reemplazar or registro["datetime"] not in self.dias:
+                self.dias[registro["datetime"]] = {c: _numero(registro.get(c)) for c in VARIABLES}
+        for fecha in sorted(self.dias)[:-DIAS]:
+            del self.dias[fecha]
+        return self
+
+    def completar(self, diario):
+        """Agrega los días de una tabla diaria (índice de fechas) que el estado no tiene"""
+        registros = [{"datetime": f"{fecha:%Y-%m-%d}", **fila} for fecha, fila in
+                     diario[VARIABLES].tail(DIAS).to_dict("index").items()]
+        return self.actualizar(registros, reemplazar=False)
+
+    def _calendario(self, fecha):
+        fecha = pd.Timestamp(fecha)
+        return pd.date_range(fecha - pd.Timedelta(days=DIAS - 1), fecha, freq="D")
+
+    def faltantes(self, fecha):
+        """Días de la ventana que termina en 'fecha' que el estado no tiene"""
+        return [d.date() for d in self._calendario(fecha) if f"{d:%Y-%m-%d}" not in self.dias]
+
+    def features(self, fecha):
+        """Features de ventana del día 'fecha' (el día-1 de la predicción); NaN donde falten días"""
+        calendario = self._calendario(fecha)
+        diario = pd.DataFrame(
+            [self.dias.get(f"{d:%Y-%m-%d}", {c: np.nan for c in VARIABLES}) for d in calendario],
+            index=calendario, columns=VARIABLES,
+        )
+        return {c: float(v) for c, v in calcular(diario).iloc[-1].items()}
+
+
+def ruta(location=LOCATION, directorio=DIRECTORIO):
+    from registro_modelos import slug
+    return os.path.join(directorio, f"{slug(location)}.json")
+
+
+def cargar(location=LOCATION, directorio=DIRECTORIO):
+    """Estado guardado del sitio (vacío si todavía no hay)"""
+    archivo = ruta(location, directorio)
+    if not os.path.exists(archivo):
+        return EstadoVentana(location)
+    with open(archivo, encoding="utf-8") as f:
+        datos = json.load(f)
+    dias = {fecha: {c: _numero(v) for c, v in valores.items()} for fecha, valores in datos["dias"].items()}
+    return EstadoVentana(datos["location"], dias)
+
+
+def guardar(estado, directorio=DIRECTORIO):
+    """Escritura atómica (los procesos de la app pueden guardarlo a la vez)"""
+    archivo = ruta(estado.location, directorio)
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    dias = {fecha: {c: (None if np.isnan(v) else v) for c, v in valores.items()}
+            for fecha, valores in sorted(estado.dias.items())}
+    temporal = f"{archivo}.tmp-{os.getpid()}"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"location": estado.location, "dias": dias}, f, indent=2)
+    os.replace(temporal, archivo)
+    return archivo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estado de las features de ventana para servicio")
+    parser.add_argument("--location", default=LOCATION)
+    parser.add_argument("--inicializar", metavar="DATOS",
+                        help="Completar el estado con los últimos días de un CSV horario o almacén .sqlite")
+    args = parser.parse_args()
+
+    estado = cargar(args.location)
+    if args.inicializar:
+        import modelo
+        import prediccion
+        horario = modelo.cargar_datos(args.inicializar, location=args.location)
+        estado.completar(prediccion.diario_desde_horario(horario))
+        print(f"✅ Estado guardado en {guardar(estado)}")
+    for fecha, valores in sorted(estado.dias.items()):
+        print(fecha, valores)
+    if estado.dias:
+        ultimo = max(estado.dias)
+        print(f"\nFeatures de ventana de {ultimo}: {estado.features(ultimo)}")